@@ -47,6 +47,19 @@ def get_object(path: str) -> tuple:
     return resp.content, resp.headers.get("Content-Type", "application/octet-stream")
 
 
+def download_object(path: str, fileobj, chunk_size: int = 64 * 1024) -> str:
+    """Stream an object into `fileobj` without holding it in memory; returns its content type."""
+    key = init_storage()
+    with requests.get(
+        f"{STORAGE_URL}/objects/{path}",
+        headers={"X-Storage-Key": key}, timeout=60, stream=True
+    ) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content(chunk_size):
+            fileobj.write(chunk)
+        return resp.headers.get("Content-Type", "application/octet-stream")
+
+
 def get_public_url(path: str) -> str:
     key = init_storage()
     resp = requests.get(
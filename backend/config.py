@@ -37,3 +37,22 @@ ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 ALLOWED_VIDEO_TYPES = {"video/mp4", "video/webm"}
 MAX_IMAGE_SIZE = 5 * 1024 * 1024
 MAX_VIDEO_SIZE = 20 * 1024 * 1024
+
+# Background jobs (services/jobs.py): worker tasks per backend process
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+EXPORT_DIR = UPLOAD_DIR / "exports"
+EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', '24'))
+
+# Fiche PDF rendering (services/pdf_pool.py): worker processes and waiting requests
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', '2'))
+PDF_MAX_QUEUE = int(os.environ.get('PDF_MAX_QUEUE', '20'))
+PDF_CACHE_DIR = UPLOAD_DIR / "pdf_cache"
+PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Public site address, for canonical links, share previews and feeds (services/article_render.py,
+# services/feeds.py). Required by those endpoints: the Host header of a request is not trusted
+SITE_URL = os.environ.get('SITE_URL', '').rstrip('/')
+
+# Article content processing (services/content_pipeline.py): worker processes for large articles
+CONTENT_WORKERS = int(os.environ.get('CONTENT_WORKERS', '1'))
@@ -1,4 +1,7 @@
 # Guinea administrative divisions: Communes and their Quartiers
+import re
+from utils import fold_text
+
 GUINEA_LOCATIONS = {
     "Conakry": {
         "Kaloum": ["Boulbinet", "Coronthie", "Sandervalia", "Temenetaye", "Tombo", "Manquepas", "Sans Fil"],
@@ -57,3 +60,65 @@ def get_communes(city):
 
 def get_quartiers(city, commune):
     return GUINEA_LOCATIONS.get(city, {}).get(commune, [])
+
+
+# ─── Normalized location keys ──────────────────────────────────────────────────
+# Keys are accent-folded, lower-cased names ("Kipé" -> "kipe") stored next to the
+# display values on properties so filters can use exact/prefix index lookups.
+
+CITY_KEYS = {fold_text(city): city for city in GUINEA_LOCATIONS}
+COMMUNE_KEYS = {}   # commune key -> [(city key, commune)]
+QUARTIER_KEYS = {}  # quartier key -> [(city key, commune key, quartier)]
+for _city, _communes in GUINEA_LOCATIONS.items():
+    for _commune, _quartiers in _communes.items():
+        COMMUNE_KEYS.setdefault(fold_text(_commune), []).append((fold_text(_city), _commune))
+        for _quartier in _quartiers:
+            QUARTIER_KEYS.setdefault(fold_text(_quartier), []).append((fold_text(_city), fold_text(_commune), _quartier))
+
+
+def _pick(matches, city_key):
+    """Prefer the match belonging to `city_key`, else the only match."""
+    for m in matches:
+        if m[0] == city_key:
+            return m
+    return matches[0] if len(matches) == 1 else None
+
+
+def location_keys(city: str, commune: str = "", neighborhood: str = "") -> dict:
+    """Derive canonical city/commune/neighborhood keys for a property.
+
+    Values are matched against GUINEA_LOCATIONS; a neighborhood that is really a
+    known commune (legacy listings) or a known quartier fills in the commune key.
+    Unknown names still get a folded key so they remain searchable.
+    """
+    city_key = fold_text(city)
+    commune_key = fold_text(commune)
+    neighborhood_key = fold_text(neighborhood)
+
+    if not commune_key and neighborhood_key:
+        if neighborhood_key in COMMUNE_KEYS and _pick(COMMUNE_KEYS[neighborhood_key], city_key):
+            commune_key = neighborhood_key
+        elif neighborhood_key in QUARTIER_KEYS:
+            match = _pick(QUARTIER_KEYS[neighborhood_key], city_key)
+            if match:
+                commune_key = match[1]
+    if not city_key and commune_key in COMMUNE_KEYS:
+        match = _pick(COMMUNE_KEYS[commune_key], city_key)
+        if match:
+            city_key = match[0]
+
+    return {"city_key": city_key, "commune_key": commune_key, "neighborhood_key": neighborhood_key}
+
+
+def is_known_location(key: str) -> bool:
+    return key in CITY_KEYS or key in COMMUNE_KEYS or key in QUARTIER_KEYS
+
+
+def location_filter(value: str):
+    """Mongo filter on a *_key field: exact for known places, anchored prefix otherwise."""
+    key = fold_text(value)
+    if not key:
+        return None
+    if is_known_location(key):
+        return key
+    return {"$regex": f"^{re.escape(key)}"}
@@ -3,3 +3,53 @@ from config import MONGO_URL, DB_NAME
 
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
+
+
+async def ensure_indexes():
+    """Create the indexes the query paths rely on (idempotent, run at startup)."""
+    # Normalized location keys (see data/guinea_locations.location_keys)
+    await db.properties.create_index([("city_key", 1), ("status", 1), ("created_at", -1)])
+    await db.properties.create_index([("city_key", 1), ("neighborhood_key", 1)])
+    await db.properties.create_index([("commune_key", 1)])
+    await db.properties.create_index([("neighborhood_key", 1)])
+    # Procedure files, loaded per page of procedures (routes/procedures.enrich_procedures)
+    await db.procedure_files.create_index([("procedure_id", 1), ("is_deleted", 1)])
+    # Likes (services/likes.py)
+    await db.likes.create_index([("user_id", 1), ("target_type", 1), ("target_id", 1)], unique=True)
+    await db.likes.create_index([("target_type", 1), ("target_id", 1)])
+    # Materialized dashboard counters (services/stats.py)
+    await db.stats.create_index("key", unique=True)
+    await db.stats.create_index("scope")
+    # Daily analytics rollups (services/metrics.py)
+    await db.metrics_daily.create_index([("metric", 1), ("date", 1), ("dims_key", 1)], unique=True)
+    # Background jobs (services/jobs.py)
+    await db.jobs.create_index("id", unique=True)
+    await db.jobs.create_index([("status", 1), ("run_after", 1)])
+    await db.jobs.create_index([("created_at", -1)])
+    # Saved items (services/bookmarks.py)
+    await db.bookmarks.create_index([("user_id", 1), ("kind", 1), ("target_id", 1)], unique=True)
+    await db.bookmarks.create_index([("user_id", 1), ("kind", 1), ("saved_at", -1)])
+    await db.bookmarks.create_index([("kind", 1), ("target_id", 1)])
+    # Cache invalidation versions (services/reference.py)
+    await db.cache_versions.create_index("key", unique=True)
+    # Unique-viewer sketches (services/unique_viewers.py)
+    await db.view_sketches.create_index([("key", 1)], unique=True)
+    # Scheduled publication (services/scheduler.py)
+    await db.articles.create_index([("status", 1), ("scheduled_at", 1)])
+    await db.leases.create_index("key", unique=True)
+    # Full-text search (services/search.py). Title matches outweigh body matches.
+    # language_override names a field no document has: procedures store a
+    # `language` field whose values ("ar") are not text-search languages.
+    await _text_index(db.articles, {"title": 10, "tags": 6, "subtitle": 4, "meta_description": 2, "content": 1})
+    await _text_index(db.properties, {"title": 10, "neighborhood": 6, "commune": 6, "city": 6,
+                                      "property_category": 3, "description": 1})
+    await _text_index(db.procedures, {"title": 10, "keywords": 6, "description": 2, "content": 1})
+    # Names and emails: no stemming, no stop words
+    await _text_index(db.users, {"username": 10, "full_name": 8, "email": 5}, language="none")
+
+
+async def _text_index(collection, weights: dict, language: str = "french"):
+    await collection.create_index(
+        [(field, "text") for field in weights], name="search_text", weights=weights,
+        default_language=language, language_override="search_language",
+    )
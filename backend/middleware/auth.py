@@ -7,6 +7,8 @@ from typing import Optional
 
 security = HTTPBearer(auto_error=False)
 
+LAST_SEEN_INTERVAL = 60  # seconds
+
 
 async def get_current_user(
     request: Request,
@@ -28,9 +30,12 @@ async def get_current_user(
         user = await db.users.find_one({"id": user_id}, {"_id": 0})
         if not user:
             raise HTTPException(status_code=401, detail="Session expirée")
-        # Update last_seen for online status
-        from datetime import datetime, timezone
-        await db.users.update_one({"id": user_id}, {"$set": {"last_seen": datetime.now(timezone.utc).isoformat()}})
+        # Update last_seen for online status, at most once a minute per user
+        from datetime import datetime, timezone, timedelta
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(seconds=LAST_SEEN_INTERVAL)).isoformat()
+        if (user.get("last_seen") or "") < cutoff:
+            await db.users.update_one({"id": user_id}, {"$set": {"last_seen": now.isoformat()}})
         return user
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Token invalide ou expiré")
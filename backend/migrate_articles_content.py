@@ -0,0 +1,56 @@
+"""
+Migration script: backfill the derived article fields (excerpt, first_image,
+word_count, reading_time, content_hash) computed by the content pipeline, so
+list endpoints can leave out the article body. Stored content and slugs are
+kept as they are. Safe to re-run; only articles whose hash is missing or
+stale are rewritten.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pymongo import UpdateOne
+from database import db, ensure_indexes
+from services.content_pipeline import content_hash, derive
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_articles_content")
+
+BATCH_SIZE = 500
+
+
+async def migrate_articles():
+    """Compute the derived fields of every article, written in bulk batches."""
+    logger.info("=== Backfilling derived article fields ===")
+    count = 0
+    ops = []
+    projection = {"_id": 0, "id": 1, "title": 1, "slug": 1, "content": 1, "blocks": 1, "content_hash": 1}
+    async for article in db.articles.find({}, projection):
+        content, blocks = article.get("content") or "", article.get("blocks") or []
+        key = content_hash(article.get("title", ""), article.get("slug", ""), content, blocks)
+        if article.get("content_hash") == key:
+            continue
+        ops.append(UpdateOne({"id": article["id"]}, {"$set": {**derive(content, blocks), "content_hash": key}}))
+        if len(ops) >= BATCH_SIZE:
+            result = await db.articles.bulk_write(ops, ordered=False)
+            count += result.modified_count
+            ops = []
+    if ops:
+        result = await db.articles.bulk_write(ops, ordered=False)
+        count += result.modified_count
+    logger.info(f"  Updated {count} articles")
+    return count
+
+
+async def main():
+    logger.info("Starting derived article fields backfill...")
+    await ensure_indexes()
+    count = await migrate_articles()
+    logger.info(f"\n=== MIGRATION COMPLETE === Articles: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Migration script: copy the legacy saved_articles, saved_properties and
+saved_procedures collections into the unified `bookmarks` collection.
+Safe to re-run; existing bookmarks are kept as they are.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pymongo import UpdateOne
+from database import db, ensure_indexes
+from services.bookmarks import BOOKMARK_KINDS
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_bookmarks")
+
+BATCH_SIZE = 500
+
+LEGACY_COLLECTIONS = {
+    "article": "saved_articles",
+    "property": "saved_properties",
+    "procedure": "saved_procedures",
+}
+
+
+async def migrate_kind(kind: str, collection: str):
+    logger.info(f"=== Migrating {collection} ===")
+    id_field = BOOKMARK_KINDS[kind]
+    ops, moved = [], 0
+    async for doc in db[collection].find({}, {"_id": 0}):
+        target_id = doc.pop(id_field, None)
+        if not target_id or not doc.get("user_id"):
+            continue
+        key = {"user_id": doc["user_id"], "kind": kind, "target_id": target_id}
+        ops.append(UpdateOne(key, {"$setOnInsert": {**doc, **key}}, upsert=True))
+        if len(ops) >= BATCH_SIZE:
+            await db.bookmarks.bulk_write(ops, ordered=False)
+            moved += len(ops)
+            ops = []
+    if ops:
+        await db.bookmarks.bulk_write(ops, ordered=False)
+        moved += len(ops)
+    logger.info(f"  Copied {moved} bookmarks from {collection}")
+    return moved
+
+
+async def main():
+    logger.info("Starting bookmarks migration...")
+    await ensure_indexes()
+    total = 0
+    for kind, collection in LEGACY_COLLECTIONS.items():
+        total += await migrate_kind(kind, collection)
+    logger.info(f"\n=== MIGRATION COMPLETE === Bookmarks: {total}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Migration script: move embedded `liked_by` arrays on articles and properties
+into the `likes` collection, recompute `likes_count` from it and drop the
+arrays. Safe to re-run; existing likes are upserted.
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pymongo import UpdateOne
+from database import db, ensure_indexes
+from services.likes import LIKE_TARGETS
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_likes")
+
+BATCH_SIZE = 500
+
+
+async def migrate_target(target_type: str, collection: str):
+    logger.info(f"=== Migrating {collection} likes ===")
+    now = datetime.now(timezone.utc).isoformat()
+    moved = 0
+    async for doc in db[collection].find({"liked_by": {"$exists": True}}, {"_id": 0, "id": 1, "liked_by": 1}):
+        user_ids = list(dict.fromkeys(doc.get("liked_by") or []))
+        ops = [
+            UpdateOne(
+                {"user_id": uid, "target_type": target_type, "target_id": doc["id"]},
+                {"$setOnInsert": {"created_at": now}},
+                upsert=True,
+            )
+            for uid in user_ids
+        ]
+        for i in range(0, len(ops), BATCH_SIZE):
+            await db.likes.bulk_write(ops[i:i + BATCH_SIZE], ordered=False)
+        likes_count = await db.likes.count_documents({"target_type": target_type, "target_id": doc["id"]})
+        await db[collection].update_one(
+            {"id": doc["id"]}, {"$set": {"likes_count": likes_count}, "$unset": {"liked_by": ""}}
+        )
+        moved += len(user_ids)
+    logger.info(f"  Moved {moved} likes from {collection}")
+    return moved
+
+
+async def main():
+    logger.info("Starting likes migration...")
+    await ensure_indexes()
+    total = 0
+    for target_type, collection in LIKE_TARGETS.items():
+        total += await migrate_target(target_type, collection)
+    logger.info(f"\n=== MIGRATION COMPLETE === Likes: {total}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
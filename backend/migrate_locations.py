@@ -0,0 +1,54 @@
+"""
+Migration script: backfill normalized location keys (city_key, commune_key,
+neighborhood_key) on existing properties so filters can use the indexes.
+Safe to re-run; only documents whose keys changed are rewritten.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pymongo import UpdateOne
+from database import db, ensure_indexes
+from data.guinea_locations import location_keys
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_locations")
+
+BATCH_SIZE = 500
+
+
+async def migrate_properties():
+    """Compute location keys for every property, written in bulk batches."""
+    logger.info("=== Backfilling property location keys ===")
+    count = 0
+    ops = []
+    projection = {"_id": 0, "id": 1, "city": 1, "commune": 1, "neighborhood": 1,
+                  "city_key": 1, "commune_key": 1, "neighborhood_key": 1}
+    async for prop in db.properties.find({}, projection):
+        keys = location_keys(prop.get("city", ""), prop.get("commune", ""), prop.get("neighborhood", ""))
+        if all(prop.get(k) == v for k, v in keys.items()):
+            continue
+        ops.append(UpdateOne({"id": prop["id"]}, {"$set": keys}))
+        if len(ops) >= BATCH_SIZE:
+            result = await db.properties.bulk_write(ops, ordered=False)
+            count += result.modified_count
+            ops = []
+    if ops:
+        result = await db.properties.bulk_write(ops, ordered=False)
+        count += result.modified_count
+    logger.info(f"  Updated {count} properties")
+    return count
+
+
+async def main():
+    logger.info("Starting location key backfill...")
+    await ensure_indexes()
+    count = await migrate_properties()
+    logger.info(f"\n=== MIGRATION COMPLETE === Properties: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
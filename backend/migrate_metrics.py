@@ -0,0 +1,45 @@
+"""
+Backfill script: rebuild the `metrics_daily` rollups from existing users,
+articles, properties and payments. Safe to re-run; the covered days are
+recomputed, not incremented. Stops at yesterday: today is recorded live.
+
+Usage: python migrate_metrics.py [--since YYYY-MM-DD] [metric ...]
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import ensure_indexes
+from services.metrics import METRICS, backfill
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_metrics")
+
+
+async def main(names, since):
+    logger.info("Starting metrics backfill...")
+    await ensure_indexes()
+    total = 0
+    for name in names or METRICS:
+        if METRICS[name]["source"] is None:
+            logger.info(f"  {name}: no history to rebuild, skipped")
+            continue
+        written = await backfill(name, since)
+        logger.info(f"  {name}: {written} daily documents")
+        total += written
+    logger.info(f"\n=== BACKFILL COMPLETE === Documents: {total}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("metrics", nargs="*", metavar="metric")
+    parser.add_argument("--since", default="", help="Only rebuild days from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+    unknown = set(args.metrics) - set(METRICS)
+    if unknown:
+        parser.error(f"unknown metrics: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args.metrics, args.since))
@@ -1,5 +1,20 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Any
+from datetime import datetime, timezone
+
+
+def normalize_schedule(value: Optional[str]) -> Optional[str]:
+    """Publication time as a UTC ISO string, so it sorts and compares as text.
+    Times without an offset (a datetime-local input) are Conakry time, i.e. UTC."""
+    if value is None or not value.strip():
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("Date de programmation invalide")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
 
 
 class ArticleBlock(BaseModel):
@@ -29,6 +44,11 @@ class ArticleCreate(BaseModel):
     def validate_title(cls, v):
         return v.strip()
 
+    @field_validator('scheduled_at')
+    @classmethod
+    def validate_scheduled_at(cls, v):
+        return normalize_schedule(v)
+
 
 class ArticleUpdate(BaseModel):
     title: Optional[str] = None
@@ -53,6 +73,32 @@ class ArticleUpdate(BaseModel):
             return v.strip()
         return v
 
+    @field_validator('scheduled_at')
+    @classmethod
+    def validate_scheduled_at(cls, v):
+        return normalize_schedule(v)
+
+
+class BlockPatch(BaseModel):
+    op: str = "set"  # set (add or replace the block with this id), delete
+    id: str
+    block: Optional[ArticleBlock] = None
+
+
+class ArticleAutosave(BaseModel):
+    """Changes since the draft version `base_version`; omitted fields are unchanged."""
+    base_version: int = Field(..., ge=0)
+    title: Optional[str] = Field(None, max_length=200)
+    subtitle: Optional[str] = None
+    content: Optional[str] = None
+    category: Optional[str] = None
+    tags: Optional[List[str]] = None
+    image_url: Optional[str] = None
+    meta_title: Optional[str] = None
+    meta_description: Optional[str] = None
+    blocks: List[BlockPatch] = Field([], max_length=500)
+    order: Optional[List[str]] = None  # block ids in their new order, when it changed
+
 
 class ArticleOut(BaseModel):
     id: str
@@ -74,10 +120,13 @@ class ArticleOut(BaseModel):
     status: str = "published"
     scheduled_at: Optional[str] = None
     views: int = 0
+    unique_views: int = 0
+    draft_version: int = 0
     likes_count: int = 0
-    liked_by: List[str] = []
     word_count: int = 0
     reading_time: int = 0
+    excerpt: str = ""
+    first_image: Optional[str] = None
     published_at: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
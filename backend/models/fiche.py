@@ -80,3 +80,11 @@ class CompanySettings(BaseModel):
     contact_email: str = ""
     contact_phone: str = ""
     primary_color: str = "#FF6600"
+
+
+class FicheBatchExport(BaseModel):
+    ids: List[str] = []
+    status: str = ""
+    country: str = ""
+    category: str = ""
+    format: str = "pdf"  # pdf: one document with a table of contents, zip: one file per fiche
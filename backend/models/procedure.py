@@ -162,6 +162,7 @@ class ProcedureOut(BaseModel):
     created_at: str = ""
     updated_at: str = ""
     views: int = 0
+    unique_views: int = 0
     version: int = 1
     # Legacy compat
     subcategory: str = ""
@@ -150,8 +150,8 @@ class PropertyOut(BaseModel):
     author_username: str = ""
     created_at: str
     views: int
+    unique_views: int = 0
     likes_count: int = 0
-    liked_by: List[str] = []
     # New fields
     property_category: str = "autre"
     bedrooms: int = 0
@@ -1,13 +1,30 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import Response
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import Dict, List
 from pydantic import BaseModel
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from database import db
 from models.user import PaginatedUsers, user_to_admin_out
 from models.notification import AdminNotification, PaginatedNotifications, RoleRequestAction
 from models.property import PROPERTY_STATUSES
 from middleware.auth import get_current_user, require_admin
 from routes.messages import manager
+from services.likes import delete_target_likes, delete_targets_likes
+from services.bookmarks import delete_target_bookmarks, delete_targets_bookmarks
+from services.stats import stats, GLOBAL_KEY
+from services.jobs import job_queue
+from services.reference import reference_bundle
+from services.search import text_query, search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.scheduler import scheduled_publisher
+from services.article_render import article_render
+from services.metrics import metrics
+from routes.payments import set_property_status
+from services.exports import FORMATS, get_export, select_columns, export_query, stream_csv, stream_columnar
+import asyncio
+import re
 import uuid
 from datetime import datetime, timezone
 
@@ -70,6 +87,12 @@ class PaginatedPaymentsAdmin(BaseModel):
     page: int
     pages: int
 
+class BulkAction(BaseModel):
+    ids: List[str] = []
+    filter: Dict[str, str] = {}
+    action: str
+    value: str = ""
+
 
 # ─── Public: Admin Contact Info ────────────────────────────────────────────────
 
@@ -85,22 +108,15 @@ async def get_admin_contact():
 # ─── Stats ─────────────────────────────────────────────────────────────────────
 
 @router.get("/stats")
-async def get_admin_stats(current_user: dict = Depends(require_admin)):
-    total_users = await db.users.count_documents({})
-    total_articles = await db.articles.count_documents({})
-    total_properties = await db.properties.count_documents({})
-    total_payments = await db.payments.count_documents({})
-    verified_users = await db.users.count_documents({"email_verified": True})
-    unverified_users = await db.users.count_documents({"$or": [{"email_verified": False}, {"email_verified": {"$exists": False}}]})
-    pending_verification = await db.users.count_documents({"status": "pending_verification"})
-    active_users = await db.users.count_documents({"status": {"$in": ["active", "actif"]}})
-    suspended_users = await db.users.count_documents({"status": {"$in": ["suspended", "suspendu", "bloque"]}})
+async def get_admin_stats(refresh: bool = Query(False), current_user: dict = Depends(require_admin)):
+    s = await stats.get(GLOBAL_KEY, refresh=refresh)
     return {
-        "total_users": total_users, "total_articles": total_articles,
-        "total_properties": total_properties, "total_payments": total_payments,
-        "verified_users": verified_users, "unverified_users": unverified_users,
-        "pending_verification": pending_verification, "active_users": active_users,
-        "suspended_users": suspended_users,
+        "total_users": s.get("users", 0), "total_articles": s.get("articles", 0),
+        "total_properties": s.get("properties", 0), "total_payments": s.get("payments", 0),
+        "verified_users": s.get("users_verified", 0),
+        "unverified_users": s.get("users", 0) - s.get("users_verified", 0),
+        "pending_verification": s.get("users_pending", 0), "active_users": s.get("users_active", 0),
+        "suspended_users": s.get("users_suspended", 0), "updated_at": s.get("updated_at"),
     }
 
 
@@ -114,33 +130,35 @@ async def get_admin_users(
     current_user: dict = Depends(require_admin)
 ):
     query = {}
-    if search:
-        query["$or"] = [
-            {"username": {"$regex": search, "$options": "i"}},
-            {"email": {"$regex": search, "$options": "i"}},
-            {"full_name": {"$regex": search, "$options": "i"}},
-        ]
     if role:
         query["role"] = role
     if verification == "verified":
         query["email_verified"] = True
     elif verification == "unverified":
-        query["$or"] = query.get("$or") or []
-        # Handle the case where $or is already used for search
-        if search:
-            query["$and"] = [
-                {"$or": query.pop("$or")},
-                {"$or": [{"email_verified": False}, {"email_verified": {"$exists": False}}]}
-            ]
-        else:
-            query["$or"] = [{"email_verified": False}, {"email_verified": {"$exists": False}}]
+        query["$or"] = [{"email_verified": False}, {"email_verified": {"$exists": False}}]
     elif verification == "pending":
         query["status"] = "pending_verification"
 
-    total = await db.users.count_documents(query)
+    projection = {"_id": 0, "hashed_password": 0}
+    sort = [("created_at", -1)]
+    if search.strip():
+        # Whole words through the text index (ranked); partial input such as an
+        # email prefix falls back to a substring match
+        text_search = {**query, **text_query(search)}
+        total = await db.users.count_documents(text_search)
+        if total:
+            query = text_search
+            projection["score"] = {"$meta": "textScore"}
+            sort = [("score", {"$meta": "textScore"}), ("created_at", -1)]
+        else:
+            pattern = {"$regex": re.escape(search.strip()), "$options": "i"}
+            query["$and"] = [{"$or": [{"username": pattern}, {"email": pattern}, {"full_name": pattern}]}]
+            total = await db.users.count_documents(query)
+    else:
+        total = await db.users.count_documents(query)
     pages = max(1, (total + limit - 1) // limit)
     skip = (page - 1) * limit
-    users = await db.users.find(query, {"_id": 0, "hashed_password": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    users = await db.users.find(query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
     return PaginatedUsers(users=[user_to_admin_out(u) for u in users], total=total, page=page, pages=pages)
 
 
@@ -162,6 +180,7 @@ async def update_user_status(user_id: str, status: str = Query(...), current_use
     if user_id == current_user["id"]:
         raise HTTPException(status_code=400, detail="Vous ne pouvez pas modifier votre propre statut")
     await db.users.update_one({"id": user_id}, {"$set": {"status": status}})
+    await stats.track("user", user, {**user, "status": status})
     return {"ok": True, "message": f"Utilisateur {'suspendu' if status == 'suspendu' else 'activé'} avec succès"}
 
 
@@ -186,11 +205,10 @@ async def delete_user(user_id: str, current_user: dict = Depends(require_admin))
     if user_id == current_user["id"]:
         raise HTTPException(status_code=400, detail="Vous ne pouvez pas supprimer votre propre compte")
     await db.users.delete_one({"id": user_id})
-    await db.articles.delete_many({"author_id": user_id})
-    await db.properties.delete_many({"author_id": user_id})
-    await db.saved_articles.delete_many({"user_id": user_id})
-    await db.payments.delete_many({"user_id": user_id})
-    return {"ok": True, "message": "Utilisateur et données associées supprimés"}
+    await stats.track("user", before=user)
+    # Owned content is removed in the background
+    job = await job_queue.enqueue("delete_user", {"user_id": user_id}, created_by=current_user["id"])
+    return {"ok": True, "message": "Utilisateur supprimé, suppression des données associées en cours", "job_id": job["id"]}
 
 
 # ─── Articles Management ───────────────────────────────────────────────────────
@@ -234,7 +252,14 @@ async def admin_delete_article(article_id: str, current_user: dict = Depends(req
     if not article:
         raise HTTPException(status_code=404, detail="Article introuvable")
     await db.articles.delete_one({"id": article_id})
-    await db.saved_articles.delete_many({"article_id": article_id})
+    await stats.track("article", before=article)
+    suggest_index.remove("article", article_id)
+    feeds.remove("article", article_id)
+    search_cache.invalidate("article")
+    article_render.invalidate(article_id)
+    scheduled_publisher.discard(article_id)
+    await delete_target_bookmarks("article", article_id)
+    await delete_target_likes("article", article_id)
     return {"ok": True, "message": "Article supprimé"}
 
 
@@ -286,6 +311,9 @@ async def admin_update_property_status(property_id: str, status: str = Query(...
     if not prop:
         raise HTTPException(status_code=404, detail="Annonce introuvable")
     await db.properties.update_one({"id": property_id}, {"$set": {"status": status}})
+    await stats.track("property", prop, {**prop, "status": status})
+    search_cache.invalidate("property")
+    feeds.put("property", {**prop, "status": status})
     return {"ok": True, "message": f"Statut mis à jour vers '{status}'"}
 
 
@@ -295,7 +323,14 @@ async def admin_delete_property(property_id: str, current_user: dict = Depends(r
     if not prop:
         raise HTTPException(status_code=404, detail="Annonce introuvable")
     await db.properties.delete_one({"id": property_id})
-    await db.payments.delete_many({"property_id": property_id})
+    deleted_payments = await db.payments.delete_many({"property_id": property_id})
+    await stats.track("property", before=prop)
+    suggest_index.remove("property", property_id)
+    feeds.remove("property", property_id)
+    search_cache.invalidate("property")
+    await stats.bump(GLOBAL_KEY, {"payments": -deleted_payments.deleted_count})
+    await delete_target_bookmarks("property", property_id)
+    await delete_target_likes("property", property_id)
     return {"ok": True, "message": "Annonce supprimée"}
 
 
@@ -326,59 +361,43 @@ async def admin_delete_payment(payment_id: str, current_user: dict = Depends(req
     if not payment:
         raise HTTPException(status_code=404, detail="Paiement introuvable")
     if payment.get("status") == "en_attente":
-        await db.properties.update_one({"id": payment["property_id"]}, {"$set": {"status": "disponible"}})
+        await set_property_status(payment["property_id"], "disponible")
     await db.payments.delete_one({"id": payment_id})
+    await stats.track("payment", before=payment)
     return {"ok": True, "message": "Paiement supprimé"}
 
 
 # ─── Export CSV ────────────────────────────────────────────────────────────────
 
-@router.get("/export/users")
-async def export_users_csv(current_user: dict = Depends(require_admin)):
-    users = await db.users.find({}, {"_id": 0, "hashed_password": 0}).to_list(10000)
-    csv_lines = ["id,username,email,role,phone,country,status,created_at"]
-    for u in users:
-        csv_lines.append(f'"{u.get("id", "")}","{u.get("username", "")}","{u.get("email", "")}","{u.get("role", "")}","{u.get("phone", "")}","{u.get("country", "")}","{u.get("status", "actif")}","{u.get("created_at", "")}"')
-    return Response(content="\n".join(csv_lines), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=utilisateurs.csv"})
-
-
-@router.get("/export/articles")
-async def export_articles_csv(current_user: dict = Depends(require_admin)):
-    articles = await db.articles.find({}, {"_id": 0, "content": 0}).to_list(10000)
-    csv_lines = ["id,title,category,author_id,published_at,views"]
-    for a in articles:
-        title = a.get("title", "").replace('"', '""')
-        csv_lines.append(f'"{a.get("id", "")}","{title}","{a.get("category", "")}","{a.get("author_id", "")}","{a.get("published_at", "")}",{a.get("views", 0)}')
-    return Response(content="\n".join(csv_lines), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=articles.csv"})
-
-
-@router.get("/export/properties")
-async def export_properties_csv(current_user: dict = Depends(require_admin)):
-    props = await db.properties.find({}, {"_id": 0, "description": 0, "images": 0}).to_list(10000)
-    csv_lines = ["id,title,type,price,currency,city,status,author_id,created_at"]
-    for p in props:
-        title = p.get("title", "").replace('"', '""')
-        csv_lines.append(f'"{p.get("id", "")}","{title}","{p.get("type", "")}",{p.get("price", 0)},"{p.get("currency", "GNF")}","{p.get("city", "")}","{p.get("status", "")}","{p.get("author_id", "")}","{p.get("created_at", "")}"')
-    return Response(content="\n".join(csv_lines), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=annonces.csv"})
-
-
-@router.get("/export/payments")
-async def export_payments_csv(current_user: dict = Depends(require_admin)):
-    payments = await db.payments.find({}, {"_id": 0}).to_list(10000)
-    csv_lines = ["id,reference,property_title,user_email,amount,currency,method,status,created_at"]
-    for p in payments:
-        title = p.get("property_title", "").replace('"', '""')
-        csv_lines.append(f'"{p.get("id", "")}","{p.get("reference", "")}","{title}","{p.get("user_email", "")}",{p.get("amount", 0)},"{p.get("currency", "GNF")}","{p.get("method", "")}","{p.get("status", "")}","{p.get("created_at", "")}"')
-    return Response(content="\n".join(csv_lines), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=paiements.csv"})
-
-
-@router.get("/export/role-requests")
-async def export_role_requests_csv(current_user: dict = Depends(require_admin)):
-    notifs = await db.admin_notifications.find({}, {"_id": 0}).to_list(10000)
-    csv_lines = ["id,user_username,user_email,requested_role,status,created_at,processed_at"]
-    for n in notifs:
-        csv_lines.append(f'"{n.get("id", "")}","{n.get("user_username", "")}","{n.get("user_email", "")}","{n.get("requested_role", "")}","{n.get("status", "")}","{n.get("created_at", "")}","{n.get("processed_at", "")}"')
-    return Response(content="\n".join(csv_lines), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=demandes_roles.csv"})
+@router.get("/export/{name}")
+async def export_data(
+    name: str,
+    format: str = Query("csv", pattern="^(csv|parquet|arrow)$"),
+    fields: str = Query("", max_length=500),
+    since: str = Query("", max_length=40),
+    gzip: bool = Query(False),
+    current_user: dict = Depends(require_admin),
+):
+    """Stream an export.
+
+    ?format=parquet|arrow gives typed columnar files, ?fields=id,email selects
+    columns, ?since=<ISO date> only exports rows created since then and
+    ?gzip=true compresses CSV output.
+    """
+    spec = get_export(name)
+    columns = select_columns(spec, fields)
+    query = export_query(since)
+    media_type, ext = FORMATS[format]
+    if format == "csv":
+        body = stream_csv(spec, columns, compress=gzip, query=query)
+        if gzip:
+            media_type, ext = "application/gzip", "csv.gz"
+    else:
+        body = stream_columnar(spec, columns, format, query=query)
+    return StreamingResponse(
+        body, media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={spec['filename']}.{ext}"},
+    )
 
 
 # ─── Notifications & Role Approval ─────────────────────────────────────────────
@@ -430,6 +449,7 @@ async def process_role_request(notification_id: str, data: RoleRequestAction, cu
             {"id": notification["user_id"]},
             {"$set": {"role": notification["requested_role"], "status": "actif", "requested_role": None}}
         )
+        await stats.track("user", user, {**user, "status": "actif"})
         await db.admin_notifications.update_one({"id": notification_id}, {"$set": {"status": "approved", "processed_at": now}})
         role_label = "Auteur" if notification["requested_role"] == "auteur" else "Agent immobilier"
         await db.user_notifications.insert_one({
@@ -452,6 +472,7 @@ async def process_role_request(notification_id: str, data: RoleRequestAction, cu
             {"id": notification["user_id"]},
             {"$set": {"status": "rejected", "requested_role": None}}
         )
+        await stats.track("user", user, {**user, "status": "rejected"})
         await db.admin_notifications.update_one({"id": notification_id}, {"$set": {"status": "rejected", "processed_at": now}})
         await db.user_notifications.insert_one({
             "id": str(uuid.uuid4()), "user_id": notification["user_id"],
@@ -485,6 +506,290 @@ async def delete_role_request(notification_id: str, current_user: dict = Depends
     return {"ok": True, "message": "Demande supprimée"}
 
 
+# ─── Bulk Actions ──────────────────────────────────────────────────────────────
+# Each endpoint takes a list of ids and/or a filter, loads every target with a
+# single query, applies the changes with one unordered bulk_write and reports
+# an outcome per item: updated, deleted, unchanged, skipped, not_found or error.
+
+MAX_BULK = 1000
+USER_STATUSES = ("actif", "active", "suspendu", "suspended", "pending_verification")
+USER_ROLES = ("visiteur", "auteur", "agent", "admin")
+ARTICLE_STATUSES = ("draft", "published", "scheduled")
+BULK_FILTERS = {
+    "users": {"role", "status", "country"},
+    "articles": {"status", "category", "author_id"},
+    "properties": {"status", "type", "city", "author_id"},
+    "admin_notifications": {"status", "requested_role"},
+}
+
+
+async def _bulk_targets(collection: str, data: BulkAction) -> List[dict]:
+    unknown = set(data.filter) - BULK_FILTERS[collection]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Filtres non autorisés: {', '.join(sorted(unknown))}")
+    if not data.ids and not data.filter:
+        raise HTTPException(status_code=400, detail="Aucune cible: fournissez des ids ou un filtre")
+    if len(data.ids) > MAX_BULK:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_BULK} éléments par action groupée")
+    query = dict(data.filter)
+    if data.ids:
+        query["id"] = {"$in": data.ids}
+    targets = await db[collection].find(query, {"_id": 0}).to_list(MAX_BULK + 1)
+    if len(targets) > MAX_BULK:
+        raise HTTPException(status_code=400, detail=f"Le filtre sélectionne plus de {MAX_BULK} éléments")
+    return targets
+
+
+async def _bulk_write(collection: str, ops: List[tuple]) -> Dict[str, str]:
+    """Run (id, operation) pairs in one unordered bulk_write; returns the errors by id."""
+    if not ops:
+        return {}
+    try:
+        await db[collection].bulk_write([op for _, op in ops], ordered=False)
+    except BulkWriteError as e:
+        return {ops[err["index"]][0]: err.get("errmsg", "Erreur") for err in e.details.get("writeErrors", [])}
+    return {}
+
+
+class _BulkOutcome:
+    def __init__(self, data: BulkAction, targets: List[dict]):
+        self.action = data.action
+        self.order = list(dict.fromkeys(data.ids)) if data.ids else [t["id"] for t in targets]
+        found = {t["id"] for t in targets}
+        self.items: Dict[str, tuple] = {i: ("not_found", "") for i in self.order if i not in found}
+
+    def set(self, item_id: str, status: str, detail: str = ""):
+        self.items[item_id] = (status, detail)
+
+    def apply_errors(self, errors: Dict[str, str]):
+        for item_id, message in errors.items():
+            self.set(item_id, "error", message)
+
+    def ok(self, status: str) -> List[str]:
+        return [i for i in self.order if self.items.get(i, ("",))[0] == status]
+
+    def response(self) -> dict:
+        results = [{"id": i, "status": self.items[i][0], "detail": self.items[i][1]} for i in self.order if i in self.items]
+        summary: Dict[str, int] = {}
+        for r in results:
+            summary[r["status"]] = summary.get(r["status"], 0) + 1
+        return {"action": self.action, "total": len(results), "summary": summary, "results": results}
+
+
+@router.post("/bulk/users")
+async def bulk_users(data: BulkAction, current_user: dict = Depends(require_admin)):
+    """Actions: status (value = statut), role (value = rôle), verify, delete."""
+    if data.action == "status" and data.value not in USER_STATUSES:
+        raise HTTPException(status_code=400, detail="Statut invalide")
+    if data.action == "role" and data.value not in USER_ROLES:
+        raise HTTPException(status_code=400, detail="Rôle invalide")
+    if data.action not in ("status", "role", "verify", "delete"):
+        raise HTTPException(status_code=400, detail="Action invalide")
+    users = await _bulk_targets("users", data)
+    outcome = _BulkOutcome(data, users)
+    now = datetime.now(timezone.utc).isoformat()
+
+    ops, changes = [], {}
+    for user in users:
+        uid = user["id"]
+        if uid == current_user["id"]:
+            outcome.set(uid, "skipped", "Votre propre compte ne peut pas être modifié")
+            continue
+        if data.action == "delete":
+            ops.append((uid, DeleteOne({"id": uid})))
+            changes[uid] = (user, None)
+            outcome.set(uid, "deleted")
+            continue
+        if data.action == "verify":
+            updates = {"email_verified": True, "verified_at": now}
+            if user.get("status") == "pending_verification":
+                updates["status"] = "active"
+            if user.get("email_verified"):
+                updates = {}
+        else:
+            updates = {data.action: data.value} if user.get(data.action) != data.value else {}
+        if not updates:
+            outcome.set(uid, "unchanged")
+            continue
+        ops.append((uid, UpdateOne({"id": uid}, {"$set": updates})))
+        changes[uid] = (user, {**user, **updates})
+        outcome.set(uid, "updated")
+
+    outcome.apply_errors(await _bulk_write("users", ops))
+    done = outcome.ok("deleted") + outcome.ok("updated")
+    await stats.track_many("user", [changes[uid] for uid in done])
+    deleted = outcome.ok("deleted")
+    if deleted:
+        # Owned content of every deleted account is removed by one background job
+        job = await job_queue.enqueue("delete_user", {"user_ids": deleted}, created_by=current_user["id"])
+        return {**outcome.response(), "job_id": job["id"]}
+    return outcome.response()
+
+
+@router.post("/bulk/articles")
+async def bulk_articles(data: BulkAction, current_user: dict = Depends(require_admin)):
+    """Actions: status (value = draft|published|scheduled), delete."""
+    if data.action == "status" and data.value not in ARTICLE_STATUSES:
+        raise HTTPException(status_code=400, detail="Statut invalide")
+    if data.action not in ("status", "delete"):
+        raise HTTPException(status_code=400, detail="Action invalide")
+    articles = await _bulk_targets("articles", data)
+    outcome = _BulkOutcome(data, articles)
+    now = datetime.now(timezone.utc).isoformat()
+
+    ops, changes = [], {}
+    for article in articles:
+        aid = article["id"]
+        if data.action == "delete":
+            ops.append((aid, DeleteOne({"id": aid})))
+            changes[aid] = (article, None)
+            outcome.set(aid, "deleted")
+            continue
+        if article.get("status") == data.value:
+            outcome.set(aid, "unchanged")
+            continue
+        updates = {"status": data.value, "updated_at": now}
+        if data.value == "published" and not article.get("published_at"):
+            updates["published_at"] = now
+        ops.append((aid, UpdateOne({"id": aid}, {"$set": updates})))
+        changes[aid] = (article, {**article, **updates})
+        outcome.set(aid, "updated")
+
+    outcome.apply_errors(await _bulk_write("articles", ops))
+    deleted, updated = outcome.ok("deleted"), outcome.ok("updated")
+    await stats.track_many("article", [changes[aid] for aid in deleted + updated])
+    for aid in deleted:
+        suggest_index.remove("article", aid)
+        feeds.remove("article", aid)
+        scheduled_publisher.discard(aid)
+        article_render.invalidate(aid)
+    for aid in updated:
+        if not changes[aid][0].get("published_at") and changes[aid][1].get("published_at"):
+            metrics.record("articles.published", {"category": changes[aid][1].get("category")})
+        suggest_index.put("article", changes[aid][1])
+        feeds.put("article", changes[aid][1])
+        scheduled_publisher.track(changes[aid][1])
+        article_render.invalidate(aid)
+    if deleted or updated:
+        search_cache.invalidate("article")
+    if deleted:
+        await delete_targets_bookmarks("article", deleted)
+        await delete_targets_likes("article", deleted)
+    if deleted or updated:
+        await manager.broadcast_all({"type": "content_update", "content_type": "article", "action": "bulk", "count": len(deleted) + len(updated)})
+    return outcome.response()
+
+
+@router.post("/bulk/properties")
+async def bulk_properties(data: BulkAction, current_user: dict = Depends(require_admin)):
+    """Actions: status (value = statut), verify (value = true|false), delete."""
+    if data.action == "status" and data.value not in PROPERTY_STATUSES + ["loue"]:
+        raise HTTPException(status_code=400, detail="Statut invalide")
+    if data.action not in ("status", "verify", "delete"):
+        raise HTTPException(status_code=400, detail="Action invalide")
+    props = await _bulk_targets("properties", data)
+    outcome = _BulkOutcome(data, props)
+
+    ops, changes = [], {}
+    for prop in props:
+        pid = prop["id"]
+        if data.action == "delete":
+            ops.append((pid, DeleteOne({"id": pid})))
+            changes[pid] = (prop, None)
+            outcome.set(pid, "deleted")
+            continue
+        if data.action == "verify":
+            updates = {"is_verified": data.value.lower() != "false"}
+        else:
+            updates = {"status": data.value}
+        if all(prop.get(k) == v for k, v in updates.items()):
+            outcome.set(pid, "unchanged")
+            continue
+        ops.append((pid, UpdateOne({"id": pid}, {"$set": updates})))
+        changes[pid] = (prop, {**prop, **updates})
+        outcome.set(pid, "updated")
+
+    outcome.apply_errors(await _bulk_write("properties", ops))
+    deleted, updated = outcome.ok("deleted"), outcome.ok("updated")
+    await stats.track_many("property", [changes[pid] for pid in deleted + updated])
+    for pid in deleted:
+        suggest_index.remove("property", pid)
+        feeds.remove("property", pid)
+    for pid in updated:
+        feeds.put("property", changes[pid][1])
+    if deleted or updated:
+        search_cache.invalidate("property")
+    if deleted:
+        deleted_payments = await db.payments.delete_many({"property_id": {"$in": deleted}})
+        await stats.bump(GLOBAL_KEY, {"payments": -deleted_payments.deleted_count})
+        await delete_targets_bookmarks("property", deleted)
+        await delete_targets_likes("property", deleted)
+    if deleted or updated:
+        await manager.broadcast_all({"type": "content_update", "content_type": "property", "action": "bulk", "count": len(deleted) + len(updated)})
+    return outcome.response()
+
+
+@router.post("/bulk/role-requests")
+async def bulk_role_requests(data: BulkAction, current_user: dict = Depends(require_admin)):
+    """Actions: approve, reject (pending requests only)."""
+    if data.action not in ("approve", "reject"):
+        raise HTTPException(status_code=400, detail="Action invalide")
+    notifications = await _bulk_targets("admin_notifications", data)
+    outcome = _BulkOutcome(data, notifications)
+    now = datetime.now(timezone.utc).isoformat()
+    approve = data.action == "approve"
+
+    pending = [n for n in notifications if n.get("status") == "pending"]
+    for n in notifications:
+        if n.get("status") != "pending":
+            outcome.set(n["id"], "skipped", "Cette demande a déjà été traitée")
+    user_ids = list({n["user_id"] for n in pending})
+    users = {u["id"]: u for u in await db.users.find({"id": {"$in": user_ids}}, {"_id": 0}).to_list(len(user_ids) or 1)}
+
+    user_ops, notif_ops, targets = [], [], []
+    for n in pending:
+        user = users.get(n["user_id"])
+        if not user:
+            outcome.set(n["id"], "error", "Utilisateur introuvable")
+            continue
+        if approve:
+            updates = {"role": n["requested_role"], "status": "actif", "requested_role": None}
+        else:
+            updates = {"status": "rejected", "requested_role": None}
+        user_ops.append((n["id"], UpdateOne({"id": user["id"]}, {"$set": updates})))
+        notif_ops.append((n["id"], UpdateOne({"id": n["id"]}, {"$set": {"status": "approved" if approve else "rejected", "processed_at": now}})))
+        targets.append((n, user, updates))
+        outcome.set(n["id"], "updated")
+
+    outcome.apply_errors(await _bulk_write("users", user_ops))
+    done = set(outcome.ok("updated"))
+    notif_ops = [op for op in notif_ops if op[0] in done]
+    outcome.apply_errors(await _bulk_write("admin_notifications", notif_ops))
+    targets = [t for t in targets if t[0]["id"] in done]
+    await stats.track_many("user", [(user, {**user, **updates}) for _, user, updates in targets])
+
+    user_notifications, events = [], []
+    for n, user, _ in targets:
+        if approve:
+            role_label = "Auteur" if n["requested_role"] == "auteur" else "Agent immobilier"
+            message = f"Votre demande de rôle {role_label} a été approuvée par le groupe MatrixNews. Vous avez maintenant accès à toutes les fonctionnalités."
+            event = {"type": "role_update", "action": "approved", "role": n["requested_role"], "status": "actif",
+                     "message": f"Votre demande de rôle {role_label} a été approuvée !"}
+        else:
+            message = "Votre demande de rôle professionnel a été refusée par le groupe MatrixNews. Votre accès a été suspendu."
+            event = {"type": "role_update", "action": "rejected", "status": "rejected",
+                     "message": "Votre demande a été refusée. Votre accès a été suspendu."}
+        user_notifications.append({
+            "id": str(uuid.uuid4()), "user_id": user["id"], "type": "role_approved" if approve else "role_rejected",
+            "message": message, "is_read": False, "created_at": now,
+        })
+        events.append(manager.send_to_user(user["id"], event))
+    if user_notifications:
+        await db.user_notifications.insert_many(user_notifications)
+    await asyncio.gather(*events, return_exceptions=True)
+    return outcome.response()
+
+
 # ─── Price Per m² Management ────────────────────────────────────────────────────
 
 @router.get("/price-references")
@@ -507,9 +812,11 @@ async def set_price_reference(data: dict, current_user: dict = Depends(require_a
     await db.price_references.update_one(key, {"$set": {
         **key,
         "price_per_sqm": float(price_per_sqm),
+        "source": "manual",
         "updated_at": datetime.now(timezone.utc).isoformat(),
         "updated_by": current_user["id"],
     }}, upsert=True)
+    await reference_bundle.bump()
     return {"ok": True}
 
 
@@ -521,4 +828,5 @@ async def delete_price_reference(city: str = Query(""), commune: str = Query("")
     if quartier:
         key["quartier"] = quartier
     await db.price_references.delete_one(key)
+    await reference_bundle.bump()
     return {"ok": True}
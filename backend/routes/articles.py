@@ -1,49 +1,35 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response
 from typing import List
 from database import db
-from config import CATEGORIES
+from config import CATEGORIES, SITE_URL
 from models.article import (
-    ArticleCreate, ArticleUpdate, ArticleOut,
+    ArticleCreate, ArticleUpdate, ArticleAutosave, ArticleOut,
     PaginatedArticles, SavedArticleOut
 )
 from middleware.auth import get_current_user, require_author
-from utils import sanitize, sanitize_html, sanitize_url
+from utils import sanitize, sanitize_url, etag_matches
 from routes.messages import manager
-from pymongo import ReturnDocument
+from services.view_counter import view_counter
+from services.unique_viewers import visitor_fingerprint
+from services.likes import toggle_like as toggle_target_like, delete_target_likes
+from services.bookmarks import toggle_bookmark, is_bookmarked, list_bookmarks, delete_target_bookmarks
+from services.stats import stats, author_key
+from services.metrics import metrics
+from services.search import text_query, search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.scheduler import scheduled_publisher
+from services.autosave import autosave_buffer, AutosaveConflict, AutosavePending
+from services.content_pipeline import content_pipeline, LIST_PROJECTION
+from services.article_render import article_render
 from datetime import datetime, timezone
 import uuid
-import re
 import math
 
 router = APIRouter(tags=["articles"])
 
-
-def slugify(text):
-    text = text.lower().strip()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[\s_-]+', '-', text)
-    return text[:100]
-
-
-def compute_word_count(content, blocks):
-    text = ""
-    if blocks:
-        for b in blocks:
-            d = b if isinstance(b, dict) else b.dict()
-            t = d.get("type", "")
-            data = d.get("data", {})
-            if t == "text":
-                text += " " + re.sub(r'<[^>]*>', '', data.get("content", ""))
-            elif t == "quote":
-                text += " " + data.get("text", "")
-            elif t == "alert":
-                text += " " + data.get("content", "")
-            elif t == "image":
-                text += " " + data.get("caption", "")
-    elif content:
-        text = re.sub(r'<[^>]*>', '', content)
-    words = len(text.split())
-    return words, max(1, math.ceil(words / 200))
+PAGE_CACHE_CONTROL = "public, max-age=300, must-revalidate"
 
 
 # ─── Public Routes ─────────────────────────────────────────────────────────────
@@ -58,17 +44,27 @@ async def list_articles(
     query = {"status": "published"}
     if category:
         query["category"] = category
-    if search:
-        regex = {"$regex": search.strip(), "$options": "i"}
-        query["$or"] = [{"title": regex}, {"content": regex}]
-
-    total = await db.articles.count_documents(query)
-    pages = max(1, math.ceil(total / limit))
-    skip = (page - 1) * limit
-    articles = await db.articles.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    return PaginatedArticles(
-        articles=[ArticleOut(**a) for a in articles],
-        total=total, page=page, pages=pages
+    sort = [("created_at", -1)]
+    projection = dict(LIST_PROJECTION)
+
+    async def fetch():
+        total = await db.articles.count_documents(query)
+        pages = max(1, math.ceil(total / limit))
+        skip = (page - 1) * limit
+        articles = await db.articles.find(query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
+        return PaginatedArticles(
+            articles=[ArticleOut(**a) for a in articles],
+            total=total, page=page, pages=pages
+        )
+
+    if not search.strip():
+        return await fetch()
+    # Ranked full-text search (services/search.py); repeated searches come from the result cache
+    query.update(text_query(search))
+    projection["score"] = {"$meta": "textScore"}
+    sort = [("score", {"$meta": "textScore"}), ("created_at", -1)]
+    return await search_cache.get_or_compute(
+        "articles", ["article"], search, {"category": category, "page": page, "limit": limit}, fetch,
     )
 
 
@@ -82,7 +78,7 @@ async def list_articles_by_category(
     total = await db.articles.count_documents(query)
     pages = max(1, math.ceil(total / limit))
     skip = (page - 1) * limit
-    articles = await db.articles.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    articles = await db.articles.find(query, LIST_PROJECTION).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
     return PaginatedArticles(
         articles=[ArticleOut(**a) for a in articles],
         total=total, page=page, pages=pages
@@ -90,52 +86,62 @@ async def list_articles_by_category(
 
 
 @router.get("/articles/{article_id}", response_model=ArticleOut)
-async def get_article(article_id: str):
+async def get_article(article_id: str, request: Request):
+    if autosave_buffer.pending(article_id):
+        await autosave_buffer.flush(article_id)  # the editor reloads what it just typed
     article = await db.articles.find_one({"id": article_id}, {"_id": 0})
     if not article:
         raise HTTPException(status_code=404, detail="Article introuvable")
-    result = await db.articles.find_one_and_update(
-        {"id": article_id}, {"$inc": {"views": 1}},
-        projection={"_id": 0, "views": 1}, return_document=ReturnDocument.AFTER
-    )
-    await manager.broadcast_all({"type": "view_update", "content_type": "article", "id": article_id, "views": result["views"]})
+    view_counter.record("article", article_id, visitor=visitor_fingerprint(request))
+    article["views"] = article.get("views", 0) + view_counter.pending_for("article", article_id)
     return ArticleOut(**article)
 
 
+@router.get("/articles/{article_id}/page")
+async def get_article_page(article_id: str, request: Request):
+    """Server-rendered HTML of a published article, for crawlers and link previews
+    (the front proxy sends their user agents here). Served from memory: no view is counted."""
+    if not SITE_URL:
+        raise HTTPException(status_code=503, detail="SITE_URL non configure")
+    page = await article_render.get(article_id)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Article introuvable")
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": f'"{page.etag}-gzip"' if use_gzip else f'"{page.etag}"',
+        "Cache-Control": PAGE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), page.etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=page.gzipped, media_type="text/html; charset=utf-8", headers=headers)
+    return Response(content=page.body, media_type="text/html; charset=utf-8", headers=headers)
+
+
 # ─── Protected Routes ──────────────────────────────────────────────────────────
 
 @router.get("/my-articles", response_model=List[ArticleOut])
 async def get_my_articles(current_user: dict = Depends(require_author)):
     articles = await db.articles.find(
-        {"author_id": current_user["id"]}, {"_id": 0}
+        {"author_id": current_user["id"]}, LIST_PROJECTION
     ).sort("created_at", -1).to_list(200)
     return [ArticleOut(**a) for a in articles]
 
 
 @router.get("/my-articles/stats")
-async def get_my_stats(current_user: dict = Depends(require_author)):
-    uid = current_user["id"]
-    pipeline_total = [{"$match": {"author_id": uid}}, {"$count": "total"}]
-    pipeline_published = [{"$match": {"author_id": uid, "status": "published"}}, {"$count": "total"}]
-    pipeline_drafts = [{"$match": {"author_id": uid, "status": "draft"}}, {"$count": "total"}]
-    pipeline_scheduled = [{"$match": {"author_id": uid, "status": "scheduled"}}, {"$count": "total"}]
-    pipeline_views = [{"$match": {"author_id": uid}}, {"$group": {"_id": None, "total": {"$sum": "$views"}}}]
-    pipeline_likes = [{"$match": {"author_id": uid}}, {"$group": {"_id": None, "total": {"$sum": "$likes_count"}}}]
-
-    total = await db.articles.aggregate(pipeline_total).to_list(1)
-    published = await db.articles.aggregate(pipeline_published).to_list(1)
-    drafts = await db.articles.aggregate(pipeline_drafts).to_list(1)
-    scheduled = await db.articles.aggregate(pipeline_scheduled).to_list(1)
-    views = await db.articles.aggregate(pipeline_views).to_list(1)
-    likes = await db.articles.aggregate(pipeline_likes).to_list(1)
-
+async def get_my_stats(refresh: bool = Query(False), current_user: dict = Depends(require_author)):
+    # Forced recomputation is reserved to admins; authors read the maintained counters
+    s = await stats.get(author_key(current_user["id"]), refresh=refresh and current_user.get("role") == "admin")
     return {
-        "total": total[0]["total"] if total else 0,
-        "published": published[0]["total"] if published else 0,
-        "drafts": drafts[0]["total"] if drafts else 0,
-        "scheduled": scheduled[0]["total"] if scheduled else 0,
-        "total_views": views[0]["total"] if views else 0,
-        "total_likes": likes[0]["total"] if likes else 0,
+        "total": s.get("articles", 0),
+        "published": s.get("articles_published", 0),
+        "drafts": s.get("articles_draft", 0),
+        "scheduled": s.get("articles_scheduled", 0),
+        "total_views": s.get("article_views", 0),
+        "unique_viewers": s.get("unique_viewers", 0),
+        "total_likes": s.get("article_likes", 0),
     }
 
 
@@ -143,22 +149,22 @@ async def get_my_stats(current_user: dict = Depends(require_author)):
 async def create_article(data: ArticleCreate, current_user: dict = Depends(require_author)):
     if data.category and data.category not in CATEGORIES:
         raise HTTPException(status_code=400, detail=f"Categorie invalide: {data.category}")
+    if data.status == "scheduled" and not data.scheduled_at:
+        raise HTTPException(status_code=400, detail="Date de programmation requise")
     now = datetime.now(timezone.utc).isoformat()
-    word_count, reading_time = compute_word_count(data.content, data.blocks)
-    slug = data.slug if data.slug else slugify(data.title)
-    blocks_raw = [b.dict() if hasattr(b, 'dict') else b for b in data.blocks]
+    title = sanitize(data.title)
+    # Sanitized content, slug, word count, excerpt... (services/content_pipeline.py)
+    derived = await content_pipeline.run(title, data.slug, data.content, [b.model_dump() for b in data.blocks])
     article = {
         "id": str(uuid.uuid4()),
-        "title": sanitize(data.title),
+        "title": title,
         "subtitle": sanitize(data.subtitle) if data.subtitle else "",
-        "content": sanitize_html(data.content) if data.content else "",
-        "blocks": blocks_raw,
+        **derived,
         "category": data.category,
         "tags": [sanitize(t) for t in data.tags[:10]],
         "image_url": sanitize_url(data.image_url),
         "image_alt": sanitize(data.image_alt) if data.image_alt else "",
         "is_breaking": data.is_breaking,
-        "slug": slug,
         "meta_title": sanitize(data.meta_title) if data.meta_title else "",
         "meta_description": sanitize(data.meta_description) if data.meta_description else "",
         "status": data.status if data.status in ("draft", "published", "scheduled") else "draft",
@@ -167,15 +173,20 @@ async def create_article(data: ArticleCreate, current_user: dict = Depends(requi
         "author_name": current_user["username"],
         "author_username": current_user["username"],
         "views": 0,
-        "word_count": word_count,
-        "reading_time": reading_time,
         "likes_count": 0,
-        "liked_by": [],
         "created_at": now,
         "published_at": now if data.status == "published" else None,
         "updated_at": now,
     }
     await db.articles.insert_one(article)
+    await stats.track("article", after=article)
+    suggest_index.put("article", article)
+    feeds.put("article", article)
+    search_cache.invalidate("article")
+    scheduled_publisher.track(article)
+    metrics.record("articles.created", {"category": article["category"]})
+    if article["status"] == "published":
+        metrics.record("articles.published", {"category": article["category"]})
     del article["_id"]
     if data.status == "published":
         await manager.broadcast_all({"type": "content_update", "content_type": "article", "action": "created", "title": sanitize(data.title)})
@@ -189,16 +200,13 @@ async def update_article(article_id: str, data: ArticleUpdate, current_user: dic
         raise HTTPException(status_code=404, detail="Article introuvable")
     if current_user.get("role") != "admin" and article["author_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Non autorise")
+    autosave_buffer.discard(article_id)  # the full save supersedes any pending draft
     now = datetime.now(timezone.utc).isoformat()
-    updates = {"updated_at": now}
+    updates = {"updated_at": now, "draft_version": (article.get("draft_version") or 0) + 1}
     if data.title is not None:
         updates["title"] = sanitize(data.title)
     if data.subtitle is not None:
         updates["subtitle"] = sanitize(data.subtitle)
-    if data.content is not None:
-        updates["content"] = sanitize_html(data.content)
-    if data.blocks is not None:
-        updates["blocks"] = [b.dict() if hasattr(b, 'dict') else b for b in data.blocks]
     if data.category is not None:
         if data.category not in CATEGORIES:
             raise HTTPException(status_code=400, detail="Categorie invalide")
@@ -211,8 +219,6 @@ async def update_article(article_id: str, data: ArticleUpdate, current_user: dic
         updates["image_alt"] = sanitize(data.image_alt)
     if data.is_breaking is not None:
         updates["is_breaking"] = data.is_breaking
-    if data.slug is not None:
-        updates["slug"] = data.slug
     if data.meta_title is not None:
         updates["meta_title"] = sanitize(data.meta_title)
     if data.meta_description is not None:
@@ -223,50 +229,58 @@ async def update_article(article_id: str, data: ArticleUpdate, current_user: dic
             updates["published_at"] = now
     if data.scheduled_at is not None:
         updates["scheduled_at"] = data.scheduled_at
-
-    # Recompute word count
-    new_content = updates.get("content", article.get("content", ""))
-    new_blocks = updates.get("blocks", article.get("blocks", []))
-    wc, rt = compute_word_count(new_content, new_blocks)
-    updates["word_count"] = wc
-    updates["reading_time"] = rt
+    if updates.get("status", article.get("status")) == "scheduled" and not updates.get("scheduled_at", article.get("scheduled_at")):
+        raise HTTPException(status_code=400, detail="Date de programmation requise")
+
+    # Derived fields, skipped when title, slug, content and blocks are unchanged
+    updates.update(await content_pipeline.run(
+        updates.get("title", article.get("title", "")),
+        data.slug if data.slug is not None else article.get("slug", ""),
+        data.content if data.content is not None else article.get("content", ""),
+        [b.model_dump() for b in data.blocks] if data.blocks is not None else article.get("blocks", []),
+        previous=article,
+    ))
 
     await db.articles.update_one({"id": article_id}, {"$set": updates})
     updated = await db.articles.find_one({"id": article_id}, {"_id": 0})
+    await stats.track("article", article, updated)
+    suggest_index.put("article", updated)
+    feeds.put("article", updated)
+    search_cache.invalidate("article")
+    article_render.invalidate(article_id)
+    scheduled_publisher.track(updated)
+    if "published_at" in updates:
+        metrics.record("articles.published", {"category": updated.get("category")})
     if updates.get("status") == "published":
         await manager.broadcast_all({"type": "content_update", "content_type": "article", "action": "updated"})
     return ArticleOut(**updated)
 
 
-@router.put("/articles/{article_id}/autosave")
-async def autosave_article(article_id: str, data: ArticleUpdate, current_user: dict = Depends(require_author)):
-    article = await db.articles.find_one({"id": article_id}, {"_id": 0})
-    if not article:
+@router.patch("/articles/{article_id}/autosave")
+async def autosave_article(article_id: str, data: ArticleAutosave, current_user: dict = Depends(require_author)):
+    """Block-level draft patch against `base_version`; writes are coalesced (services/autosave.py)."""
+    draft = await autosave_buffer.get(article_id)
+    if draft is None:
         raise HTTPException(status_code=404, detail="Article introuvable")
-    if current_user.get("role") != "admin" and article["author_id"] != current_user["id"]:
+    if current_user.get("role") != "admin" and draft.article["author_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Non autorise")
-    now = datetime.now(timezone.utc).isoformat()
-    updates = {"updated_at": now}
-    if data.title is not None:
-        updates["title"] = sanitize(data.title)
-    if data.subtitle is not None:
-        updates["subtitle"] = sanitize(data.subtitle)
-    if data.content is not None:
-        updates["content"] = sanitize_html(data.content)
-    if data.blocks is not None:
-        updates["blocks"] = [b.dict() if hasattr(b, 'dict') else b for b in data.blocks]
-    if data.category is not None:
-        updates["category"] = data.category
-    if data.tags is not None:
-        updates["tags"] = [sanitize(t) for t in data.tags[:10]]
-    if data.image_url is not None:
-        updates["image_url"] = sanitize_url(data.image_url)
-    if data.meta_title is not None:
-        updates["meta_title"] = sanitize(data.meta_title)
-    if data.meta_description is not None:
-        updates["meta_description"] = sanitize(data.meta_description)
-    await db.articles.update_one({"id": article_id}, {"$set": updates})
-    return {"ok": True, "saved_at": now}
+    if data.category is not None and data.category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail="Categorie invalide")
+    try:
+        draft = await autosave_buffer.apply(draft, data)
+    except AutosaveConflict as e:
+        headers = {"X-Draft-Version": str(e.version)}
+        detail = "Article modifie ailleurs depuis votre derniere sauvegarde"
+        if e.lost is not None:
+            headers["X-Draft-Lost-Version"] = str(e.lost)
+            detail = "Article modifie ailleurs: vos dernieres modifications n'ont pas ete enregistrees"
+        raise HTTPException(status_code=409, detail=detail, headers=headers)
+    except AutosavePending as e:
+        raise HTTPException(
+            status_code=503, detail="Brouillon en cours d'enregistrement, reessayez",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return {"ok": True, "version": draft.version, "saved_at": datetime.now(timezone.utc).isoformat()}
 
 
 @router.delete("/articles/{article_id}")
@@ -277,7 +291,14 @@ async def delete_article(article_id: str, current_user: dict = Depends(require_a
     if current_user.get("role") != "admin" and article["author_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Non autorise")
     await db.articles.delete_one({"id": article_id})
-    await db.saved_articles.delete_many({"article_id": article_id})
+    await stats.track("article", before=article)
+    suggest_index.remove("article", article_id)
+    feeds.remove("article", article_id)
+    search_cache.invalidate("article")
+    article_render.invalidate(article_id)
+    scheduled_publisher.discard(article_id)
+    await delete_target_bookmarks("article", article_id)
+    await delete_target_likes("article", article_id)
     return {"message": "Article supprime"}
 
 
@@ -288,28 +309,21 @@ async def save_article(article_id: str, current_user: dict = Depends(get_current
     article = await db.articles.find_one({"id": article_id}, {"_id": 0, "title": 1, "category": 1, "author_name": 1, "image_url": 1})
     if not article:
         raise HTTPException(status_code=404, detail="Article introuvable")
-    existing = await db.saved_articles.find_one({"user_id": current_user["id"], "article_id": article_id})
-    if existing:
-        await db.saved_articles.delete_one({"user_id": current_user["id"], "article_id": article_id})
-        return {"action": "unsaved"}
-    await db.saved_articles.insert_one({
-        "id": str(uuid.uuid4()), "user_id": current_user["id"], "article_id": article_id,
+    saved = await toggle_bookmark(current_user["id"], "article", article_id, {
         "title": article.get("title", ""), "category": article.get("category", ""),
         "author_name": article.get("author_name", ""), "image_url": article.get("image_url"),
-        "saved_at": datetime.now(timezone.utc).isoformat()
     })
-    return {"action": "saved"}
+    return {"action": "saved" if saved else "unsaved"}
 
 
 @router.get("/saved-articles/{article_id}/status")
 async def get_saved_status(article_id: str, current_user: dict = Depends(get_current_user)):
-    existing = await db.saved_articles.find_one({"user_id": current_user["id"], "article_id": article_id})
-    return {"is_saved": existing is not None}
+    return {"is_saved": await is_bookmarked(current_user["id"], "article", article_id)}
 
 
 @router.get("/saved-articles", response_model=List[SavedArticleOut])
 async def get_saved_articles(current_user: dict = Depends(get_current_user)):
-    saved = await db.saved_articles.find({"user_id": current_user["id"]}, {"_id": 0}).sort("saved_at", -1).to_list(100)
+    saved = await list_bookmarks(current_user["id"], "article")
     return [SavedArticleOut(**s) for s in saved]
 
 
@@ -317,23 +331,16 @@ async def get_saved_articles(current_user: dict = Depends(get_current_user)):
 
 @router.post("/articles/{article_id}/like")
 async def toggle_like(article_id: str, current_user: dict = Depends(get_current_user)):
-    article = await db.articles.find_one({"id": article_id}, {"_id": 0})
+    article = await db.articles.find_one({"id": article_id}, {"_id": 0, "id": 1, "title": 1, "author_id": 1})
     if not article:
         raise HTTPException(status_code=404, detail="Article introuvable")
     user_id = current_user["id"]
-    liked_by = article.get("liked_by", [])
-    if user_id in liked_by:
-        action = "unliked"
-        await db.articles.update_one({"id": article_id}, {"$pull": {"liked_by": user_id}, "$inc": {"likes_count": -1}})
-    else:
-        action = "liked"
-        await db.articles.update_one({"id": article_id}, {"$push": {"liked_by": user_id}, "$inc": {"likes_count": 1}})
-        if article["author_id"] != user_id:
-            await db.user_notifications.insert_one({
-                "id": str(uuid.uuid4()), "type": "like", "user_id": article["author_id"],
-                "message": f"{current_user['username']} a aime votre article \"{article['title']}\"",
-                "is_read": False, "created_at": datetime.now(timezone.utc).isoformat()
-            })
-    updated = await db.articles.find_one({"id": article_id}, {"_id": 0, "likes_count": 1, "liked_by": 1})
-    await manager.broadcast_all({"type": "like_update", "content_type": "article", "id": article_id, "likes_count": updated.get("likes_count", 0), "liked_by": updated.get("liked_by", [])})
-    return {"action": action, "likes_count": updated.get("likes_count", 0), "liked_by": updated.get("liked_by", [])}
+    result = await toggle_target_like(user_id, "article", article_id)
+    action = "liked" if result["liked"] else "unliked"
+    if result["liked"] and article["author_id"] != user_id:
+        await db.user_notifications.insert_one({
+            "id": str(uuid.uuid4()), "type": "like", "user_id": article["author_id"],
+            "message": f"{current_user['username']} a aime votre article \"{article['title']}\"",
+            "is_read": False, "created_at": datetime.now(timezone.utc).isoformat()
+        })
+    return {"action": action, "liked": result["liked"], "likes_count": result["likes_count"]}
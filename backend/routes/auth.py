@@ -8,6 +8,8 @@ from models.user import (
 from middleware.auth import get_current_user
 from utils import sanitize, sanitize_url
 from routes.messages import manager
+from services.stats import stats
+from services.metrics import metrics
 import bcrypt
 import uuid
 import jwt
@@ -220,6 +222,8 @@ async def register(data: UserRegister):
         "verification_logs": [],
     }
     await db.users.insert_one(user_doc)
+    await stats.track("user", after=user_doc)
+    metrics.record("users.registered")
 
     logger.info(f"User registered (pending_verification): {data.email} as {data.role}")
 
@@ -321,6 +325,7 @@ async def verify_otp(data: OTPVerify, response: Response):
         {"email": data.email},
         {"$set": update_fields, "$push": {"verification_logs": log_entry}}
     )
+    await stats.track("user", user, {**user, **update_fields})
 
     if is_professional:
         role_label = "Auteur" if user["requested_role"] == "auteur" else "Agent immobilier"
@@ -0,0 +1,30 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Query
+from middleware.auth import get_current_user
+from services.bookmarks import BOOKMARK_KINDS, MAX_STATUS_IDS, bookmarked_ids
+from services.likes import liked_ids_by_kind
+
+router = APIRouter(tags=["bookmarks"])
+
+
+def _parse_ids(raw: str):
+    ids = list(dict.fromkeys(i.strip() for i in raw.split(",") if i.strip()))
+    if len(ids) > MAX_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_STATUS_IDS} identifiants par type")
+    return ids
+
+
+@router.get("/bookmarks/status")
+async def get_bookmarks_status(
+    article: str = Query("", max_length=4000),
+    property: str = Query("", max_length=4000),
+    procedure: str = Query("", max_length=4000),
+    current_user: dict = Depends(get_current_user),
+):
+    """Saved and liked status for a page of cards: ?article=a,b&property=c&procedure=d"""
+    ids_by_kind = {"article": _parse_ids(article), "property": _parse_ids(property), "procedure": _parse_ids(procedure)}
+    saved, liked = await asyncio.gather(
+        bookmarked_ids(current_user["id"], ids_by_kind),
+        liked_ids_by_kind(current_user["id"], ids_by_kind),
+    )
+    return {kind: {"saved": saved[kind], "liked": liked[kind]} for kind in BOOKMARK_KINDS}
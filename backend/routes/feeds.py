@@ -0,0 +1,59 @@
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+from services.feeds import feeds
+
+router = APIRouter(tags=["feeds"])
+
+CACHE_CONTROL = "public, max-age=300"
+MEDIA_TYPES = {"rss": "application/rss+xml", "atom": "application/atom+xml", "sitemap": "application/xml"}
+
+
+def _not_modified(header: str, last_modified) -> bool:
+    try:
+        return bool(header) and parsedate_to_datetime(header) >= last_modified
+    except (TypeError, ValueError):
+        return False
+
+
+async def _serve(name: str, media_type: str, request: Request) -> Response:
+    if not feeds.site_url:
+        raise HTTPException(status_code=503, detail="SITE_URL non configure")
+    document = feeds.get(name)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Flux introuvable")
+    headers = {
+        "Last-Modified": format_datetime(document.last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request.headers.get("if-modified-since", ""), document.last_modified):
+        return Response(status_code=304, headers=headers)
+    media_type = f"{media_type}; charset=utf-8"
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=document.gzipped, media_type=media_type, headers=headers)
+    return Response(content=document.body, media_type=media_type, headers=headers)
+
+
+@router.get("/feeds/rss/{feed}.xml")
+async def get_rss_feed(feed: str, request: Request):
+    """Latest articles, all categories (`all`) or one category slug (`economie`)."""
+    return await _serve(f"rss/{feed}.xml", MEDIA_TYPES["rss"], request)
+
+
+@router.get("/feeds/atom/{feed}.xml")
+async def get_atom_feed(feed: str, request: Request):
+    return await _serve(f"atom/{feed}.xml", MEDIA_TYPES["atom"], request)
+
+
+@router.get("/sitemap.xml")
+async def get_sitemap_index(request: Request):
+    return await _serve("sitemap.xml", MEDIA_TYPES["sitemap"], request)
+
+
+@router.get("/sitemaps/{name}")
+async def get_sitemap(name: str, request: Request):
+    if not name.startswith("sitemap-"):
+        raise HTTPException(status_code=404, detail="Flux introuvable")
+    return await _serve(name, MEDIA_TYPES["sitemap"], request)
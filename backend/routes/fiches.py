@@ -1,9 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+import asyncio
+import io
+import itertools
+import zipfile
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, FileResponse, JSONResponse
 from database import db
-from models.fiche import FicheCreate, FicheUpdate, CompanySettings
+from config import EXPORT_DIR
+from models.fiche import FicheCreate, FicheUpdate, CompanySettings, FicheBatchExport
 from routes.auth import get_current_user
-from services.pdf_generator import generate_fiche_pdf
+from services.pdf_pool import pdf_pool
+from services import pdf_cache
+from services.jobs import JobContext, job_handler, job_queue
+from services.archives import unique_names
 import uuid
 from datetime import datetime, timezone
 
@@ -12,6 +22,7 @@ router = APIRouter(tags=["fiches"])
 COLLECTION = "procedure_fiches"
 SETTINGS_COLLECTION = "company_settings"
 SETTINGS_ID = "global"
+PUBLIC_PROJECTION = {"_id": 0, "pdf_cache": 0}
 
 
 def fiche_serial(doc: dict) -> dict:
@@ -19,6 +30,33 @@ def fiche_serial(doc: dict) -> dict:
     return doc
 
 
+async def load_pdf_settings() -> dict:
+    settings_doc = await db[SETTINGS_COLLECTION].find_one({"id": SETTINGS_ID}, {"_id": 0})
+    return settings_doc or CompanySettings().model_dump()
+
+
+def fiche_pdf_filename(fiche: dict) -> str:
+    safe_title = fiche.get("title", "fiche").replace(" ", "_")[:50]
+    return f"fiche_{safe_title}.pdf"
+
+
+async def render_fiche_pdf(fiche: dict, settings_doc: Optional[dict] = None, kind: str = "fiche") -> Tuple[str, bytes]:
+    """PDF of a stored fiche and its cache key, rendered only if not cached yet."""
+    if settings_doc is None:
+        settings_doc = await load_pdf_settings()
+    key = pdf_cache.content_hash(fiche, settings_doc)
+    pdf = await asyncio.to_thread(pdf_cache.read, key)
+    if pdf is None:
+        pdf = await pdf_pool.render(fiche, settings_doc, kind=kind)
+        await pdf_cache.store(key, pdf)
+    if fiche.get("pdf_cache") != key:
+        # Guarded by updated_at so a concurrent edit is not marked as cached
+        await db[COLLECTION].update_one(
+            {"id": fiche["id"], "updated_at": fiche.get("updated_at")}, {"$set": {"pdf_cache": key}}
+        )
+    return key, pdf
+
+
 # ─── CRUD Fiches ────────────────────────────────────────────────────────────────
 
 @router.get("/fiches")
@@ -26,13 +64,13 @@ async def list_fiches(status: str = "", user=Depends(get_current_user)):
     query = {}
     if status:
         query["status"] = status
-    fiches = await db[COLLECTION].find(query, {"_id": 0}).sort("updated_at", -1).to_list(200)
+    fiches = await db[COLLECTION].find(query, PUBLIC_PROJECTION).sort("updated_at", -1).to_list(200)
     return {"fiches": fiches, "total": len(fiches)}
 
 
 @router.get("/fiches/{fiche_id}")
 async def get_fiche(fiche_id: str, user=Depends(get_current_user)):
-    doc = await db[COLLECTION].find_one({"id": fiche_id}, {"_id": 0})
+    doc = await db[COLLECTION].find_one({"id": fiche_id}, PUBLIC_PROJECTION)
     if not doc:
         raise HTTPException(404, "Fiche introuvable")
     return doc
@@ -68,8 +106,8 @@ async def update_fiche(fiche_id: str, data: FicheUpdate, user=Depends(get_curren
         for i, step in enumerate(updates["steps"]):
             step["order"] = i
     updates["updated_at"] = datetime.now(timezone.utc).isoformat()
-    await db[COLLECTION].update_one({"id": fiche_id}, {"$set": updates})
-    updated = await db[COLLECTION].find_one({"id": fiche_id}, {"_id": 0})
+    await db[COLLECTION].update_one({"id": fiche_id}, {"$set": updates, "$unset": {"pdf_cache": ""}})
+    updated = await db[COLLECTION].find_one({"id": fiche_id}, PUBLIC_PROJECTION)
     return updated
 
 
@@ -102,37 +140,183 @@ async def update_company_settings(data: CompanySettings, user=Depends(get_curren
     await db[SETTINGS_COLLECTION].update_one(
         {"id": SETTINGS_ID}, {"$set": doc}, upsert=True
     )
+    # Logo, company name and footer appear on every fiche PDF
+    await db[COLLECTION].update_many({"pdf_cache": {"$exists": True}}, {"$unset": {"pdf_cache": ""}})
     updated = await db[SETTINGS_COLLECTION].find_one({"id": SETTINGS_ID}, {"_id": 0})
     return updated
 
 
 # ─── PDF Generation ──────────────────────────────────────────────────────────
 
+@router.get("/fiches/{fiche_id}/pdf")
 @router.post("/fiches/{fiche_id}/pdf")
-async def download_fiche_pdf(fiche_id: str, user=Depends(get_current_user)):
+async def download_fiche_pdf(fiche_id: str, request: Request, user=Depends(get_current_user)):
+    """Cached PDF of the fiche; the ETag is its content hash (If-None-Match gives a 304)."""
     fiche = await db[COLLECTION].find_one({"id": fiche_id}, {"_id": 0})
     if not fiche:
         raise HTTPException(404, "Fiche introuvable")
-    settings_doc = await db[SETTINGS_COLLECTION].find_one({"id": SETTINGS_ID}, {"_id": 0})
-    if not settings_doc:
-        settings_doc = CompanySettings().model_dump()
-    pdf_bytes = generate_fiche_pdf(fiche, settings_doc)
-    safe_title = fiche.get("title", "fiche").replace(" ", "_")[:50]
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="fiche_{safe_title}.pdf"'}
+    settings_doc = await load_pdf_settings()
+    # The stored pdf_cache is not trusted: a render that raced a settings
+    # change may have written a key hashed from the old settings
+    key = pdf_cache.content_hash(fiche, settings_doc)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{fiche_pdf_filename(fiche)}"',
+        "Cache-Control": "private, no-cache",
+        "ETag": f'"{key}"',
+    }
+    if request.headers.get("if-none-match", "").strip('" ') == key:
+        return Response(status_code=304, headers=headers)
+    _, pdf_bytes = await render_fiche_pdf(fiche, settings_doc)
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
+
+
+# ─── Batch Export ────────────────────────────────────────────────────────────
+
+MAX_BATCH = 500
+# A catalogue is laid out in one worker call, with no progress until it is done
+MAX_CATALOGUE = 100
+INLINE_BATCH = 10  # larger batches run as a background job with progress
+BATCH_FORMATS = {"pdf": ("application/pdf", "pdf"), "zip": ("application/zip", "zip")}
+
+
+def _batch_query(data: FicheBatchExport) -> dict:
+    query = {}
+    if data.ids:
+        query["id"] = {"$in": data.ids}
+    for field in ("status", "country", "category"):
+        if getattr(data, field):
+            query[field] = getattr(data, field)
+    return query
+
+
+async def _render_batch(fiches: List[dict], settings_doc: dict, fmt: str, out,
+                        on_progress: Optional[Callable] = None):
+    """Write the merged PDF or the ZIP of the fiches into the binary file `out`."""
+    if fmt == "pdf":
+        out.write(await pdf_pool.render_catalogue(fiches, settings_doc, "Catalogue des procedures"))
+        return
+    # A few renders per worker in flight, so a large batch neither fills the pool's queue
+    # nor holds every PDF in memory: each one is written to the archive as it finishes
+    window = 2 * pdf_pool.workers
+    todo = zip(unique_names([fiche_pdf_filename(f) for f in fiches]), fiches)
+    pending = set()
+    done = 0
+
+    async def render(name: str, fiche: dict) -> Tuple[str, bytes]:
+        _, pdf = await render_fiche_pdf(fiche, settings_doc, kind="batch")
+        return name, pdf
+
+    def fill():
+        for name, fiche in itertools.islice(todo, window - len(pending)):
+            pending.add(asyncio.ensure_future(render(name, fiche)))
+
+    try:
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+            fill()
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    archive.writestr(*task.result())
+                    done += 1
+                    if on_progress:
+                        await on_progress(done)
+                fill()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+@job_handler("fiche_export", max_attempts=2)
+async def fiche_export_job(ctx: JobContext):
+    params = ctx.params
+    fmt = params["format"]
+    fiches = await db[COLLECTION].find({"id": {"$in": params["ids"]}}, {"_id": 0}).sort("title", 1).to_list(MAX_BATCH)
+    total = len(fiches)
+    await ctx.progress(0, total, "Mise en page du catalogue" if fmt == "pdf" else "Generation des PDF")
+
+    async def on_progress(done: int):
+        await ctx.progress(done, total, "Generation des PDF")
+
+    media_type, ext = BATCH_FORMATS[fmt]
+    path = EXPORT_DIR / f"{ctx.id}.{ext}"
+    try:
+        with open(path, "wb") as f:
+            await _render_batch(fiches, await load_pdf_settings(), fmt, f, on_progress)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    await ctx.progress(total, total, "Termine")
+    return {"path": str(path), "filename": f"fiches.{ext}", "media_type": media_type,
+            "fiches": total, "size": path.stat().st_size}
+
+
+@router.post("/fiches/export")
+async def export_fiches(data: FicheBatchExport, user=Depends(get_current_user)):
+    """Many fiches as one PDF with a table of contents (format=pdf, up to MAX_CATALOGUE)
+    or a ZIP (format=zip, up to MAX_BATCH).
+
+    Up to INLINE_BATCH fiches are returned directly; larger batches return a
+    job to poll at /fiches/export/{job_id}.
+    """
+    if data.format not in BATCH_FORMATS:
+        raise HTTPException(400, "Format invalide (pdf ou zip)")
+    query = _batch_query(data)
+    fiches = await db[COLLECTION].find(query, {"_id": 0}).sort("title", 1).to_list(MAX_BATCH + 1)
+    if not fiches:
+        raise HTTPException(404, "Aucune fiche ne correspond")
+    if len(fiches) > MAX_BATCH:
+        raise HTTPException(400, f"Maximum {MAX_BATCH} fiches par export")
+    if data.format == "pdf" and len(fiches) > MAX_CATALOGUE:
+        raise HTTPException(400, f"Maximum {MAX_CATALOGUE} fiches par catalogue PDF, utilisez le format zip")
+
+    media_type, ext = BATCH_FORMATS[data.format]
+    if len(fiches) <= INLINE_BATCH:
+        out = io.BytesIO()
+        await _render_batch(fiches, await load_pdf_settings(), data.format, out)
+        return Response(
+            content=out.getvalue(), media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="fiches.{ext}"'},
+        )
+    job = await job_queue.enqueue(
+        "fiche_export", {"ids": [f["id"] for f in fiches], "format": data.format}, created_by=user["id"],
     )
+    return JSONResponse(status_code=202, content=_job_status(job))
+
+
+def _job_status(job: dict) -> dict:
+    return {k: job.get(k) for k in ("id", "status", "progress", "error", "created_at", "finished_at")}
+
+
+async def _get_export_job(job_id: str, user: dict) -> dict:
+    job = await db.jobs.find_one({"id": job_id, "type": "fiche_export"}, {"_id": 0})
+    if not job or (job.get("created_by") != user["id"] and user.get("role") != "admin"):
+        raise HTTPException(404, "Export introuvable")
+    return job
+
+
+@router.get("/fiches/export/{job_id}")
+async def get_fiches_export(job_id: str, user=Depends(get_current_user)):
+    return _job_status(await _get_export_job(job_id, user))
+
+
+@router.get("/fiches/export/{job_id}/download")
+async def download_fiches_export(job_id: str, user=Depends(get_current_user)):
+    job = await _get_export_job(job_id, user)
+    result = job.get("result") or {}
+    if job["status"] != "succeeded" or not result.get("path"):
+        raise HTTPException(404, "Export pas encore disponible")
+    path = Path(result["path"])
+    if not path.exists():
+        raise HTTPException(410, "Fichier expire")
+    return FileResponse(path, media_type=result["media_type"], filename=result["filename"])
 
 
 @router.post("/fiches/preview-pdf")
 async def preview_fiche_pdf(data: FicheCreate, user=Depends(get_current_user)):
     """Generate PDF from form data without saving (for preview/download before save)."""
-    settings_doc = await db[SETTINGS_COLLECTION].find_one({"id": SETTINGS_ID}, {"_id": 0})
-    if not settings_doc:
-        settings_doc = CompanySettings().model_dump()
+    settings_doc = await load_pdf_settings()
     fiche = data.model_dump()
-    pdf_bytes = generate_fiche_pdf(fiche, settings_doc)
+    pdf_bytes = await pdf_pool.render(fiche, settings_doc, kind="preview")
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
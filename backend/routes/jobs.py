@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from database import db
+from middleware.auth import require_admin
+from services.jobs import HANDLERS, JOB_STATUSES, job_queue
+import services.admin_jobs  # noqa: F401  (registers the admin job handlers)
+
+router = APIRouter(tags=["jobs"])
+
+# Job types admins may start directly; others are enqueued by their own endpoints
+ENQUEUEABLE = {"export", "migrate_images", "recompute_price_references"}
+
+
+class JobCreate(BaseModel):
+    type: str
+    params: dict = {}
+
+
+@router.post("/jobs")
+async def create_job(data: JobCreate, current_user: dict = Depends(require_admin)):
+    if data.type not in ENQUEUEABLE:
+        raise HTTPException(status_code=400, detail="Type de tache invalide")
+    validate = HANDLERS[data.type]["validate"]
+    if validate:
+        validate(data.params)
+    job = await job_queue.enqueue(data.type, data.params, created_by=current_user["id"])
+    return job
+
+
+@router.get("/jobs")
+async def list_jobs(
+    status: str = Query("", max_length=20), type: str = Query("", max_length=50),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(require_admin),
+):
+    query = {}
+    if status:
+        if status not in JOB_STATUSES:
+            raise HTTPException(status_code=400, detail="Statut invalide")
+        query["status"] = status
+    if type:
+        query["type"] = type
+    return await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+
+
+async def _get_job(job_id: str) -> dict:
+    job = await db.jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Tache introuvable")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(require_admin)):
+    return await _get_job(job_id)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, current_user: dict = Depends(require_admin)):
+    job = await job_queue.cancel(job_id)
+    if job is None:
+        job = await _get_job(job_id)
+        raise HTTPException(status_code=400, detail=f"Tache deja terminee ({job['status']})")
+    return job
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_job_result(job_id: str, current_user: dict = Depends(require_admin)):
+    job = await _get_job(job_id)
+    result: Optional[dict] = job.get("result")
+    if job["status"] != "succeeded" or not result or not result.get("path"):
+        raise HTTPException(status_code=404, detail="Aucun fichier pour cette tache")
+    path = Path(result["path"])
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Fichier expire")
+    return FileResponse(path, media_type=result.get("media_type"), filename=result.get("filename"))
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from middleware.auth import get_current_user
+from services.likes import LIKE_TARGETS, MAX_STATUS_IDS, liked_ids
+
+router = APIRouter(tags=["likes"])
+
+
+@router.get("/likes/status")
+async def get_likes_status(
+    type: str = Query(..., max_length=20),
+    ids: str = Query("", max_length=4000),
+    current_user: dict = Depends(get_current_user),
+):
+    """Batch "did I like these ids" lookup: ?type=article&ids=a,b,c"""
+    if type not in LIKE_TARGETS:
+        raise HTTPException(status_code=400, detail="Type invalide")
+    id_list = [i.strip() for i in ids.split(",") if i.strip()]
+    if len(id_list) > MAX_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"Maximum {MAX_STATUS_IDS} identifiants")
+    return {"liked": await liked_ids(current_user["id"], type, id_list)}
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
-from typing import Dict, List
+from typing import Dict, List, Set
 from database import db
 from models.message import MessageCreate, MessageOut, ConversationOut
 from middleware.auth import get_current_user
@@ -13,9 +13,15 @@ router = APIRouter(tags=["messages"])
 
 # ─── WebSocket Connection Manager ──────────────────────────────────────────────
 
+MAX_WATCHED_ITEMS = 50  # per socket
+
+
 class ConnectionManager:
     def __init__(self):
         self.active: Dict[str, List[WebSocket]] = {}
+        # Item subscriptions ("article:<id>", "property:<id>") for per-item events
+        self.watchers: Dict[str, Set[WebSocket]] = {}
+        self.watching: Dict[WebSocket, Set[str]] = {}
 
     async def connect(self, user_id: str, ws: WebSocket):
         await ws.accept()
@@ -26,6 +32,35 @@ class ConnectionManager:
             self.active[user_id] = [w for w in self.active[user_id] if w != ws]
             if not self.active[user_id]:
                 del self.active[user_id]
+        for key in list(self.watching.get(ws, ())):
+            self.unwatch(ws, key)
+
+    def watch(self, ws: WebSocket, key: str):
+        watched = self.watching.setdefault(ws, set())
+        if key in watched or len(watched) >= MAX_WATCHED_ITEMS:
+            return
+        watched.add(key)
+        self.watchers.setdefault(key, set()).add(ws)
+
+    def unwatch(self, ws: WebSocket, key: str):
+        watched = self.watching.get(ws)
+        if watched is not None:
+            watched.discard(key)
+            if not watched:
+                del self.watching[ws]
+        sockets = self.watchers.get(key)
+        if sockets is not None:
+            sockets.discard(ws)
+            if not sockets:
+                del self.watchers[key]
+
+    async def send_to_watchers(self, key: str, data: dict):
+        """Send an event only to sockets currently watching the given item."""
+        for ws in list(self.watchers.get(key, ())):
+            try:
+                await ws.send_json(data)
+            except Exception:
+                self.unwatch(ws, key)
 
     async def send_to_user(self, user_id: str, data: dict):
         if user_id in self.active:
@@ -157,6 +192,19 @@ async def _ws_handle_typing(user_id: str, user: dict, data: dict, start: bool):
             await manager.send_to_user(pid, event)
 
 
+def _ws_handle_watch(ws: WebSocket, data: dict, watch: bool):
+    """Subscribe/unsubscribe a socket to per-item events (views, likes)."""
+    content_type = data.get("content_type")
+    item_id = data.get("id")
+    if content_type not in ("article", "property", "procedure") or not isinstance(item_id, str) or not item_id:
+        return
+    key = f"{content_type}:{item_id}"
+    if watch:
+        manager.watch(ws, key)
+    else:
+        manager.unwatch(ws, key)
+
+
 async def _ws_handle_mark_read(user_id: str, data: dict):
     """Handle marking messages as read."""
     conv_id = data.get("conversation_id")
@@ -209,6 +257,10 @@ async def websocket_chat(ws: WebSocket):
                 await _ws_handle_typing(user_id, user, data, start=False)
             elif msg_type == "mark_read":
                 await _ws_handle_mark_read(user_id, data)
+            elif msg_type == "watch":
+                _ws_handle_watch(ws, data, watch=True)
+            elif msg_type == "unwatch":
+                _ws_handle_watch(ws, data, watch=False)
 
     except WebSocketDisconnect:
         pass
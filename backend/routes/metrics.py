@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query
+from database import db
+from middleware.auth import require_admin
+from services.metrics import METRICS, COLLECTION
+from services.pdf_pool import pdf_pool
+from services.search import search_cache
+
+router = APIRouter(tags=["metrics"])
+
+MAX_DAYS = {"hour": 31, "day": 366, "week": 3 * 366}
+
+
+def _parse_date(value: str, default: datetime) -> datetime:
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Date invalide: {value} (format AAAA-MM-JJ)")
+
+
+def _buckets(start: datetime, end: datetime, interval: str):
+    """Every bucket label in the range, so charts get explicit zeros."""
+    if interval == "week":
+        day = start - timedelta(days=start.weekday())
+        while day <= end:
+            yield day.strftime("%Y-%m-%d")
+            day += timedelta(days=7)
+        return
+    day = start
+    while day <= end:
+        if interval == "hour":
+            for h in range(24):
+                yield f"{day.strftime('%Y-%m-%d')}T{h:02d}"
+        else:
+            yield day.strftime("%Y-%m-%d")
+        day += timedelta(days=1)
+
+
+@router.get("/metrics")
+async def list_metrics(current_user: dict = Depends(require_admin)):
+    return [
+        {"name": name, "label": m["label"], "dims": m["dims"], "backfillable": m["source"] is not None}
+        for name, m in METRICS.items()
+    ]
+
+
+@router.get("/metrics/live/pdf")
+async def get_pdf_pool_state(current_user: dict = Depends(require_admin)):
+    """Live state of the PDF rendering pool (history is in the pdf.rendered metric)."""
+    return pdf_pool.snapshot()
+
+
+@router.get("/metrics/live/search")
+async def get_search_cache_state(current_user: dict = Depends(require_admin)):
+    """Search result cache of this worker: size and hit rate (history is in the search.cache metric)."""
+    return search_cache.snapshot()
+
+
+@router.get("/metrics/{metric}")
+async def get_metric_series(
+    metric: str,
+    start: str = Query("", max_length=10), end: str = Query("", max_length=10),
+    interval: str = Query("day", pattern="^(hour|day|week)$"),
+    group_by: str = Query("", max_length=30),
+    current_user: dict = Depends(require_admin),
+):
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail="Metrique inconnue")
+    if group_by and group_by not in METRICS[metric]["dims"]:
+        raise HTTPException(status_code=400, detail=f"Dimension invalide pour {metric}")
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    end_dt = _parse_date(end, today)
+    start_dt = _parse_date(start, end_dt - timedelta(days=29))
+    if start_dt > end_dt:
+        raise HTTPException(status_code=400, detail="La date de debut doit preceder la date de fin")
+    if (end_dt - start_dt).days + 1 > MAX_DAYS[interval]:
+        raise HTTPException(status_code=400, detail=f"Plage trop longue (max {MAX_DAYS[interval]} jours)")
+
+    labels = list(_buckets(start_dt, end_dt, interval))
+    series = {}  # group value -> label -> {"count", "sum"}
+
+    def add(group, label, count, total):
+        point = series.setdefault(group, {}).setdefault(label, {"count": 0, "sum": 0})
+        point["count"] += count
+        point["sum"] += total
+
+    query = {"metric": metric, "date": {"$gte": start_dt.strftime("%Y-%m-%d"), "$lte": end_dt.strftime("%Y-%m-%d")}}
+    async for doc in db[COLLECTION].find(query, {"_id": 0}):
+        group = doc.get("dims", {}).get(group_by, "") if group_by else "total"
+        if interval == "hour":
+            hour_sums = doc.get("hour_sums", {})
+            for h, n in doc.get("hours", {}).items():
+                add(group, f"{doc['date']}T{h}", n, hour_sums.get(h, 0))
+        elif interval == "week":
+            day = datetime.strptime(doc["date"], "%Y-%m-%d")
+            add(group, (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d"), doc.get("count", 0), doc.get("sum", 0))
+        else:
+            add(group, doc["date"], doc.get("count", 0), doc.get("sum", 0))
+
+    return {
+        "metric": metric, "interval": interval, "group_by": group_by or None,
+        "start": start_dt.strftime("%Y-%m-%d"), "end": end_dt.strftime("%Y-%m-%d"),
+        "series": [
+            {
+                "key": group,
+                "total": sum(p["count"] for p in points.values()),
+                "points": [{"t": label, **points.get(label, {"count": 0, "sum": 0})} for label in labels],
+            }
+            for group, points in sorted(series.items(), key=lambda kv: -sum(p["count"] for p in kv[1].values()))
+        ],
+    }
@@ -1,15 +1,32 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List
+from pymongo import ReturnDocument
 from database import db
 from models.payment import PaymentCreate, PaymentOut, generate_reference, PAYMENT_STATUSES
 from middleware.auth import get_current_user, require_author
 from utils import sanitize
+from services.stats import stats
+from services.metrics import metrics
+from services.search import search_cache
+from services.feeds import feeds
 import uuid
 from datetime import datetime, timezone
 
 router = APIRouter(tags=["payments"])
 
 
+async def set_property_status(property_id: str, status: str):
+    before = await db.properties.find_one_and_update(
+        {"id": property_id}, {"$set": {"status": status}},
+        projection={"_id": 0, "author_id": 1, "status": 1, "views": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before:
+        await stats.track("property", before, {**before, "status": status})
+        search_cache.invalidate("property")
+        feeds.put("property", {"id": property_id, "status": status})
+
+
 @router.post("/payments", response_model=PaymentOut)
 async def create_payment(data: PaymentCreate, current_user: dict = Depends(get_current_user)):
     prop = await db.properties.find_one({"id": data.property_id}, {"_id": 0})
@@ -36,7 +53,9 @@ async def create_payment(data: PaymentCreate, current_user: dict = Depends(get_c
         "created_at": now,
     }
     await db.payments.insert_one(payment)
-    await db.properties.update_one({"id": data.property_id}, {"$set": {"status": "reserve"}})
+    await stats.track("payment", after=payment)
+    metrics.record("payments.created", {"method": payment["method"], "currency": payment["currency"]}, value=payment["amount"])
+    await set_property_status(data.property_id, "reserve")
     del payment["_id"]
     return payment
 
@@ -62,13 +81,15 @@ async def update_payment_status(payment_id: str, status: str = Query(...), curre
         raise HTTPException(status_code=404, detail="Paiement introuvable")
 
     await db.payments.update_one({"id": payment_id}, {"$set": {"status": status}})
+    if status != payment.get("status"):
+        metrics.record("payments.status_changed", {"status": status})
 
     if status == "annule":
-        await db.properties.update_one({"id": payment["property_id"]}, {"$set": {"status": "disponible"}})
+        await set_property_status(payment["property_id"], "disponible")
     elif status == "confirme":
         prop = await db.properties.find_one({"id": payment["property_id"]}, {"_id": 0})
         if prop:
             new_status = "loue" if prop.get("type") == "location" else "vendu"
-            await db.properties.update_one({"id": payment["property_id"]}, {"$set": {"status": new_status}})
+            await set_property_status(payment["property_id"], new_status)
 
     return {"ok": True}
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile, Response, Request
 from typing import List, Optional
 from database import db
 from models.procedure import (
@@ -9,7 +9,16 @@ from models.procedure import (
 )
 from middleware.auth import require_admin, get_current_user
 from utils import sanitize, sanitize_html, sanitize_url
-from cloud_storage import put_object, get_object, APP_NAME
+from fastapi.responses import StreamingResponse
+from cloud_storage import put_object, get_object, download_object, APP_NAME
+from services.view_counter import view_counter
+from services.unique_viewers import visitor_fingerprint
+from services.bookmarks import toggle_bookmark, is_bookmarked, list_bookmarks, remove_bookmark, delete_target_bookmarks
+from services.stats import stats, GLOBAL_KEY
+from services.search import text_query, search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.archives import ArchiveMember, stream_zip, unique_names
 import uuid
 from datetime import datetime, timezone
 
@@ -18,44 +27,42 @@ router = APIRouter(tags=["procedures"])
 
 # ─── Helpers ────────────────────────────────────────────────────────────────────
 
+COUNTRIES_BY_ID = {c["id"]: c for c in PROCEDURE_COUNTRIES}
+CATEGORY_NAMES = {c["id"]: c["name"] for c in PROCEDURE_CATEGORIES}
+MAX_FILES_PER_PROCEDURE = 50
+
+# Output field defaults: stored steps, quick actions and files are already
+# validated on write, so reads only fill in missing fields.
+STEP_DEFAULTS = ProcedureStepOut().model_dump()
+QUICK_ACTION_DEFAULTS = QuickActionOut().model_dump()
+FILE_DEFAULTS = {name: None if f.is_required() else f.default for name, f in ProcedureFileOut.model_fields.items()}
+
+
 def get_country_info(country_id: str):
-    for c in PROCEDURE_COUNTRIES:
-        if c["id"] == country_id:
-            return c
-    return {"id": country_id, "name": country_id, "flag": "un"}
+    return COUNTRIES_BY_ID.get(country_id) or {"id": country_id, "name": country_id, "flag": "un"}
 
 
 def get_category_name(cat_id: str):
-    for c in PROCEDURE_CATEGORIES:
-        if c["id"] == cat_id:
-            return c["name"]
-    return cat_id
+    return CATEGORY_NAMES.get(cat_id, cat_id)
 
 
 def get_subcategory_info(subcat_id: str):
     return get_country_info(subcat_id)
 
 
-async def enrich_procedure(p: dict) -> dict:
-    """Transform a raw procedure document into ProcedureOut-compatible dict."""
-    country = get_country_info(p.get("country", p.get("subcategory", "")))
-    cat_name = get_category_name(p.get("category", "autre"))
-    author = await db.users.find_one({"id": p.get("author_id", "")}, {"_id": 0, "username": 1})
-
-    # Load files
-    files = await db.procedure_files.find(
-        {"procedure_id": p["id"], "is_deleted": False}, {"_id": 0}
-    ).to_list(50)
+def _with_defaults(doc: dict, defaults: dict) -> dict:
+    return {k: doc.get(k, v) for k, v in defaults.items()}
 
-    steps = [ProcedureStepOut(**s).model_dump() for s in p.get("steps", [])]
-    quick_actions = [QuickActionOut(**q).model_dump() for q in p.get("quick_actions", [])]
 
+def _enriched(p: dict, author_username: str, files: List[dict]) -> dict:
+    """Transform a raw procedure document into a ProcedureOut-compatible dict."""
+    country = get_country_info(p.get("country", p.get("subcategory", "")))
     return {
         "id": p["id"],
         "title": p.get("title", ""),
         "description": p.get("description", ""),
         "category": p.get("category", "autre"),
-        "category_name": cat_name,
+        "category_name": get_category_name(p.get("category", "autre")),
         "keywords": p.get("keywords", []),
         "country": country["id"],
         "country_name": country["name"],
@@ -67,14 +74,15 @@ async def enrich_procedure(p: dict) -> dict:
         "image_url": p.get("image_url", ""),
         "video_url": p.get("video_url", ""),
         "main_image_url": p.get("main_image_url", ""),
-        "steps": steps,
-        "quick_actions": quick_actions,
-        "files": [ProcedureFileOut(**f).model_dump() for f in files],
+        "steps": [_with_defaults(s, STEP_DEFAULTS) for s in p.get("steps", [])],
+        "quick_actions": [_with_defaults(q, QUICK_ACTION_DEFAULTS) for q in p.get("quick_actions", [])],
+        "files": [_with_defaults(f, FILE_DEFAULTS) for f in files],
         "author_id": p.get("author_id", ""),
-        "author_username": author["username"] if author else "",
+        "author_username": author_username,
         "created_at": p.get("created_at", ""),
         "updated_at": p.get("updated_at", ""),
         "views": p.get("views", 0),
+        "unique_views": p.get("unique_views", 0),
         "version": p.get("version", 1),
         # Legacy compat
         "subcategory": country["id"],
@@ -84,6 +92,28 @@ async def enrich_procedure(p: dict) -> dict:
     }
 
 
+async def enrich_procedures(procs: List[dict]) -> List[dict]:
+    """Enrich a page of procedures with two queries: authors and files by `$in`."""
+    if not procs:
+        return []
+    author_ids = list({p.get("author_id", "") for p in procs if p.get("author_id")})
+    proc_ids = [p["id"] for p in procs]
+    usernames = {}
+    if author_ids:
+        async for u in db.users.find({"id": {"$in": author_ids}}, {"_id": 0, "id": 1, "username": 1}):
+            usernames[u["id"]] = u.get("username", "")
+    files = {pid: [] for pid in proc_ids}
+    async for f in db.procedure_files.find({"procedure_id": {"$in": proc_ids}, "is_deleted": False}, {"_id": 0}):
+        bucket = files.get(f["procedure_id"])
+        if bucket is not None and len(bucket) < MAX_FILES_PER_PROCEDURE:
+            bucket.append(f)
+    return [_enriched(p, usernames.get(p.get("author_id", ""), ""), files[p["id"]]) for p in procs]
+
+
+async def enrich_procedure(p: dict) -> dict:
+    return (await enrich_procedures([p]))[0]
+
+
 # ─── Reference Data ─────────────────────────────────────────────────────────────
 
 @router.get("/procedures/categories")
@@ -132,13 +162,13 @@ async def get_procedures(
     country_filter = country or subcategory
     if country_filter:
         query["$or"] = [{"country": country_filter}, {"subcategory": country_filter}]
-    if search:
-        query["$or"] = query.get("$or", []) + [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"keywords": {"$regex": search, "$options": "i"}},
-        ]
-        if not country_filter:
-            pass  # $or already set
+    sort = [("created_at", -1)]
+    projection = {"_id": 0}
+    if search.strip():
+        # Ranked full-text search over title, keywords, description and content
+        query.update(text_query(search))
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"}), ("created_at", -1)]
     if status:
         query["status"] = status
     if complexity:
@@ -150,54 +180,34 @@ async def get_procedures(
     pages = max(1, (total + limit - 1) // limit)
     skip = (page - 1) * limit
 
-    procedures = await db.procedures.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-
-    result = []
-    for p in procedures:
-        enriched = await enrich_procedure(p)
-        result.append(enriched)
+    procedures = await db.procedures.find(query, projection).sort(sort).skip(skip).limit(limit).to_list(limit)
 
+    result = await enrich_procedures(procedures)
     return PaginatedProcedures(procedures=result, total=total, page=page, pages=pages)
 
 
 @router.get("/procedures/stats")
-async def get_procedures_stats(current_user: dict = Depends(require_admin)):
-    total = await db.procedures.count_documents({})
-    published = await db.procedures.count_documents({"status": "published"})
-    drafts = await db.procedures.count_documents({"status": "draft"})
-    active = await db.procedures.count_documents({"active": True})
-    total_files = await db.procedure_files.count_documents({"is_deleted": False})
-    total_chat_actions = await db.chat_actions.count_documents({})
-
-    # By category
-    pipeline = [{"$group": {"_id": "$category", "count": {"$sum": 1}}}]
-    by_category = {r["_id"]: r["count"] async for r in db.procedures.aggregate(pipeline)}
-
-    # By country
-    pipeline2 = [{"$group": {"_id": {"$ifNull": ["$country", "$subcategory"]}, "count": {"$sum": 1}}}]
-    by_country = {r["_id"]: r["count"] async for r in db.procedures.aggregate(pipeline2)}
-
-    # Total views
-    pipeline3 = [{"$group": {"_id": None, "total": {"$sum": "$views"}}}]
-    views_result = await db.procedures.aggregate(pipeline3).to_list(1)
-    total_views = views_result[0]["total"] if views_result else 0
-
+async def get_procedures_stats(refresh: bool = Query(False), current_user: dict = Depends(require_admin)):
+    s = await stats.get(GLOBAL_KEY, refresh=refresh)
     return {
-        "total": total, "published": published, "drafts": drafts, "active": active,
-        "total_files": total_files, "total_chat_actions": total_chat_actions,
-        "total_views": total_views,
-        "by_category": by_category, "by_country": by_country,
+        "total": s.get("procedures", 0), "published": s.get("procedures_published", 0),
+        "drafts": s.get("procedures_draft", 0), "active": s.get("procedures_active", 0),
+        "total_files": s.get("procedure_files", 0), "total_chat_actions": s.get("chat_actions", 0),
+        "total_views": s.get("procedure_views", 0),
+        # Groups emptied by updates keep a zero counter until the next reconciliation
+        "by_category": {k: v for k, v in s.get("procedures_by_category", {}).items() if v},
+        "by_country": {k: v for k, v in s.get("procedures_by_country", {}).items() if v},
     }
 
 
 @router.get("/procedures/{procedure_id}")
-async def get_procedure(procedure_id: str):
+async def get_procedure(procedure_id: str, request: Request):
     proc = await db.procedures.find_one({"id": procedure_id}, {"_id": 0})
     if not proc:
         raise HTTPException(status_code=404, detail="Procedure introuvable")
 
-    await db.procedures.update_one({"id": procedure_id}, {"$inc": {"views": 1}})
-    proc["views"] = proc.get("views", 0) + 1
+    view_counter.record("procedure", procedure_id, visitor=visitor_fingerprint(request))
+    proc["views"] = proc.get("views", 0) + view_counter.pending_for("procedure", procedure_id)
 
     enriched = await enrich_procedure(proc)
     return enriched
@@ -258,6 +268,10 @@ async def create_procedure(data: ProcedureCreate, current_user: dict = Depends(r
     await db.procedures.insert_one(proc)
     if "_id" in proc:
         del proc["_id"]
+    await stats.track("procedure", after=proc)
+    suggest_index.put("procedure", proc)
+    feeds.put("procedure", proc)
+    search_cache.invalidate("procedure")
 
     enriched = await enrich_procedure(proc)
     return enriched
@@ -330,7 +344,12 @@ async def update_procedure(procedure_id: str, data: ProcedureUpdate, current_use
         "$push": {"versions_history": {"$each": [version_snapshot], "$slice": -20}},
     })
 
+    before = dict(proc)
     proc.update(updates)
+    await stats.track("procedure", before, proc)
+    suggest_index.put("procedure", proc)
+    feeds.put("procedure", proc)
+    search_cache.invalidate("procedure")
     enriched = await enrich_procedure(proc)
     return enriched
 
@@ -341,8 +360,16 @@ async def delete_procedure(procedure_id: str, current_user: dict = Depends(requi
     if not proc:
         raise HTTPException(status_code=404, detail="Procedure introuvable")
     await db.procedures.delete_one({"id": procedure_id})
+    await stats.track("procedure", before=proc)
+    suggest_index.remove("procedure", procedure_id)
+    feeds.remove("procedure", procedure_id)
+    search_cache.invalidate("procedure")
+    await delete_target_bookmarks("procedure", procedure_id)
     # Soft-delete files
-    await db.procedure_files.update_many({"procedure_id": procedure_id}, {"$set": {"is_deleted": True}})
+    result = await db.procedure_files.update_many(
+        {"procedure_id": procedure_id, "is_deleted": False}, {"$set": {"is_deleted": True}}
+    )
+    await stats.bump(GLOBAL_KEY, {"procedure_files": -result.modified_count})
     return {"ok": True, "message": "Procedure supprimee"}
 
 
@@ -390,6 +417,7 @@ async def upload_procedure_file(
     await db.procedure_files.insert_one(file_doc)
     if "_id" in file_doc:
         del file_doc["_id"]
+    await stats.track("procedure_file", after=file_doc)
 
     return file_doc
 
@@ -404,9 +432,10 @@ async def list_procedure_files(procedure_id: str):
 
 @router.delete("/procedures/files/{file_id}")
 async def delete_procedure_file(file_id: str, current_user: dict = Depends(require_admin)):
-    result = await db.procedure_files.update_one({"id": file_id}, {"$set": {"is_deleted": True}})
+    result = await db.procedure_files.update_one({"id": file_id, "is_deleted": False}, {"$set": {"is_deleted": True}})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Fichier introuvable")
+    await stats.bump(GLOBAL_KEY, {"procedure_files": -1})
     return {"ok": True}
 
 
@@ -423,6 +452,32 @@ async def download_procedure_file(file_id: str):
     )
 
 
+@router.get("/procedures/{procedure_id}/files/archive")
+async def download_procedure_archive(procedure_id: str):
+    """ZIP of every file attached to the procedure, streamed while the files are fetched."""
+    proc = await db.procedures.find_one({"id": procedure_id}, {"_id": 0, "id": 1, "title": 1})
+    if not proc:
+        raise HTTPException(status_code=404, detail="Procedure introuvable")
+    files = await db.procedure_files.find(
+        {"procedure_id": procedure_id, "is_deleted": False}, {"_id": 0}
+    ).to_list(100)
+    entries = [
+        (f.get("original_filename") or f.get("file_name") or "fichier", f.get("content_type", ""),
+         lambda out, path=f["storage_path"]: download_object(path, out))
+        for f in files
+    ]
+    if not entries:
+        raise HTTPException(status_code=404, detail="Aucun fichier pour cette procedure")
+
+    names = unique_names([name for name, _, _ in entries])
+    members = [ArchiveMember(name, fetch, content_type) for name, (_, content_type, fetch) in zip(names, entries)]
+    safe_title = (proc.get("title") or "procedure").replace(" ", "_").replace('"', "")[:50]
+    return StreamingResponse(
+        stream_zip(members), media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{safe_title}.zip"'},
+    )
+
+
 # ─── Chat Actions ───────────────────────────────────────────────────────────────
 
 @router.get("/chat-actions")
@@ -449,6 +504,7 @@ async def create_chat_action(data: ChatActionCreate, current_user: dict = Depend
     await db.chat_actions.insert_one(action)
     if "_id" in action:
         del action["_id"]
+    await stats.track("chat_action", after=action)
     country = get_country_info(data.country)
     action["country_name"] = country["name"]
     action["country_flag"] = country["flag"]
@@ -473,6 +529,7 @@ async def delete_chat_action(action_id: str, current_user: dict = Depends(requir
     result = await db.chat_actions.delete_one({"id": action_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Action introuvable")
+    await stats.bump(GLOBAL_KEY, {"chat_actions": -1})
     return {"ok": True}
 
 
@@ -483,37 +540,27 @@ async def toggle_save_procedure(procedure_id: str, current_user: dict = Depends(
     proc = await db.procedures.find_one({"id": procedure_id}, {"_id": 0, "title": 1, "image_url": 1, "country": 1, "subcategory": 1})
     if not proc:
         raise HTTPException(status_code=404, detail="Procedure introuvable")
-    existing = await db.saved_procedures.find_one({"user_id": current_user["id"], "procedure_id": procedure_id})
-    if existing:
-        await db.saved_procedures.delete_one({"user_id": current_user["id"], "procedure_id": procedure_id})
-        return {"action": "unsaved"}
     country_id = proc.get("country", proc.get("subcategory", ""))
     subcat = get_country_info(country_id)
-    await db.saved_procedures.insert_one({
-        "id": str(uuid.uuid4()),
-        "user_id": current_user["id"],
-        "procedure_id": procedure_id,
+    saved = await toggle_bookmark(current_user["id"], "procedure", procedure_id, {
         "title": proc.get("title", ""),
         "image_url": proc.get("image_url", ""),
         "subcategory_name": subcat.get("name", ""),
-        "saved_at": datetime.now(timezone.utc).isoformat(),
     })
-    return {"action": "saved"}
+    return {"action": "saved" if saved else "unsaved"}
 
 
 @router.get("/saved-procedures/{procedure_id}/status")
 async def get_saved_procedure_status(procedure_id: str, current_user: dict = Depends(get_current_user)):
-    existing = await db.saved_procedures.find_one({"user_id": current_user["id"], "procedure_id": procedure_id})
-    return {"is_saved": existing is not None}
+    return {"is_saved": await is_bookmarked(current_user["id"], "procedure", procedure_id)}
 
 
 @router.get("/saved-procedures")
 async def get_saved_procedures(current_user: dict = Depends(get_current_user)):
-    saved = await db.saved_procedures.find({"user_id": current_user["id"]}, {"_id": 0}).sort("saved_at", -1).to_list(100)
-    return saved
+    return await list_bookmarks(current_user["id"], "procedure")
 
 
 @router.delete("/saved-procedures/{procedure_id}")
 async def delete_saved_procedure(procedure_id: str, current_user: dict = Depends(get_current_user)):
-    await db.saved_procedures.delete_one({"user_id": current_user["id"], "procedure_id": procedure_id})
+    await remove_bookmark(current_user["id"], "procedure", procedure_id)
     return {"ok": True}
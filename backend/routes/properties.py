@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from typing import Optional, List
 from database import db
 from models.property import (
@@ -7,9 +7,18 @@ from models.property import (
     PROPERTY_TYPES, PROPERTY_STATUSES, PROPERTY_CATEGORIES, convert_price
 )
 from middleware.auth import get_current_user, require_agent, require_admin
-from utils import sanitize, sanitize_html, sanitize_url
+from utils import sanitize, sanitize_html, sanitize_url, fold_text
+from data.guinea_locations import location_keys, location_filter
 from routes.messages import manager
-from pymongo import ReturnDocument
+from services.view_counter import view_counter
+from services.unique_viewers import visitor_fingerprint
+from services.likes import toggle_like, delete_target_likes
+from services.bookmarks import toggle_bookmark, is_bookmarked, list_bookmarks, delete_target_bookmarks
+from services.stats import stats, agent_key
+from services.metrics import metrics
+from services.search import search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
 import uuid
 import math
 from datetime import datetime, timezone
@@ -26,6 +35,15 @@ def enrich_property(p):
     return p
 
 
+def add_location_filters(query, city="", commune="", neighborhood=""):
+    """Filter on the indexed normalized location keys instead of case-insensitive regex."""
+    for field, value in (("city_key", city), ("commune_key", commune), ("neighborhood_key", neighborhood)):
+        condition = location_filter(value or "")
+        if condition is not None:
+            query[field] = condition
+    return query
+
+
 # ─── Map Markers ────────────────────────────────────────────────────────────────
 
 @router.get("/properties/map/markers")
@@ -41,12 +59,9 @@ async def get_map_markers(
     query = {"latitude": {"$ne": None}, "longitude": {"$ne": None}}
     if type:
         query["type"] = type
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
+    add_location_filters(query, city=city, neighborhood=neighborhood)
     if status:
         query["status"] = status
-    if neighborhood:
-        query["neighborhood"] = {"$regex": neighborhood, "$options": "i"}
     if property_category:
         query["property_category"] = property_category
     if min_price > 0:
@@ -73,9 +88,7 @@ async def get_map_markers(
 @router.get("/properties/neighborhoods")
 async def get_neighborhoods(city: str = Query("", max_length=100)):
     """Get distinct neighborhoods, optionally filtered by city."""
-    query = {}
-    if city:
-        query["city"] = {"$regex": city, "$options": "i"}
+    query = add_location_filters({}, city=city)
     neighborhoods = await db.properties.distinct("neighborhood", query)
     return [n for n in neighborhoods if n]
 
@@ -187,11 +200,7 @@ async def estimate_price(
         }
 
     # Fallback to similar properties analysis
-    query = {"city": {"$regex": city, "$options": "i"}, "status": "disponible"}
-    if commune:
-        query["neighborhood"] = {"$regex": commune, "$options": "i"}
-    if neighborhood:
-        query["neighborhood"] = {"$regex": neighborhood, "$options": "i"}
+    query = add_location_filters({"status": "disponible"}, city=city, commune=commune, neighborhood=neighborhood)
     if property_category and property_category != "autre":
         query["property_category"] = property_category
     if bedrooms > 0:
@@ -200,7 +209,7 @@ async def estimate_price(
     similar = await db.properties.find(query, {"_id": 0, "price": 1, "surface_area": 1, "bedrooms": 1}).to_list(50)
 
     if not similar:
-        query = {"city": {"$regex": city, "$options": "i"}, "status": "disponible"}
+        query = add_location_filters({"status": "disponible"}, city=city)
         similar = await db.properties.find(query, {"_id": 0, "price": 1, "surface_area": 1}).to_list(50)
 
     if not similar:
@@ -240,10 +249,7 @@ async def get_properties(
     query = {}
     if type and type in PROPERTY_TYPES:
         query["type"] = type
-    if city:
-        query["city"] = {"$regex": city.strip(), "$options": "i"}
-    if neighborhood:
-        query["neighborhood"] = {"$regex": neighborhood.strip(), "$options": "i"}
+    add_location_filters(query, city=city, neighborhood=neighborhood)
     if property_category and property_category in PROPERTY_CATEGORIES:
         query["property_category"] = property_category
     if bedrooms is not None and bedrooms > 0:
@@ -286,18 +292,17 @@ async def get_property(property_id: str):
         raise HTTPException(status_code=404, detail="Annonce introuvable")
     author = await db.users.find_one({"id": prop.get("author_id", "")}, {"_id": 0, "username": 1})
     prop["author_username"] = author["username"] if author else ""
+    prop["views"] = prop.get("views", 0) + view_counter.pending_for("property", property_id)
     enrich_property(prop)
     return prop
 
 
 @router.post("/properties/{property_id}/view")
-async def view_property(property_id: str):
-    result = await db.properties.find_one_and_update(
-        {"id": property_id}, {"$inc": {"views": 1}},
-        projection={"_id": 0, "views": 1}, return_document=ReturnDocument.AFTER
-    )
-    if result:
-        await manager.broadcast_all({"type": "view_update", "content_type": "property", "id": property_id, "views": result["views"]})
+async def view_property(property_id: str, request: Request):
+    # Only existing listings are counted: the buffers and sketches are kept per id
+    if not await db.properties.find_one({"id": property_id}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Annonce introuvable")
+    view_counter.record("property", property_id, visitor=visitor_fingerprint(request))
     return {"ok": True}
 
 
@@ -330,7 +335,6 @@ async def create_property(data: PropertyCreate, current_user: dict = Depends(req
         "created_at": now,
         "views": 0,
         "likes_count": 0,
-        "liked_by": [],
         "property_category": data.property_category,
         "bedrooms": data.bedrooms,
         "bathrooms": data.bathrooms,
@@ -351,7 +355,13 @@ async def create_property(data: PropertyCreate, current_user: dict = Depends(req
         "show_phone": data.show_phone,
         "whatsapp_direct": data.whatsapp_direct,
     }
+    prop.update(location_keys(prop["city"], prop["commune"], prop["neighborhood"]))
     await db.properties.insert_one(prop)
+    await stats.track("property", after=prop)
+    suggest_index.put("property", prop)
+    feeds.put("property", prop)
+    search_cache.invalidate("property")
+    metrics.record("properties.created", {"city": prop.get("city_key", ""), "type": prop["type"]})
     prop["author_username"] = current_user.get("username", "")
     del prop["_id"]
     enrich_property(prop)
@@ -369,9 +379,9 @@ async def _notify_search_alerts(prop):
     alerts = await db.search_alerts.find({}, {"_id": 0}).to_list(500)
     for alert in alerts:
         match = True
-        if alert.get("city") and alert["city"].lower() not in prop.get("city", "").lower():
+        if alert.get("city") and not prop.get("city_key", "").startswith(fold_text(alert["city"])):
             match = False
-        if alert.get("neighborhood") and alert["neighborhood"].lower() not in prop.get("neighborhood", "").lower():
+        if alert.get("neighborhood") and not prop.get("neighborhood_key", "").startswith(fold_text(alert["neighborhood"])):
             match = False
         if alert.get("type") and alert["type"] != prop.get("type"):
             match = False
@@ -418,11 +428,25 @@ async def update_property(property_id: str, data: PropertyUpdate, current_user:
         updates["description"] = sanitize_html(updates["description"])
     if "city" in updates:
         updates["city"] = sanitize(updates["city"])
+    for field in ("neighborhood", "commune"):
+        if field in updates:
+            updates[field] = sanitize(updates[field])
     if "images" in updates:
         updates["images"] = [u for u in updates["images"] if u.startswith("http") or u.startswith("/api/media/")]
+    if {"city", "commune", "neighborhood"} & updates.keys():
+        updates.update(location_keys(
+            updates.get("city", prop.get("city", "")),
+            updates.get("commune", prop.get("commune", "")),
+            updates.get("neighborhood", prop.get("neighborhood", "")),
+        ))
 
     await db.properties.update_one({"id": property_id}, {"$set": updates})
+    before = dict(prop)
     prop.update(updates)
+    await stats.track("property", before, prop)
+    suggest_index.put("property", prop)
+    feeds.put("property", prop)
+    search_cache.invalidate("property")
     author = await db.users.find_one({"id": prop.get("author_id", "")}, {"_id": 0, "username": 1})
     prop["author_username"] = author["username"] if author else ""
     enrich_property(prop)
@@ -438,7 +462,12 @@ async def delete_property(property_id: str, current_user: dict = Depends(require
     if current_user.get("role") != "admin" and prop["author_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Vous ne pouvez supprimer que vos propres annonces")
     await db.properties.delete_one({"id": property_id})
-    await db.saved_properties.delete_many({"property_id": property_id})
+    await stats.track("property", before=prop)
+    suggest_index.remove("property", property_id)
+    feeds.remove("property", property_id)
+    search_cache.invalidate("property")
+    await delete_target_bookmarks("property", property_id)
+    await delete_target_likes("property", property_id)
     return {"ok": True}
 
 
@@ -463,14 +492,7 @@ async def toggle_save_property(property_id: str, current_user: dict = Depends(ge
     })
     if not prop:
         raise HTTPException(status_code=404, detail="Annonce introuvable")
-    existing = await db.saved_properties.find_one({"user_id": current_user["id"], "property_id": property_id})
-    if existing:
-        await db.saved_properties.delete_one({"user_id": current_user["id"], "property_id": property_id})
-        return {"action": "unsaved"}
-    await db.saved_properties.insert_one({
-        "id": str(uuid.uuid4()),
-        "user_id": current_user["id"],
-        "property_id": property_id,
+    saved = await toggle_bookmark(current_user["id"], "property", property_id, {
         "title": prop.get("title", ""),
         "type": prop.get("type", ""),
         "price": prop.get("price", 0),
@@ -480,20 +502,18 @@ async def toggle_save_property(property_id: str, current_user: dict = Depends(ge
         "image_url": prop.get("images", [None])[0] if prop.get("images") else None,
         "bedrooms": prop.get("bedrooms", 0),
         "surface_area": prop.get("surface_area", 0),
-        "saved_at": datetime.now(timezone.utc).isoformat(),
     })
-    return {"action": "saved"}
+    return {"action": "saved" if saved else "unsaved"}
 
 
 @router.get("/saved-properties/{property_id}/status")
 async def get_saved_property_status(property_id: str, current_user: dict = Depends(get_current_user)):
-    existing = await db.saved_properties.find_one({"user_id": current_user["id"], "property_id": property_id})
-    return {"is_saved": existing is not None}
+    return {"is_saved": await is_bookmarked(current_user["id"], "property", property_id)}
 
 
 @router.get("/saved-properties", response_model=List[SavedPropertyOut])
 async def get_saved_properties(current_user: dict = Depends(get_current_user)):
-    saved = await db.saved_properties.find({"user_id": current_user["id"]}, {"_id": 0}).sort("saved_at", -1).to_list(100)
+    saved = await list_bookmarks(current_user["id"], "property")
     return [SavedPropertyOut(**s) for s in saved]
 
 
@@ -544,12 +564,7 @@ async def get_agent_profile(agent_id: str):
     user = await db.users.find_one({"id": agent_id}, {"_id": 0, "hashed_password": 0})
     if not user or user.get("role") not in ("agent", "admin"):
         raise HTTPException(status_code=404, detail="Agent introuvable")
-    # Count properties
-    total_props = await db.properties.count_documents({"author_id": agent_id})
-    available_props = await db.properties.count_documents({"author_id": agent_id, "status": "disponible"})
-    total_views = 0
-    async for p in db.properties.find({"author_id": agent_id}, {"_id": 0, "views": 1}):
-        total_views += p.get("views", 0)
+    agent_stats = await stats.get(agent_key(agent_id))
     return {
         "id": user["id"],
         "username": user.get("username", ""),
@@ -560,9 +575,10 @@ async def get_agent_profile(agent_id: str):
         "phone": user.get("phone", ""),
         "avatar_url": user.get("avatar_url", ""),
         "stats": {
-            "total_properties": total_props,
-            "available_properties": available_props,
-            "total_views": total_views,
+            "total_properties": agent_stats.get("properties", 0),
+            "available_properties": agent_stats.get("properties_available", 0),
+            "total_views": agent_stats.get("property_views", 0),
+            "unique_viewers": agent_stats.get("unique_viewers", 0),
         }
     }
 
@@ -585,25 +601,16 @@ async def get_agent_properties(agent_id: str):
 
 @router.post("/properties/{property_id}/like")
 async def toggle_property_like(property_id: str, current_user: dict = Depends(get_current_user)):
-    prop = await db.properties.find_one({"id": property_id}, {"_id": 0, "id": 1, "liked_by": 1, "title": 1, "author_id": 1})
+    prop = await db.properties.find_one({"id": property_id}, {"_id": 0, "id": 1, "title": 1, "author_id": 1})
     if not prop:
         raise HTTPException(status_code=404, detail="Annonce introuvable")
 
     user_id = current_user["id"]
-    liked_by = prop.get("liked_by", [])
-    already_liked = user_id in liked_by
-
-    if already_liked:
-        await db.properties.update_one(
-            {"id": property_id},
-            {"$pull": {"liked_by": user_id}, "$inc": {"likes_count": -1}}
-        )
+    result = await toggle_like(user_id, "property", property_id)
+
+    if not result["liked"]:
         action = "unlike"
     else:
-        await db.properties.update_one(
-            {"id": property_id},
-            {"$addToSet": {"liked_by": user_id}, "$inc": {"likes_count": 1}}
-        )
         action = "like"
         if prop.get("author_id") and prop["author_id"] != user_id:
             await db.user_notifications.insert_one({
@@ -615,9 +622,7 @@ async def toggle_property_like(property_id: str, current_user: dict = Depends(ge
                 "created_at": datetime.now(timezone.utc).isoformat(),
             })
 
-    updated = await db.properties.find_one({"id": property_id}, {"_id": 0, "likes_count": 1, "liked_by": 1})
-    await manager.broadcast_all({"type": "like_update", "content_type": "property", "id": property_id, "likes_count": updated.get("likes_count", 0), "liked_by": updated.get("liked_by", [])})
-    return {"action": action, "likes_count": updated.get("likes_count", 0), "liked_by": updated.get("liked_by", [])}
+    return {"action": action, "liked": result["liked"], "likes_count": result["likes_count"]}
 
 
 
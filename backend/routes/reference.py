@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request, Query
+from fastapi.responses import Response
+from services.reference import reference_bundle
+from utils import etag_matches
+
+router = APIRouter(tags=["reference"])
+
+# Unversioned URL: revalidate often (a 304 when nothing changed).
+# ?v=<version> URL: its content never changes.
+REVALIDATE = "public, max-age=300, must-revalidate"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/reference")
+async def get_reference_bundle(request: Request, v: int = Query(None)):
+    """Locations, procedure reference lists and price references in one cacheable document."""
+    bundle = await reference_bundle.get()
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{bundle.etag}-gzip"' if use_gzip else f'"{bundle.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if v == bundle.version else REVALIDATE,
+        "Vary": "Accept-Encoding",
+        "X-Reference-Version": str(bundle.version),
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), bundle.etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=bundle.gzipped, media_type="application/json", headers=headers)
+    return Response(content=bundle.body, media_type="application/json", headers=headers)
@@ -14,6 +14,12 @@ from routes.admin import router as admin_router
 from routes.notifications import router as notifications_router
 from routes.messages import router as messages_router
 from routes.fiches import router as fiches_router
+from routes.likes import router as likes_router
+from routes.bookmarks import router as bookmarks_router
+from routes.metrics import router as metrics_router
+from routes.jobs import router as jobs_router
+from routes.reference import router as reference_router
+from routes.feeds import router as feeds_router
 from database import db
 import logging
 
@@ -44,9 +50,15 @@ app.include_router(procedures_router, prefix=PREFIX)
 app.include_router(payments_router, prefix=PREFIX)
 app.include_router(upload_router, prefix=PREFIX)
 app.include_router(admin_router, prefix=f"{PREFIX}/admin")
+app.include_router(metrics_router, prefix=f"{PREFIX}/admin")
+app.include_router(jobs_router, prefix=f"{PREFIX}/admin")
 app.include_router(notifications_router, prefix=PREFIX)
 app.include_router(messages_router, prefix=PREFIX)
 app.include_router(fiches_router, prefix=PREFIX)
+app.include_router(likes_router, prefix=PREFIX)
+app.include_router(bookmarks_router, prefix=PREFIX)
+app.include_router(reference_router, prefix=PREFIX)
+app.include_router(feeds_router, prefix=PREFIX)
 
 # ─── Root ──────────────────────────────────────────────────────────────────────
 @app.get("/api/")
@@ -89,25 +101,20 @@ async def public_price_references(city: str = FQ(""), commune: str = FQ(""), qua
 
 # ─── Global Search ─────────────────────────────────────────────────────────────
 from fastapi import Query as Q
+from services import search as search_service
+from services.suggest import suggest_index
 
 @app.get("/api/search")
 async def global_search(q: str = Q("", max_length=200)):
     if not q.strip():
         return {"articles": [], "properties": [], "procedures": []}
-    regex = {"$regex": q.strip(), "$options": "i"}
-    articles = await db.articles.find(
-        {"$or": [{"title": regex}, {"content": regex}]}, {"_id": 0, "id": 1, "title": 1, "category": 1, "image_url": 1, "author_name": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(5).to_list(5)
-    properties = await db.properties.find(
-        {"$or": [{"title": regex}, {"description": regex}, {"city": regex}]}, {"_id": 0, "id": 1, "title": 1, "type": 1, "city": 1, "price": 1, "currency": 1, "images": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(5).to_list(5)
-    for p in properties:
-        p["image"] = p.get("images", [None])[0] if p.get("images") else None
-        p.pop("images", None)
-    procedures = await db.procedures.find(
-        {"$or": [{"title": regex}, {"content": regex}]}, {"_id": 0, "id": 1, "title": 1, "country": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(5).to_list(5)
-    return {"articles": articles, "properties": properties, "procedures": procedures}
+    return await search_service.global_search(q.strip())
+
+
+@app.get("/api/suggest")
+async def suggest(q: str = Q("", max_length=100), limit: int = Q(8, ge=1, le=20)):
+    """Typeahead: answered from the in-memory prefix index (services/suggest.py)."""
+    return {"q": q, "suggestions": suggest_index.suggest(q, limit)}
 
 # ─── Serve uploaded files (local legacy + cloud proxy) ─────────────────────────
 app.mount("/api/media/images", StaticFiles(directory=str(UPLOAD_DIR / "images")), name="media_images")
@@ -127,6 +134,31 @@ async def serve_cloud_media(path: str):
 # ─── Startup ───────────────────────────────────────────────────────────────────
 @app.on_event("startup")
 async def startup_init():
+    try:
+        from database import ensure_indexes
+        await ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Index creation deferred: {e}")
+    from services.view_counter import view_counter
+    from services.unique_viewers import unique_viewers
+    from services.stats import stats
+    from services.metrics import metrics
+    from services.jobs import job_queue
+    from services.pdf_pool import pdf_pool
+    from services.content_pipeline import content_pipeline
+    from services.suggest import suggest_index
+    from services.feeds import feeds
+    from services.scheduler import scheduled_publisher
+    view_counter.start()
+    unique_viewers.start()
+    stats.start()
+    metrics.start()
+    job_queue.start()
+    pdf_pool.start()
+    content_pipeline.start()
+    suggest_index.start()
+    feeds.start()
+    scheduled_publisher.start()
     try:
         from cloud_storage import init_storage
         init_storage()
@@ -136,4 +168,26 @@ async def startup_init():
 # ─── Shutdown ──────────────────────────────────────────────────────────────────
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    from services.view_counter import view_counter
+    from services.unique_viewers import unique_viewers
+    from services.stats import stats
+    from services.metrics import metrics
+    from services.jobs import job_queue
+    from services.pdf_pool import pdf_pool
+    from services.content_pipeline import content_pipeline
+    from services.suggest import suggest_index
+    from services.feeds import feeds
+    from services.scheduler import scheduled_publisher
+    from services.autosave import autosave_buffer
+    await scheduled_publisher.stop()
+    await autosave_buffer.stop()
+    await job_queue.stop()
+    await pdf_pool.stop()
+    await content_pipeline.stop()
+    await suggest_index.stop()
+    await feeds.stop()
+    await view_counter.stop()
+    await unique_viewers.stop()
+    await stats.stop()
+    await metrics.stop()
     client.close()
@@ -0,0 +1,189 @@
+"""
+Job handlers for heavy admin operations (see services/jobs.py).
+"""
+import statistics
+from collections import defaultdict
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from database import db
+from config import EXPORT_DIR
+from services.jobs import JobContext, job_handler
+from services.exports import (
+    FORMATS, ROWS_PER_CHUNK, ROW_GROUP_SIZE,
+    get_export, select_columns, export_query, stream_csv, stream_columnar,
+)
+from services.stats import stats, GLOBAL_KEY, author_key, agent_key
+from services.reference import reference_bundle
+from services.likes import delete_user_likes, delete_targets_likes
+from services.bookmarks import delete_users_bookmarks, delete_targets_bookmarks
+from services.search import search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.scheduler import scheduled_publisher
+from services.article_render import article_render
+
+MIN_PRICE_SAMPLES = 3
+
+
+# ─── User deletion cascade ────────────────────────────────────────────────────
+
+@job_handler("delete_user")
+async def delete_user_data(ctx: JobContext):
+    """Remove everything owned by already deleted user accounts (`user_id` or `user_ids`)."""
+    user_ids = ctx.params.get("user_ids") or [ctx.params["user_id"]]
+    owned = {"author_id": {"$in": user_ids}}
+    article_ids = [a["id"] for a in await db.articles.find(owned, {"_id": 0, "id": 1}).to_list(None)]
+    property_ids = [p["id"] for p in await db.properties.find(owned, {"_id": 0, "id": 1}).to_list(None)]
+
+    async def delete_items(kind: str, collection: str, ids: list):
+        # Likes and bookmarks left on the removed items would dangle in other users' lists
+        await delete_targets_likes(kind, ids)
+        await delete_targets_bookmarks(kind, ids)
+        result = await db[collection].delete_many({"id": {"$in": ids}})
+        # Same invalidations as the admin bulk delete (routes/admin.py)
+        for item_id in ids:
+            suggest_index.remove(kind, item_id)
+            feeds.remove(kind, item_id)
+            if kind == "article":
+                scheduled_publisher.discard(item_id)
+                article_render.invalidate(item_id)
+        if ids:
+            search_cache.invalidate(kind)
+        return result
+
+    steps = [
+        # First: the counts of the items they liked go down while those still exist
+        ("likes", lambda: delete_user_likes(user_ids)),
+        ("bookmarks", lambda: delete_users_bookmarks(user_ids)),
+        ("articles", lambda: delete_items("article", "articles", article_ids)),
+        ("properties", lambda: delete_items("property", "properties", property_ids)),
+        ("payments", lambda: db.payments.delete_many({"user_id": {"$in": user_ids}})),
+    ]
+    deleted = {}
+    for i, (name, step) in enumerate(steps):
+        await ctx.progress(i, len(steps), f"Suppression: {name}")
+        result = await step()
+        deleted[name] = result if isinstance(result, int) else getattr(result, "deleted_count", None)
+    await stats.drop(*[key(uid) for uid in user_ids for key in (author_key, agent_key)])
+    await stats.refresh(GLOBAL_KEY)
+    await ctx.progress(len(steps), len(steps), "Termine")
+    return {"deleted": deleted}
+
+
+# ─── Exports to file ──────────────────────────────────────────────────────────
+
+def _validate_export(params: dict):
+    if params.get("format", "csv") not in FORMATS:
+        raise HTTPException(status_code=400, detail="Format invalide")
+    select_columns(get_export(params.get("name", "")), params.get("fields", ""))
+    export_query(params.get("since", ""))
+
+
+@job_handler("export", validate=_validate_export)
+async def export_to_file(ctx: JobContext):
+    params = ctx.params
+    fmt = params.get("format", "csv")
+    spec = get_export(params["name"])
+    columns = select_columns(spec, params.get("fields", ""))
+    query = export_query(params.get("since", ""))
+    compress = fmt == "csv" and bool(params.get("gzip"))
+    ext = "csv.gz" if compress else FORMATS[fmt][1]
+
+    total = await db[spec["collection"]].count_documents(query)
+    await ctx.progress(0, total, "Export en cours")
+    if fmt == "csv":
+        chunks, rows_per_chunk = stream_csv(spec, columns, compress=compress, query=query), ROWS_PER_CHUNK
+    else:
+        chunks, rows_per_chunk = stream_columnar(spec, columns, fmt, query=query), ROW_GROUP_SIZE
+
+    path = EXPORT_DIR / f"{ctx.id}.{ext}"
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            written = 0
+            async for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+                written += 1
+                await ctx.progress(min(total, written * rows_per_chunk), total, "Export en cours")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    await ctx.progress(total, total, "Termine")
+    return {
+        "path": str(path), "filename": f"{spec['filename']}.{ext}",
+        "media_type": "application/gzip" if compress else FORMATS[fmt][0],
+        "rows": total, "size": size,
+    }
+
+
+# ─── Image migration to cloud storage ─────────────────────────────────────────
+
+@job_handler("migrate_images", max_attempts=1)
+async def migrate_images_job(ctx: JobContext):
+    import migrate_images
+
+    steps = [
+        ("uploads", migrate_images.bulk_upload_remaining),
+        ("articles", migrate_images.migrate_articles),
+        ("properties", migrate_images.migrate_properties),
+        ("procedures", migrate_images.migrate_procedures),
+        ("avatars", migrate_images.migrate_user_avatars),
+    ]
+    migrated = {}
+    for i, (name, step) in enumerate(steps):
+        await ctx.progress(i, len(steps), f"Migration: {name}")
+        migrated[name] = await step()
+    await ctx.progress(len(steps), len(steps), "Termine")
+    return {"migrated": migrated}
+
+
+# ─── Price references from listings ───────────────────────────────────────────
+
+@job_handler("recompute_price_references")
+async def recompute_price_references(ctx: JobContext):
+    """Median GNF price per m² of available listings, per quartier, commune and city.
+
+    References set by hand by an admin (no `source: computed`) are kept.
+    """
+    samples = defaultdict(list)  # (city, commune, quartier) -> prices per m²
+    query = {"status": "disponible", "currency": {"$in": ["GNF", None]}, "price": {"$gt": 0}, "surface_area": {"$gt": 0}}
+    projection = {"_id": 0, "city": 1, "commune": 1, "neighborhood": 1, "price": 1, "surface_area": 1}
+    total = await db.properties.count_documents(query)
+    await ctx.progress(0, total, "Lecture des annonces")
+    done = 0
+    async for p in db.properties.find(query, projection).batch_size(1000):
+        city, commune, quartier = p.get("city", ""), p.get("commune") or "", p.get("neighborhood") or ""
+        if not city:
+            continue
+        ratio = p["price"] / p["surface_area"]
+        samples[(city, "", "")].append(ratio)
+        if commune:
+            samples[(city, commune, "")].append(ratio)
+            if quartier:
+                samples[(city, commune, quartier)].append(ratio)
+        done += 1
+        if done % 1000 == 0:
+            await ctx.progress(done, total, "Lecture des annonces")
+
+    manual = set()
+    async for ref in db.price_references.find({"source": {"$ne": "computed"}}, {"_id": 0, "city": 1, "commune": 1, "quartier": 1}):
+        manual.add((ref.get("city", ""), ref.get("commune", ""), ref.get("quartier", "")))
+
+    now = datetime.now(timezone.utc).isoformat()
+    ops = []
+    for (city, commune, quartier), ratios in samples.items():
+        if len(ratios) < MIN_PRICE_SAMPLES or (city, commune, quartier) in manual:
+            continue
+        key = {"city": city, "commune": commune, "quartier": quartier}
+        ops.append(UpdateOne(key, {"$set": {
+            **key, "price_per_sqm": float(round(statistics.median(ratios))),
+            "sample_count": len(ratios), "source": "computed", "updated_at": now,
+        }}, upsert=True))
+    await ctx.progress(total, total, "Enregistrement")
+    for i in range(0, len(ops), 500):
+        await db.price_references.bulk_write(ops[i:i + 500], ordered=False)
+    if ops:
+        await reference_bundle.bump()
+    return {"references": len(ops), "listings": done, "kept_manual": len(manual)}
@@ -0,0 +1,105 @@
+"""
+ZIP archives streamed while their members are still being fetched.
+
+Up to FETCH_CONCURRENCY members are downloaded at once, each into a spooled
+temporary file (in memory up to SPOOL_MAX_MEMORY, on disk beyond), and
+written to the archive in the order they complete. A member's slot is only
+released once it has been written, so memory stays bounded whatever the
+number and size of the files, and the first bytes go out as soon as the
+first member is ready.
+
+Members that fail to download are left out and listed in a text file at the
+end of the archive, since the response has already started by then.
+"""
+import asyncio
+import logging
+import tempfile
+import time
+import zipfile
+from typing import AsyncIterator, BinaryIO, Callable, List, NamedTuple
+from services.exports import StreamSink
+
+logger = logging.getLogger(__name__)
+
+FETCH_CONCURRENCY = 4
+SPOOL_MAX_MEMORY = 1024 * 1024
+COPY_CHUNK = 64 * 1024
+MISSING_FILES_NAME = "fichiers_manquants.txt"
+
+# Already compressed formats are stored as is
+STORED_TYPES = ("image/jpeg", "image/png", "image/webp", "application/zip", "video/")
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    fetch: Callable[[BinaryIO], None]  # blocking; writes the content into the file
+    content_type: str = ""
+
+
+def unique_names(names: List[str]) -> List[str]:
+    """Make archive member names unique: `a.pdf`, `a (2).pdf`, ..."""
+    seen = {}
+    result = []
+    for name in names:
+        name = name.replace("/", "_").replace("\\", "_").strip() or "fichier"
+        count = seen.get(name.lower(), 0) + 1
+        seen[name.lower()] = count
+        if count > 1:
+            stem, dot, ext = name.rpartition(".")
+            name = f"{stem} ({count}).{ext}" if dot and stem else f"{name} ({count})"
+        result.append(name)
+    return result
+
+
+def _compression(content_type: str) -> int:
+    if any(content_type.startswith(t) for t in STORED_TYPES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+async def stream_zip(members: List[ArchiveMember]) -> AsyncIterator[bytes]:
+    sink = StreamSink()
+    archive = zipfile.ZipFile(sink, "w")
+    slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+    ready: asyncio.Queue = asyncio.Queue()
+
+    async def fetch(member: ArchiveMember):
+        await slots.acquire()
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            await asyncio.to_thread(member.fetch, spool)
+            await ready.put((member, spool, None))
+        except Exception as e:
+            spool.close()
+            await ready.put((member, None, e))
+
+    tasks = [asyncio.create_task(fetch(m)) for m in members]
+    missing = []
+    try:
+        for _ in members:
+            member, spool, error = await ready.get()
+            if error is not None:
+                logger.warning(f"Archive member {member.name} skipped: {error}")
+                missing.append(member.name)
+                slots.release()
+                continue
+            try:
+                spool.seek(0)
+                info = zipfile.ZipInfo(member.name, date_time=time.localtime()[:6])
+                info.compress_type = _compression(member.content_type)
+                with archive.open(info, "w") as out:
+                    while chunk := spool.read(COPY_CHUNK):
+                        out.write(chunk)
+                        data = sink.take()
+                        if data:
+                            yield data
+            finally:
+                spool.close()
+                slots.release()
+        if missing:
+            archive.writestr(MISSING_FILES_NAME, "Fichiers indisponibles :\n" + "\n".join(missing) + "\n")
+        archive.close()
+        yield sink.take()
+    finally:
+        for task in tasks:
+            task.cancel()
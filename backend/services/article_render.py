@@ -0,0 +1,182 @@
+"""
+Server-rendered pages of published articles, for crawlers and link previews.
+
+A page is a small HTML document with the title, meta description, canonical
+link and OpenGraph/Twitter tags, and the article body rendered from its
+blocks (or its HTML content for older articles). The HTML is sanitized
+again here: articles saved before the content pipeline may hold it as the
+editor sent it, and this page is served without the SPA's DOMPurify pass.
+It is rendered once per
+version of the article (`updated_at`), gzip-compressed, and kept in memory
+with a hash of the body as ETag; only the compressed bytes are stored.
+
+Pages are served from memory: `update_article`, `delete_article` and the
+other article writes call `invalidate()`. Writes made by another process are
+noticed when the page is REVALIDATE_SECONDS old, with a lookup of the
+version only; the page is rendered again only if it changed. Missing and
+unpublished articles are remembered for REVALIDATE_SECONDS too, so crawlers
+asking for them again do not reach the database either; they are kept apart
+from the pages, in a smaller LRU of MAX_MISSES ids, so a crawler walking
+unknown ids cannot evict the rendered pages.
+"""
+import gzip
+import hashlib
+import html
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+from config import SITE_URL
+from database import db
+from utils import sanitize_html, sanitize_url
+
+MAX_PAGES = 2000
+MAX_MISSES = 500
+REVALIDATE_SECONDS = 300
+DESCRIPTION_LENGTH = 200
+
+YOUTUBE_ID = re.compile(r"(?:youtube\.com/watch\?v=|youtu\.be/)([^&]+)")
+
+
+def _attr(value) -> str:
+    return html.escape(str(value or ""), quote=True)
+
+
+def _absolute(url: str, site_url: str) -> str:
+    return f"{site_url}{url}" if url and url.startswith("/") else url or ""
+
+
+def _render_block(block: dict) -> str:
+    kind, data = block.get("type"), block.get("data") or {}
+    if kind == "text" and data.get("content"):
+        return f"<div>{sanitize_html(data['content'])}</div>"
+    if kind == "image" and sanitize_url(data.get("url")):
+        caption = f"<figcaption>{_attr(data.get('caption'))}</figcaption>" if data.get("caption") else ""
+        return (f'<figure><img src="{_attr(sanitize_url(data["url"]))}" '
+                f'alt="{_attr(data.get("alt") or data.get("caption"))}" loading="lazy">{caption}</figure>')
+    if kind == "video" and sanitize_url(data.get("url")):
+        match = YOUTUBE_ID.search(data["url"])
+        url = f"https://www.youtube.com/embed/{match.group(1)}" if match else sanitize_url(data["url"])
+        return f'<p><a href="{_attr(url)}">{_attr(data.get("caption") or "Video")}</a></p>'
+    if kind == "quote" and data.get("text"):
+        author = f"<footer>{_attr(data.get('author'))}</footer>" if data.get("author") else ""
+        return f"<blockquote><p>{_attr(data['text'])}</p>{author}</blockquote>"
+    if kind == "alert" and data.get("content"):
+        return f"<aside><p>{_attr(data['content'])}</p></aside>"
+    if kind == "table" and data.get("headers"):
+        head = "".join(f"<th>{_attr(h)}</th>" for h in data["headers"])
+        rows = "".join("<tr>" + "".join(f"<td>{_attr(c)}</td>" for c in row) + "</tr>"
+                       for row in data.get("rows") or [])
+        return f"<table><thead><tr>{head}</tr></thead><tbody>{rows}</tbody></table>"
+    return ""
+
+
+def render(article: dict, site_url: str) -> str:
+    """HTML page of a published article."""
+    url = f"{site_url}/article/{article['id']}"
+    title = article.get("meta_title") or article.get("title", "")
+    description = (article.get("meta_description") or article.get("subtitle")
+                   or article.get("excerpt", ""))[:DESCRIPTION_LENGTH]
+    image = _absolute(sanitize_url(article.get("image_url") or article.get("first_image")) or "", site_url)
+    blocks = article.get("blocks") or []
+    body = "".join(_render_block(b) for b in blocks) if blocks else sanitize_html(article.get("content", ""))
+    meta = [
+        ("name", "description", description),
+        ("property", "og:type", "article"),
+        ("property", "og:title", title),
+        ("property", "og:description", description),
+        ("property", "og:url", url),
+        ("property", "article:published_time", article.get("published_at")),
+        ("property", "article:modified_time", article.get("updated_at")),
+        ("property", "article:section", article.get("category")),
+        ("name", "author", article.get("author_name")),
+        ("name", "twitter:card", "summary_large_image" if image else "summary"),
+        ("name", "twitter:title", title),
+        ("name", "twitter:description", description),
+    ]
+    if image:
+        meta += [("property", "og:image", image), ("name", "twitter:image", image)]
+    meta += [("property", "article:tag", tag) for tag in article.get("tags") or []]
+    tags = "\n".join(f'<meta {attr}="{name}" content="{_attr(value)}">' for attr, name, value in meta if value)
+    subtitle = f"<p>{_attr(article['subtitle'])}</p>" if article.get("subtitle") else ""
+    return (
+        '<!DOCTYPE html>\n<html lang="fr">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{_attr(title)}</title>\n"
+        f'<link rel="canonical" href="{_attr(url)}">\n{tags}\n</head>\n'
+        f"<body>\n<article>\n<h1>{_attr(article.get('title'))}</h1>\n{subtitle}\n{body}\n</article>\n"
+        "</body>\n</html>\n"
+    )
+
+
+class Page:
+    def __init__(self, version: Optional[str], body: bytes):
+        self.version = version
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.checked_at = time.monotonic()
+
+    @property
+    def body(self) -> bytes:
+        return gzip.decompress(self.gzipped)
+
+
+class ArticleRenderCache:
+    def __init__(self, max_pages: int = MAX_PAGES, ttl: float = REVALIDATE_SECONDS, site_url: str = SITE_URL,
+                 max_misses: int = MAX_MISSES):
+        self.max_pages = max_pages
+        self.max_misses = max_misses
+        self.site_url = site_url  # fixed per process: pages are cached by article id only
+        self.ttl = ttl
+        self._pages: "OrderedDict[str, Page]" = OrderedDict()
+        self._misses: "OrderedDict[str, float]" = OrderedDict()  # article id -> checked_at
+        self.hits = 0
+        self.renders = 0
+
+    def _store(self, article_id: str, page: Page) -> Page:
+        self._misses.pop(article_id, None)
+        self._pages[article_id] = page
+        self._pages.move_to_end(article_id)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return page
+
+    def _store_miss(self, article_id: str):
+        self._pages.pop(article_id, None)
+        self._misses[article_id] = time.monotonic()
+        self._misses.move_to_end(article_id)
+        while len(self._misses) > self.max_misses:
+            self._misses.popitem(last=False)
+
+    async def get(self, article_id: str) -> Optional[Page]:
+        """Rendered page, or None when the article does not exist or is not published."""
+        now = time.monotonic()
+        missed_at = self._misses.get(article_id)
+        if missed_at is not None and now - missed_at < self.ttl:
+            self.hits += 1
+            return None
+        page = self._pages.get(article_id)
+        if page is not None and now - page.checked_at < self.ttl:
+            self._pages.move_to_end(article_id)
+            self.hits += 1
+            return page
+        if page is not None:
+            current = await db.articles.find_one(
+                {"id": article_id, "status": "published"}, {"_id": 0, "updated_at": 1},
+            )
+            if current is not None and current.get("updated_at") == page.version:
+                page.checked_at = time.monotonic()
+                self.hits += 1
+                return page
+        article = await db.articles.find_one({"id": article_id, "status": "published"}, {"_id": 0})
+        if article is None:
+            self._store_miss(article_id)
+            return None
+        self.renders += 1
+        body = render(article, self.site_url).encode("utf-8")
+        return self._store(article_id, Page(article.get("updated_at"), body))
+
+    def invalidate(self, article_id: str):
+        self._pages.pop(article_id, None)
+        self._misses.pop(article_id, None)
+
+article_render = ArticleRenderCache()
@@ -0,0 +1,253 @@
+"""
+Coalesced, versioned article autosave.
+
+The editor sends only what changed since the draft version it last saw
+(`base_version`): edited fields, added/replaced/deleted blocks and the block
+order. Patches are applied to an in-memory copy of the article; only the
+changed fields and blocks are sanitized. The article is written once,
+FLUSH_DELAY seconds after the first unsaved patch, with `$set` on the changed
+fields only (single blocks by position while the block list keeps its shape).
+
+Every patch increments the draft version. A patch whose base is not the
+current version is refused with AutosaveConflict instead of overwriting the
+other edit. Writes are guarded by the version stored in the article
+(`draft_version`), which a full save also increments, so a draft pending in
+one process never overwrites a newer save made elsewhere: it is dropped. The
+author is told at once over the websocket, and the version that was lost is
+kept so the editor's next patch, based on it, gets the conflict with that
+version (rather than being taken for patches held elsewhere). A patch based on a version
+newer than the stored one means another process still holds the editor's
+latest patches: it is refused with AutosavePending, and the editor retries
+once they are written (the request never waits for them).
+"""
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from database import db
+from routes.messages import manager
+from models.article import ArticleAutosave
+from utils import sanitize, sanitize_html, sanitize_url, sanitize_block
+from services.content_pipeline import derive
+from services.search import search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.article_render import article_render
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DELAY = 10  # seconds between the first unsaved patch and the write
+IDLE_SECONDS = 600  # drafts untouched for this long are forgotten (once written)
+
+FIELD_CLEANERS = {
+    "title": sanitize,
+    "subtitle": sanitize,
+    "content": sanitize_html,
+    "category": str,
+    "tags": lambda tags: [sanitize(t) for t in tags[:10]],
+    "image_url": sanitize_url,
+    "meta_title": sanitize,
+    "meta_description": sanitize,
+}
+
+
+class AutosaveConflict(Exception):
+    def __init__(self, version: int, lost: Optional[int] = None):
+        super().__init__(f"Draft is at version {version}")
+        self.version = version
+        self.lost = lost  # acknowledged draft version that was dropped, if any
+
+
+class AutosavePending(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Draft not written yet, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _stored_version(article: dict) -> int:
+    return article.get("draft_version") or 0
+
+
+class Draft:
+    def __init__(self, article: dict):
+        self.article = article
+        self.version = _stored_version(article)
+        self.saved_version = self.version
+        self.fields: Set[str] = set()
+        self.blocks: Set[str] = set()  # ids of replaced blocks
+        self.reshaped = False  # blocks added, deleted or reordered
+        self.lock = asyncio.Lock()
+        self.flush_task: Optional[asyncio.Task] = None
+        self.touched = time.monotonic()
+
+    @property
+    def dirty(self) -> bool:
+        return self.version != self.saved_version
+
+
+class AutosaveBuffer:
+    def __init__(self, delay: float = FLUSH_DELAY):
+        self.delay = delay
+        self.drafts: Dict[str, Draft] = {}
+        # article id -> (dropped draft version, monotonic time of the drop)
+        self.lost: Dict[str, Tuple[int, float]] = {}
+        self.patches = 0
+        self.writes = 0
+        self.conflicts = 0
+
+    async def _load(self, article_id: str) -> Optional[Draft]:
+        article = await db.articles.find_one({"id": article_id}, {"_id": 0})
+        if not article:
+            self.drafts.pop(article_id, None)
+            return None
+        draft = self.drafts[article_id] = Draft(article)
+        return draft
+
+    async def get(self, article_id: str) -> Optional[Draft]:
+        self._forget_idle()
+        return self.drafts.get(article_id) or await self._load(article_id)
+
+    def _forget_idle(self):
+        limit = time.monotonic() - IDLE_SECONDS
+        for article_id in [a for a, d in self.drafts.items() if d.touched < limit and not d.dirty]:
+            del self.drafts[article_id]
+        for article_id in [a for a, (_, dropped) in self.lost.items() if dropped < limit]:
+            del self.lost[article_id]
+
+    async def apply(self, draft: Draft, patch: ArticleAutosave) -> Draft:
+        """Apply a patch; returns the (possibly reloaded) draft holding the new version."""
+        article_id = draft.article["id"]
+        lost = self.lost.pop(article_id, None)
+        if lost and patch.base_version == lost[0]:
+            # Based on patches we acknowledged, then dropped
+            self.conflicts += 1
+            raise AutosaveConflict(draft.version, lost=lost[0])
+        if patch.base_version != draft.version and not draft.dirty:
+            # Our copy may be behind a save made elsewhere, or another process
+            # may still hold this editor's recent patches (written within `delay`)
+            draft = await self._load(article_id)
+            if draft is None:
+                raise AutosaveConflict(0)
+            if patch.base_version > draft.version:
+                raise AutosavePending(math.ceil(self.delay) + 1)
+        async with draft.lock:
+            if patch.base_version != draft.version:
+                self.conflicts += 1
+                raise AutosaveConflict(draft.version)
+            self._apply(draft, patch)
+            draft.version += 1
+            draft.touched = time.monotonic()
+            self.patches += 1
+            if draft.flush_task is None or draft.flush_task.done():
+                draft.flush_task = asyncio.create_task(self._flush_later(article_id))
+        return draft
+
+    def _apply(self, draft: Draft, patch: ArticleAutosave):
+        article = draft.article
+        for field, clean in FIELD_CLEANERS.items():
+            value = getattr(patch, field)
+            if value is not None and value != article.get(field):
+                article[field] = clean(value)
+                draft.fields.add(field)
+        blocks: List[dict] = article.setdefault("blocks", [])
+        positions = {b.get("id"): i for i, b in enumerate(blocks)}
+        for change in patch.blocks:
+            if change.op == "delete":
+                if change.id in positions:
+                    blocks[:] = [b for b in blocks if b.get("id") != change.id]
+                    positions = {b.get("id"): i for i, b in enumerate(blocks)}
+                    draft.reshaped = True
+                continue
+            if change.block is None:
+                continue
+            block = sanitize_block({**change.block.model_dump(), "id": change.id})
+            if change.id in positions:
+                if blocks[positions[change.id]] != block:
+                    blocks[positions[change.id]] = block
+                    draft.blocks.add(change.id)
+            else:
+                positions[change.id] = len(blocks)
+                blocks.append(block)
+                draft.reshaped = True
+        if patch.order is not None:
+            by_id = {b.get("id"): b for b in blocks}
+            ordered = [by_id.pop(i) for i in patch.order if i in by_id] + list(by_id.values())
+            if [b.get("id") for b in ordered] != [b.get("id") for b in blocks]:
+                blocks[:] = ordered
+                draft.reshaped = True
+
+    async def _flush_later(self, article_id: str):
+        await asyncio.sleep(self.delay)
+        try:
+            await self.flush(article_id)
+        except Exception as e:
+            logger.error(f"Autosave flush of {article_id} failed: {e}")
+
+    def pending(self, article_id: str) -> bool:
+        draft = self.drafts.get(article_id)
+        return draft is not None and draft.dirty
+
+    async def flush(self, article_id: str):
+        draft = self.drafts.get(article_id)
+        if draft is None:
+            return
+        async with draft.lock:
+            if not draft.dirty:
+                return
+            article = draft.article
+            updates = {f: article.get(f) for f in draft.fields}
+            if draft.reshaped:
+                updates["blocks"] = article["blocks"]
+            else:
+                positions = {b.get("id"): i for i, b in enumerate(article["blocks"])}
+                updates.update({f"blocks.{positions[i]}": article["blocks"][positions[i]]
+                                for i in draft.blocks if i in positions})
+            if draft.blocks or draft.reshaped or "content" in draft.fields:
+                updates.update(derive(article.get("content", ""), article.get("blocks", [])))
+            if draft.blocks or draft.reshaped or draft.fields & {"title", "content"}:
+                updates["content_hash"] = None  # the next full save reprocesses the article
+            updates["draft_version"] = draft.version
+            updates["updated_at"] = datetime.now(timezone.utc).isoformat()
+            saved = draft.saved_version
+            version_filter = saved if saved else {"$in": [0, None]}
+            result = await db.articles.update_one(
+                {"id": article_id, "draft_version": version_filter}, {"$set": updates},
+            )
+            if result.matched_count == 0:
+                # Saved elsewhere since we loaded it: drop our copy, the editor gets a conflict
+                logger.warning(f"Autosave of {article_id} dropped at version {draft.version}: "
+                               f"article changed elsewhere")
+                self.conflicts += 1
+                self.drafts.pop(article_id, None)
+                self.lost[article_id] = (draft.version, time.monotonic())
+                await manager.send_to_user(article.get("author_id", ""), {
+                    "type": "autosave_conflict", "article_id": article_id, "lost_version": draft.version,
+                })
+                return
+            article.update({k: v for k, v in updates.items() if "." not in k})
+            draft.saved_version = draft.version
+            draft.fields, draft.blocks, draft.reshaped = set(), set(), False
+            self.writes += 1
+        suggest_index.put("article", article)
+        feeds.put("article", article)
+        if article.get("status") == "published":
+            search_cache.invalidate("article")
+            article_render.invalidate(article_id)
+
+    def discard(self, article_id: str):
+        """A full save replaced the article: forget the pending draft."""
+        draft = self.drafts.pop(article_id, None)
+        if draft and draft.flush_task and not draft.flush_task.done():
+            draft.flush_task.cancel()
+
+    async def stop(self):
+        for article_id in list(self.drafts):
+            try:
+                await self.flush(article_id)
+            except Exception as e:
+                logger.error(f"Autosave flush of {article_id} failed: {e}")
+
+
+autosave_buffer = AutosaveBuffer()
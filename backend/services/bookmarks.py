@@ -0,0 +1,83 @@
+"""
+Saved items (articles, properties, procedures) in one `bookmarks` collection.
+
+One document per (user_id, kind, target_id) under a unique index. Toggling is
+an upsert: if it inserted, the item is now saved, otherwise the existing
+bookmark is removed. Each bookmark keeps a small snapshot of the target (title,
+image...) so the saved lists render without joining the target collection.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from pymongo.errors import DuplicateKeyError
+from database import db
+
+# kind -> legacy id field exposed by the /saved-* list endpoints
+BOOKMARK_KINDS = {
+    "article": "article_id",
+    "property": "property_id",
+    "procedure": "procedure_id",
+}
+MAX_STATUS_IDS = 100
+
+
+async def toggle_bookmark(user_id: str, kind: str, target_id: str, snapshot: dict) -> bool:
+    """Save or unsave a target; returns True when it is now saved."""
+    key = {"user_id": user_id, "kind": kind, "target_id": target_id}
+    try:
+        result = await db.bookmarks.update_one(key, {"$setOnInsert": {
+            **snapshot, **key,
+            "id": str(uuid.uuid4()),
+            "saved_at": datetime.now(timezone.utc).isoformat(),
+        }}, upsert=True)
+        if result.upserted_id is not None:
+            return True
+    except DuplicateKeyError:
+        return True  # Concurrent save of the same item: it is saved, keep it
+    await db.bookmarks.delete_one(key)
+    return False
+
+
+async def is_bookmarked(user_id: str, kind: str, target_id: str) -> bool:
+    return await db.bookmarks.count_documents({"user_id": user_id, "kind": kind, "target_id": target_id}, limit=1) > 0
+
+
+async def remove_bookmark(user_id: str, kind: str, target_id: str):
+    await db.bookmarks.delete_one({"user_id": user_id, "kind": kind, "target_id": target_id})
+
+
+async def list_bookmarks(user_id: str, kind: str, limit: int = 100) -> List[dict]:
+    docs = await db.bookmarks.find({"user_id": user_id, "kind": kind}, {"_id": 0}).sort("saved_at", -1).to_list(limit)
+    id_field = BOOKMARK_KINDS[kind]
+    for d in docs:
+        d[id_field] = d.pop("target_id")
+        d.pop("kind", None)
+    return docs
+
+
+async def bookmarked_ids(user_id: str, ids_by_kind: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """Saved ids per kind for a whole page of cards, in a single query."""
+    clauses = [{"kind": kind, "target_id": {"$in": list(ids)}} for kind, ids in ids_by_kind.items() if ids]
+    result = {kind: [] for kind in ids_by_kind}
+    if not clauses:
+        return result
+    async for d in db.bookmarks.find({"user_id": user_id, "$or": clauses}, {"_id": 0, "kind": 1, "target_id": 1}):
+        result[d["kind"]].append(d["target_id"])
+    return result
+
+
+async def delete_target_bookmarks(kind: str, target_id: str):
+    await db.bookmarks.delete_many({"kind": kind, "target_id": target_id})
+
+
+async def delete_targets_bookmarks(kind: str, target_ids: Iterable[str]):
+    await db.bookmarks.delete_many({"kind": kind, "target_id": {"$in": list(target_ids)}})
+
+
+async def delete_user_bookmarks(user_id: str):
+    await db.bookmarks.delete_many({"user_id": user_id})
+
+
+async def delete_users_bookmarks(user_ids: Iterable[str]) -> int:
+    result = await db.bookmarks.delete_many({"user_id": {"$in": list(user_ids)}})
+    return result.deleted_count
@@ -0,0 +1,139 @@
+"""
+Derived article fields, computed once per version of the content.
+
+`process()` turns what the editor sends into what is stored: sanitized HTML
+and blocks, word count, reading time, plain-text excerpt, first image and
+slug. Its inputs are hashed (`content_hash`, stored on the article), so a
+save that does not change them skips the work entirely, and recent results
+are memoized by hash. Large articles are processed in a pool of
+CONTENT_WORKERS worker processes (bleach is pure Python and would otherwise
+hold the event loop); small ones inline, where the round trip would cost
+more than the work.
+
+The derived fields let list endpoints leave out `content` and `blocks`
+(LIST_PROJECTION).
+"""
+import hashlib
+import html
+import json
+import re
+from collections import OrderedDict
+from typing import List, Optional
+from config import CONTENT_WORKERS
+from services.process_pool import ProcessPool
+from utils import sanitize_html, sanitize_block, sanitize_url, compute_word_count
+
+PIPELINE_VERSION = "1"  # bump when process() changes, to recompute stored fields
+EXCERPT_LENGTH = 240
+INLINE_MAX_CHARS = 20_000  # content + blocks below this size are processed inline
+MEMO_SIZE = 256
+
+# Card fields only: lists never ship the article body
+LIST_PROJECTION = {"_id": 0, "content": 0, "blocks": 0}
+
+
+def slugify(text):
+    text = text.lower().strip()
+    text = re.sub(r'[^\w\s-]', '', text)
+    text = re.sub(r'[\s_-]+', '-', text)
+    return text[:100]
+
+
+def content_hash(title: str, slug: str, content: str, blocks: List[dict]) -> str:
+    raw = json.dumps([PIPELINE_VERSION, title, slugify(slug or title), content, blocks],
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _plain_text(value: str) -> str:
+    text = re.sub(r"<[^>]*>", " ", value or "")
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+
+def _excerpt(content: str, blocks: List[dict]) -> str:
+    parts = []
+    for block in blocks:
+        data = block.get("data") or {}
+        if block.get("type") in ("text", "alert"):
+            parts.append(_plain_text(data.get("content", "")))
+        elif block.get("type") == "quote":
+            parts.append(_plain_text(data.get("text", "")))
+        if sum(len(p) for p in parts) > EXCERPT_LENGTH:
+            break
+    text = " ".join(p for p in parts if p) or _plain_text(content[:EXCERPT_LENGTH * 20])
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[:EXCERPT_LENGTH].rsplit(" ", 1)[0]
+    return cut.rstrip(",;:.") + "…"
+
+
+def _first_image(content: str, blocks: List[dict]) -> Optional[str]:
+    for block in blocks:
+        if block.get("type") == "image" and (block.get("data") or {}).get("url"):
+            return block["data"]["url"]
+    match = re.search(r"<img[^>]+src=[\"']([^\"']+)", content or "")
+    return sanitize_url(match.group(1)) if match else None
+
+
+def derive(content: str, blocks: List[dict]) -> dict:
+    """Fields computed from already sanitized content."""
+    word_count, reading_time = compute_word_count(content, blocks)
+    return {
+        "word_count": word_count, "reading_time": reading_time,
+        "excerpt": _excerpt(content, blocks), "first_image": _first_image(content, blocks),
+    }
+
+
+def process(title: str, slug: str, content: str, blocks: List[dict]) -> dict:
+    """Pure function (runs in a worker process): everything stored from one version of the content."""
+    content = sanitize_html(content) if content else ""
+    blocks = [sanitize_block(b) for b in blocks if b.get("id")]
+    return {"content": content, "blocks": blocks, "slug": slugify(slug or title), **derive(content, blocks)}
+
+
+class ContentPipeline:
+    def __init__(self, workers: int = CONTENT_WORKERS):
+        self.workers = workers
+        self._pool = ProcessPool("Content")
+        self._memo: "OrderedDict[str, dict]" = OrderedDict()
+        self.processed = 0
+        self.skipped = 0
+
+    def start(self):
+        self._pool.start(self.workers)
+
+    async def stop(self):
+        await self._pool.stop()
+
+    async def _process(self, args: tuple) -> dict:
+        if len(args[2]) + len(json.dumps(args[3])) < INLINE_MAX_CHARS:
+            return process(*args)
+        self.start()
+        return await self._pool.run(process, *args)
+
+    async def run(self, title: str, slug: str, content: str, blocks: List[dict],
+                  previous: Optional[dict] = None) -> dict:
+        """Derived fields to `$set` for this content; empty when `previous` already has them.
+
+        The stored hash is the one of the processed values, which is what the
+        editor loads and sends back, so re-saving an unchanged article matches it.
+        """
+        key = content_hash(title, slug, content or "", blocks)
+        if previous and previous.get("content_hash") == key:
+            self.skipped += 1
+            return {}
+        result = self._memo.get(key)
+        if result is None:
+            result = await self._process((title, slug, content or "", blocks))
+            result["content_hash"] = content_hash(title, result["slug"], result["content"], result["blocks"])
+            self.processed += 1
+            self._memo[key] = result
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        else:
+            self._memo.move_to_end(key)
+            self.skipped += 1
+        return dict(result)
+
+
+content_pipeline = ContentPipeline()
@@ -0,0 +1,250 @@
+"""
+Admin data exports streamed straight from a Mongo cursor.
+
+Rows are read with a projection limited to the exported columns and yielded
+in chunks, so memory stays flat whatever the collection size. CSV goes
+through the `csv` module and can be gzip-compressed on the fly; the columnar
+formats (Parquet, Arrow IPC stream) are written one row group at a time with
+typed columns (floats, integers, UTC timestamps) for pandas and other
+analytics tools. Row groups are encoded in a thread, so a large export does
+not hold the event loop.
+"""
+import asyncio
+import csv
+import io
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+from database import db
+
+CURSOR_BATCH = 1000
+ROWS_PER_CHUNK = 500
+ROW_GROUP_SIZE = 50_000
+
+FORMATS = {
+    # format -> (media type, file extension)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# name -> source collection, download filename, (column, default) pairs and
+# the types of non-string columns for the columnar formats. `since` filters
+# on the `created_at` ISO string.
+EXPORTS = {
+    "users": {
+        "collection": "users",
+        "filename": "utilisateurs",
+        "columns": [("id", ""), ("username", ""), ("email", ""), ("role", ""), ("phone", ""),
+                    ("country", ""), ("status", "actif"), ("created_at", "")],
+        "types": {"created_at": "timestamp"},
+    },
+    "articles": {
+        "collection": "articles",
+        "filename": "articles",
+        "columns": [("id", ""), ("title", ""), ("category", ""), ("author_id", ""),
+                    ("published_at", ""), ("views", 0)],
+        "types": {"views": "int", "published_at": "timestamp"},
+    },
+    "properties": {
+        "collection": "properties",
+        "filename": "annonces",
+        "columns": [("id", ""), ("title", ""), ("type", ""), ("price", 0), ("currency", "GNF"),
+                    ("city", ""), ("status", ""), ("author_id", ""), ("created_at", "")],
+        "types": {"price": "float", "created_at": "timestamp"},
+    },
+    "payments": {
+        "collection": "payments",
+        "filename": "paiements",
+        "columns": [("id", ""), ("reference", ""), ("property_title", ""), ("user_email", ""),
+                    ("amount", 0), ("currency", "GNF"), ("method", ""), ("status", ""), ("created_at", "")],
+        "types": {"amount": "float", "created_at": "timestamp"},
+    },
+    "role-requests": {
+        "collection": "admin_notifications",
+        "filename": "demandes_roles",
+        "columns": [("id", ""), ("user_username", ""), ("user_email", ""), ("requested_role", ""),
+                    ("status", ""), ("created_at", ""), ("processed_at", "")],
+        "types": {"created_at": "timestamp", "processed_at": "timestamp"},
+    },
+    "messages": {
+        # Metadata only: message bodies are never exported
+        "collection": "messages",
+        "filename": "messages",
+        "columns": [("id", ""), ("conversation_id", ""), ("sender_id", ""), ("sender_name", ""),
+                    ("created_at", "")],
+        "types": {"created_at": "timestamp"},
+    },
+}
+
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "timestamp": pa.timestamp("us", tz="UTC"),
+}
+
+
+def get_export(name: str) -> dict:
+    spec = EXPORTS.get(name)
+    if not spec:
+        raise HTTPException(status_code=404, detail="Export inconnu")
+    return spec
+
+
+def select_columns(spec: dict, fields: str = "") -> List[tuple]:
+    """Columns to export, in the order requested (`fields` is a comma-separated list)."""
+    if not fields:
+        return spec["columns"]
+    available = dict(spec["columns"])
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Colonnes inconnues: {', '.join(unknown)}")
+    return [(f, available[f]) for f in requested]
+
+
+def export_query(since: str = "") -> dict:
+    if not since:
+        return {}
+    try:
+        datetime.fromisoformat(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Parametre since invalide (date ISO attendue)")
+    return {"created_at": {"$gte": since}}
+
+
+def export_cursor(spec: dict, columns: List[tuple], query: Optional[dict] = None):
+    # _id order is insertion order and needs no in-memory sort
+    projection = {"_id": 0, **{name: 1 for name, _ in columns}}
+    return db[spec["collection"]].find(query or {}, projection).sort("_id", 1).batch_size(CURSOR_BATCH)
+
+
+def _value(doc: dict, name: str, default):
+    value = doc.get(name)
+    return default if value is None else value
+
+
+async def stream_csv(spec: dict, columns: List[tuple], compress: bool = False,
+                     query: Optional[dict] = None) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow([name for name, _ in columns])
+    rows = 0
+    async for doc in export_cursor(spec, columns, query):
+        writer.writerow([_value(doc, name, default) for name, default in columns])
+        rows += 1
+        if rows % ROWS_PER_CHUNK == 0:
+            chunk = drain()
+            if chunk:
+                yield chunk
+    tail = drain()
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+# ─── Columnar formats ─────────────────────────────────────────────────────────
+
+class StreamSink:
+    """Write-only file for streamed formats (Parquet, Arrow, ZIP): keeps the
+    byte offset their footers need while the written chunks are handed out
+    and released."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def take(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _convert(value, kind: str):
+    if value is None or value == "":
+        return None
+    try:
+        if kind == "timestamp":
+            if isinstance(value, datetime):
+                parsed = value
+            else:
+                parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        if kind == "float":
+            return float(value)
+        if kind == "int":
+            return int(value)
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def arrow_schema(spec: dict, columns: List[tuple]) -> pa.Schema:
+    types = spec.get("types", {})
+    return pa.schema([(name, ARROW_TYPES[types.get(name, "string")]) for name, _ in columns])
+
+
+async def stream_columnar(spec: dict, columns: List[tuple], fmt: str,
+                          query: Optional[dict] = None) -> AsyncIterator[bytes]:
+    """Parquet (one row group per ROW_GROUP_SIZE rows) or an Arrow IPC stream."""
+    schema = arrow_schema(spec, columns)
+    kinds = [(name, spec.get("types", {}).get(name, "string"), default) for name, default in columns]
+    sink = StreamSink()
+    out = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(out, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(out, schema)
+
+    def write_batch(rows: dict):
+        writer.write_batch(pa.RecordBatch.from_pydict(rows, schema=schema))
+
+    rows = {name: [] for name, _ in columns}
+    count = 0
+    async for doc in export_cursor(spec, columns, query):
+        for name, kind, default in kinds:
+            value = doc.get(name)
+            rows[name].append(_convert(value, kind) if kind != "string" else str(default if value is None else value))
+        count += 1
+        if count == ROW_GROUP_SIZE:
+            await asyncio.to_thread(write_batch, rows)
+            rows, count = {name: [] for name, _ in columns}, 0
+            yield sink.take()
+    if count:
+        await asyncio.to_thread(write_batch, rows)
+    await asyncio.to_thread(writer.close)
+    yield sink.take()
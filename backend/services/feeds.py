@@ -0,0 +1,360 @@
+"""
+RSS/Atom feeds of the latest articles and the sitemaps of the site.
+
+Documents are kept in memory as gzip-compressed bytes with the time they
+last changed (Last-Modified), and are rendered when content changes, never
+per request:
+
+- `rss/<feed>.xml` and `atom/<feed>.xml`: the FEED_SIZE latest published
+  articles, all categories (`all`) or one category (its slug, e.g.
+  `economie`).
+- `sitemap.xml`: the sitemap index, listing `sitemap-<kind>-<n>.xml` files
+  for published articles, published procedures and available properties.
+  The documents of a kind are spread over files by a hash of their id, about
+  URLS_PER_FILE per file (the protocol allows 50,000), so a write re-renders
+  one file of a few thousand URLs whatever the size of the site.
+
+The write routes call `put` / `remove`, which update the in-memory entries
+and mark the affected documents dirty; they are rendered RENDER_DELAY seconds
+later, several writes at once. Everything is reloaded every REBUILD_INTERVAL
+seconds to pick up the writes of other workers and of background jobs; only
+the documents whose content changed are rendered again.
+
+URLs are built from SITE_URL, never from a request's Host header; while it
+is not configured nothing is built and the routes answer 503.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import math
+import zlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+from config import CATEGORIES, SITE_URL
+from database import db
+from utils import fold_text
+
+logger = logging.getLogger(__name__)
+
+REBUILD_INTERVAL = 600  # seconds
+RENDER_DELAY = 2  # seconds between a write and the rendering of what it changed
+FEED_SIZE = 50
+FEED_SPARE = 25  # extra articles kept so a removal does not shorten the feed
+URLS_PER_FILE = 10_000
+SITE_NAME = "Matrix News"
+
+# kind -> collection, filter of the listed documents, page path
+SOURCES = {
+    "article": ("articles", {"status": "published"}, "/article/"),
+    "procedure": ("procedures", {"status": "published"}, "/procedures/"),
+    "property": ("properties", {"status": "disponible"}, "/immobilier/"),
+}
+ENTRY_PROJECTION = {"_id": 0, "id": 1, "status": 1, "updated_at": 1, "created_at": 1}
+FEED_PROJECTION = {"_id": 0, "id": 1, "title": 1, "subtitle": 1, "excerpt": 1, "meta_description": 1,
+                   "category": 1, "author_name": 1, "published_at": 1, "created_at": 1, "updated_at": 1}
+
+ALL = "all"
+
+
+def category_slug(category: str) -> str:
+    return fold_text(category).replace(" ", "-")
+
+
+FEEDS = {ALL: None, **{category_slug(c): c for c in CATEGORIES}}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse(value: Optional[str]) -> datetime:
+    try:
+        parsed = datetime.fromisoformat((value or "").replace("Z", "+00:00"))
+    except ValueError:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _lastmod(doc: dict) -> str:
+    return (doc.get("updated_at") or doc.get("created_at") or _now().isoformat())[:10]
+
+
+def _bucket(item_id: str, count: int) -> int:
+    return zlib.crc32(item_id.encode("utf-8")) % count
+
+
+def _feed_item(doc: dict) -> dict:
+    return {
+        "id": doc["id"], "title": doc.get("title", ""), "category": doc.get("category", ""),
+        "summary": doc.get("excerpt") or doc.get("subtitle") or doc.get("meta_description") or "",
+        "author": doc.get("author_name", ""), "published": doc.get("published_at") or doc.get("created_at") or "",
+        "updated": doc.get("updated_at") or doc.get("published_at") or "",
+    }
+
+
+# ── Serialization ────────────────────────────────────────────────────────────
+
+def _feed_title(feed: str) -> str:
+    return f"{SITE_NAME} - {FEEDS[feed]}" if FEEDS.get(feed) else SITE_NAME
+
+
+def render_rss(feed: str, items: List[dict], site_url: str) -> str:
+    link = f"{site_url}/categorie/{quote(FEEDS[feed])}" if FEEDS.get(feed) else f"{site_url}/"
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom"><channel>',
+        f"<title>{escape(_feed_title(feed))}</title><link>{escape(link)}</link>",
+        f"<description>{escape(_feed_title(feed))}</description><language>fr</language>",
+        f'<atom:link href="{escape(site_url)}/api/feeds/rss/{feed}.xml" rel="self" type="application/rss+xml"/>',
+    ]
+    if items:
+        parts.append(f"<lastBuildDate>{format_datetime(_parse(items[0]['published']))}</lastBuildDate>")
+    for item in items:
+        url = escape(f"{site_url}/article/{item['id']}")
+        parts.append(
+            f"<item><title>{escape(item['title'])}</title><link>{url}</link>"
+            f'<guid isPermaLink="true">{url}</guid>'
+            f"<pubDate>{format_datetime(_parse(item['published']))}</pubDate>"
+            f"<category>{escape(item['category'])}</category>"
+            f"<description>{escape(item['summary'])}</description></item>"
+        )
+    parts.append("</channel></rss>\n")
+    return "".join(parts)
+
+
+def render_atom(feed: str, items: List[dict], site_url: str) -> str:
+    self_url = escape(f"{site_url}/api/feeds/atom/{feed}.xml")
+    updated = max((_parse(i["updated"]) for i in items), default=_parse(None)).isoformat()
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="fr">',
+        f"<id>{self_url}</id><title>{escape(_feed_title(feed))}</title><updated>{updated}</updated>",
+        f'<link rel="self" href="{self_url}"/><link href="{escape(site_url)}/"/>',
+    ]
+    for item in items:
+        url = escape(f"{site_url}/article/{item['id']}")
+        author = f"<author><name>{escape(item['author'])}</name></author>" if item["author"] else ""
+        parts.append(
+            f'<entry><id>{url}</id><title>{escape(item["title"])}</title><link href="{url}"/>'
+            f"<published>{_parse(item['published']).isoformat()}</published>"
+            f"<updated>{_parse(item['updated']).isoformat()}</updated>{author}"
+            f'<category term="{escape(item["category"])}"/>'
+            f"<summary>{escape(item['summary'])}</summary></entry>"
+        )
+    parts.append("</feed>\n")
+    return "".join(parts)
+
+
+def render_urlset(path: str, entries: Dict[str, str], site_url: str) -> str:
+    base = escape(f"{site_url}{path}")
+    urls = "".join(f"<url><loc>{base}{escape(i)}</loc><lastmod>{m}</lastmod></url>"
+                   for i, m in sorted(entries.items()))
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>\n')
+
+
+def render_index(files: Dict[str, datetime], site_url: str) -> str:
+    sitemaps = "".join(
+        f"<sitemap><loc>{escape(site_url)}/api/sitemaps/{name}</loc><lastmod>{at.isoformat()}</lastmod></sitemap>"
+        for name, at in sorted(files.items())
+    )
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{sitemaps}</sitemapindex>\n')
+
+
+class Document:
+    def __init__(self, body: bytes):
+        self.gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.last_modified = _now().replace(microsecond=0)
+
+    @property
+    def body(self) -> bytes:
+        return gzip.decompress(self.gzipped)
+
+
+class Feeds:
+    def __init__(self, interval: float = REBUILD_INTERVAL, delay: float = RENDER_DELAY, site_url: str = SITE_URL):
+        self.interval = interval
+        self.delay = delay
+        self.site_url = site_url
+        # kind -> files -> id -> lastmod
+        self.buckets: Dict[str, List[Dict[str, str]]] = {kind: [{}] for kind in SOURCES}
+        # feed -> latest articles, newest first
+        self.items: Dict[str, List[dict]] = {feed: [] for feed in FEEDS}
+        self.documents: Dict[str, Document] = {}
+        self.renders = 0
+        self._dirty: Set[str] = set()
+        self._replay: Optional[list] = None  # writes seen while a rebuild is loading
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def _sitemap_name(self, kind: str, n: int) -> str:
+        return f"sitemap-{kind}-{n}.xml"
+
+    def _set_entry(self, kind: str, item_id: str, lastmod: Optional[str]):
+        buckets = self.buckets[kind]
+        bucket = buckets[_bucket(item_id, len(buckets))]
+        if bucket.get(item_id) == lastmod:
+            return
+        if lastmod is None:
+            if item_id not in bucket:
+                return
+            del bucket[item_id]
+        else:
+            bucket[item_id] = lastmod
+        self._dirty.add(self._sitemap_name(kind, _bucket(item_id, len(buckets))))
+
+    def _set_item(self, item_id: str, item: Optional[dict]):
+        for feed, items in self.items.items():
+            kept = [i for i in items if i["id"] != item_id]
+            if item is not None and feed in (ALL, category_slug(item["category"])):
+                kept.append(item)
+                kept.sort(key=lambda i: i["published"], reverse=True)
+                del kept[FEED_SIZE + FEED_SPARE:]
+            if kept != items:
+                self.items[feed] = kept
+                self._dirty.add(feed)
+
+    def put(self, kind: str, doc: dict):
+        """Call after a write; documents that should not be listed are removed."""
+        if not self.site_url:
+            return
+        if self._replay is not None:
+            self._replay.append(("put", kind, doc))
+        query = SOURCES[kind][1]
+        listed = all(doc.get(field) == value for field, value in query.items())
+        self._set_entry(kind, doc["id"], _lastmod(doc) if listed else None)
+        if kind == "article":
+            self._set_item(doc["id"], _feed_item(doc) if listed else None)
+        self._wakeup.set()
+
+    def remove(self, kind: str, item_id: str):
+        if not self.site_url:
+            return
+        if self._replay is not None:
+            self._replay.append(("remove", kind, item_id))
+        self._set_entry(kind, item_id, None)
+        if kind == "article":
+            self._set_item(item_id, None)
+        self._wakeup.set()
+
+    async def rebuild(self):
+        self._replay = []
+        try:
+            buckets = {}
+            for kind, (collection, query, _) in SOURCES.items():
+                entries = {}
+                async for doc in db[collection].find(query, ENTRY_PROJECTION):
+                    entries[doc["id"]] = _lastmod(doc)
+                count = max(1, math.ceil(len(entries) / URLS_PER_FILE))
+                buckets[kind] = [{} for _ in range(count)]
+                for item_id, lastmod in entries.items():
+                    buckets[kind][_bucket(item_id, count)][item_id] = lastmod
+            items = {}
+            for feed, category in FEEDS.items():
+                query = {"status": "published", **({"category": category} if category else {})}
+                docs = await db.articles.find(query, FEED_PROJECTION).sort(
+                    "published_at", -1).limit(FEED_SIZE + FEED_SPARE).to_list(FEED_SIZE + FEED_SPARE)
+                items[feed] = [_feed_item(d) for d in docs]
+            self.buckets, self.items = buckets, items
+            self._dirty.update(self._names())
+            replay, self._replay = self._replay, None
+            for op, kind, arg in replay:
+                if op == "put":
+                    self.put(kind, arg)
+                else:
+                    self.remove(kind, arg)
+        finally:
+            self._replay = None
+
+    # ── Rendering ────────────────────────────────────────────────────────────
+
+    def _names(self) -> Set[str]:
+        names = set(FEEDS)
+        for kind, buckets in self.buckets.items():
+            names.update(self._sitemap_name(kind, n) for n in range(len(buckets)))
+        return names
+
+    def _serialize(self, name: str) -> Dict[str, bytes]:
+        site_url = self.site_url
+        if name in FEEDS:
+            items = self.items[name][:FEED_SIZE]
+            return {
+                f"rss/{name}.xml": render_rss(name, items, site_url).encode("utf-8"),
+                f"atom/{name}.xml": render_atom(name, items, site_url).encode("utf-8"),
+            }
+        _, kind, n = name[:-len(".xml")].split("-")
+        return {name: render_urlset(SOURCES[kind][2], self.buckets[kind][int(n)], site_url).encode("utf-8")}
+
+    def _store(self, name: str, body: bytes) -> bool:
+        current = self.documents.get(name)
+        if current is not None and current.digest == hashlib.sha256(body).hexdigest():
+            return False  # same bytes: keep its Last-Modified
+        self.documents[name] = Document(body)
+        self.renders += 1
+        return True
+
+    async def render(self):
+        """Render the dirty documents, then the sitemap index if a sitemap file changed."""
+        if not self.site_url:
+            return
+        async with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            names = self._names()
+            changed = False
+            for name in [n for n in self.documents if n.startswith("sitemap-") and n not in names]:
+                del self.documents[name]  # files of a kind are renumbered when the kind grows
+                changed = True
+            for name in sorted(dirty & names):
+                for doc_name, body in self._serialize(name).items():
+                    if self._store(doc_name, body) and doc_name.startswith("sitemap-"):
+                        changed = True
+                await asyncio.sleep(0)  # let requests through between files
+            if changed or "sitemap.xml" not in self.documents:
+                files = {n: d.last_modified for n, d in self.documents.items() if n.startswith("sitemap-")}
+                self._store("sitemap.xml", render_index(files, self.site_url).encode("utf-8"))
+
+    def get(self, name: str) -> Optional[Document]:
+        return self.documents.get(name)
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def _run(self):
+        rebuilt_at = None
+        while True:
+            try:
+                loop = asyncio.get_running_loop()
+                if rebuilt_at is None or loop.time() - rebuilt_at >= self.interval:
+                    await self.rebuild()
+                    rebuilt_at = loop.time()
+                await self.render()
+            except Exception as e:
+                logger.error(f"Feeds rebuild error: {e}")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                await asyncio.sleep(self.delay)  # let a burst of writes accumulate
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if not self.site_url:
+            logger.warning("SITE_URL is not set: RSS/Atom feeds and sitemaps are disabled")
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+feeds = Feeds()
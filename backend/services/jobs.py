@@ -0,0 +1,250 @@
+"""
+Durable background jobs stored in the `jobs` collection.
+
+A job is enqueued as a `queued` document and claimed atomically by one of the
+JOB_WORKERS worker tasks of any backend process (`find_one_and_update` sets it
+`running` with a lease). While it runs, a heartbeat renews the lease and picks
+up cancellation requests; a job whose process died is claimed again once its
+lease expires. Failures are retried with exponential backoff up to
+`max_attempts`, after which the job is marked `failed`.
+
+Result files written to EXPORT_DIR are deleted EXPORT_RETENTION_HOURS after
+they were written (the download route then answers 410).
+
+Handlers are registered with `@job_handler("type")` and receive a JobContext
+used to report progress and to stop early when the job is cancelled.
+"""
+import asyncio
+import logging
+import socket
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo import ReturnDocument
+from database import db
+from config import JOB_WORKERS, EXPORT_DIR, EXPORT_RETENTION_HOURS
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2  # seconds
+LEASE_SECONDS = 60
+HEARTBEAT_INTERVAL = 15  # seconds
+RETRY_BASE_DELAY = 30  # seconds, doubled on each attempt
+DEFAULT_MAX_ATTEMPTS = 3
+SWEEP_INTERVAL = 3600  # seconds between two passes over EXPORT_DIR
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    def __init__(self, job: dict):
+        self.job = job
+        self.id = job["id"]
+        self.params = job.get("params", {})
+        self.cancelled = False
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    async def progress(self, done: int, total: Optional[int] = None, message: str = ""):
+        """Report progress; raises JobCancelled if a cancellation was requested."""
+        update = {"progress.done": done, "progress.message": message}
+        if total is not None:
+            update["progress.total"] = total
+        await db.jobs.update_one({"id": self.id}, {"$set": update})
+        self.check_cancelled()
+
+
+Handler = Callable[[JobContext], Awaitable[Optional[dict]]]
+HANDLERS: Dict[str, dict] = {}
+
+
+def job_handler(job_type: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                validate: Optional[Callable[[dict], None]] = None):
+    """Register a handler; `validate(params)` may raise HTTPException before enqueueing."""
+    def decorator(func: Handler) -> Handler:
+        HANDLERS[job_type] = {"run": func, "max_attempts": max_attempts, "validate": validate}
+        return func
+    return decorator
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def sweep_results(max_age_hours: float = EXPORT_RETENTION_HOURS) -> int:
+    """Delete result files older than `max_age_hours`; returns how many were deleted."""
+    limit = time.time() - max_age_hours * 3600
+    deleted = 0
+    for path in EXPORT_DIR.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < limit:
+                path.unlink()
+                deleted += 1
+        except FileNotFoundError:
+            pass  # swept by another process
+    return deleted
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, job_type: str, params: Optional[dict] = None, created_by: str = "",
+                      max_attempts: Optional[int] = None) -> dict:
+        if job_type not in HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        now = _now().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "params": params or {},
+            "status": "queued",
+            "progress": {"done": 0, "total": None, "message": ""},
+            "attempts": 0,
+            "max_attempts": max_attempts or HANDLERS[job_type]["max_attempts"],
+            "run_after": now,
+            "lease_until": None,
+            "worker": None,
+            "cancel_requested": False,
+            "result": None,
+            "error": None,
+            "created_by": created_by,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        await db.jobs.insert_one(job)
+        job.pop("_id", None)
+        self._wakeup.set()
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        """Cancel a queued job at once; ask a running job to stop at its next checkpoint."""
+        now = _now().isoformat()
+        job = await db.jobs.find_one_and_update(
+            {"id": job_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "cancel_requested": True, "finished_at": now}},
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+        )
+        if job:
+            return job
+        return await db.jobs.find_one_and_update(
+            {"id": job_id, "status": "running"},
+            {"$set": {"cancel_requested": True}},
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+        )
+
+    async def _claim(self) -> Optional[dict]:
+        now = _now()
+        return await db.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "run_after": {"$lte": now.isoformat()}},
+                # Running job whose worker stopped renewing its lease
+                {"status": "running", "lease_until": {"$lt": now.isoformat()}},
+            ]},
+            {
+                "$set": {
+                    "status": "running", "worker": self.worker_id, "started_at": now.isoformat(),
+                    "lease_until": (now + timedelta(seconds=LEASE_SECONDS)).isoformat(),
+                },
+                "$inc": {"attempts": 1},
+            },
+            projection={"_id": 0}, sort=[("run_after", 1)], return_document=ReturnDocument.AFTER,
+        )
+
+    async def _heartbeat(self, ctx: JobContext):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            job = await db.jobs.find_one_and_update(
+                {"id": ctx.id, "worker": self.worker_id},
+                {"$set": {"lease_until": (_now() + timedelta(seconds=LEASE_SECONDS)).isoformat()}},
+                projection={"_id": 0, "cancel_requested": 1},
+            )
+            if job is None or job.get("cancel_requested"):
+                ctx.cancelled = True
+
+    async def _finish(self, job: dict, update: dict):
+        await db.jobs.update_one(
+            {"id": job["id"], "worker": self.worker_id},
+            {"$set": {**update, "lease_until": None}},
+        )
+
+    async def _execute(self, job: dict):
+        ctx = JobContext(job)
+        ctx.cancelled = bool(job.get("cancel_requested"))
+        heartbeat = asyncio.create_task(self._heartbeat(ctx))
+        try:
+            if job["attempts"] > job["max_attempts"]:
+                raise RuntimeError("Abandoned by its worker too many times")
+            ctx.check_cancelled()
+            result = await HANDLERS[job["type"]]["run"](ctx)
+            await self._finish(job, {"status": "succeeded", "result": result, "error": None, "finished_at": _now().isoformat()})
+        except JobCancelled:
+            await self._finish(job, {"status": "cancelled", "finished_at": _now().isoformat()})
+        except asyncio.CancelledError:
+            # Process shutting down: hand the job back without spending an attempt
+            await self._finish(job, {"status": "queued", "worker": None, "attempts": job["attempts"] - 1})
+            raise
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['type']}) failed: {e}\n{traceback.format_exc()}")
+            if job["attempts"] < job["max_attempts"] and not ctx.cancelled:
+                delay = RETRY_BASE_DELAY * 2 ** (job["attempts"] - 1)
+                await self._finish(job, {
+                    "status": "queued", "worker": None, "error": str(e),
+                    "run_after": (_now() + timedelta(seconds=delay)).isoformat(),
+                })
+            else:
+                await self._finish(job, {"status": "failed", "error": str(e), "finished_at": _now().isoformat()})
+        finally:
+            heartbeat.cancel()
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Job claim error: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _sweeper(self):
+        while True:
+            try:
+                deleted = await asyncio.to_thread(sweep_results)
+                if deleted:
+                    logger.info(f"Deleted {deleted} expired job result files")
+            except Exception as e:
+                logger.error(f"Job result sweep error: {e}")
+            await asyncio.sleep(SWEEP_INTERVAL)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,33 @@
+"""
+Leases for the work that only one backend process should do at a time.
+
+A lease is a document of the `leases` collection (unique index on `key`)
+naming its holder and the time it expires. `acquire` takes it when it is
+free or expired and renews it when the caller already holds it; the holder
+must renew it before it expires to keep it. Used by the scheduled publisher
+(services/scheduler.py) and the stats reconciliation (services/stats.py).
+"""
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database import db
+
+
+async def acquire(key: str, holder: str, seconds: float) -> bool:
+    now = datetime.now(timezone.utc)
+    try:
+        lease = await db.leases.find_one_and_update(
+            {"key": key, "$or": [{"holder": holder}, {"until": {"$lt": now.isoformat()}}]},
+            {"$set": {"holder": holder, "until": (now + timedelta(seconds=seconds)).isoformat()}},
+            upsert=True, projection={"_id": 0, "holder": 1}, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        return False  # held by another process
+    return bool(lease) and lease.get("holder") == holder
+
+
+async def release(key: str, holder: str):
+    """Expire the lease now so another process can take over."""
+    await db.leases.update_one(
+        {"key": key, "holder": holder}, {"$set": {"until": datetime.now(timezone.utc).isoformat()}},
+    )
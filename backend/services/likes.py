@@ -0,0 +1,117 @@
+"""
+Likes stored one document per (user, target) in the `likes` collection.
+
+The unique (user_id, target_type, target_id) index makes toggling atomic:
+an insert either succeeds (like) or hits the duplicate key (unlike). The
+target keeps a denormalized `likes_count`, and realtime events carry only
+the delta, sent to the sockets watching the item.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from database import db
+from routes.messages import manager
+from services.stats import stats, author_key
+
+LIKE_TARGETS = {
+    "article": "articles",
+    "property": "properties",
+}
+MAX_STATUS_IDS = 100
+
+
+async def toggle_like(user_id: str, target_type: str, target_id: str) -> dict:
+    """Like or unlike a target; returns {"liked", "delta", "likes_count"}."""
+    try:
+        await db.likes.insert_one({
+            "user_id": user_id, "target_type": target_type, "target_id": target_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        delta = 1
+    except DuplicateKeyError:
+        result = await db.likes.delete_one({"user_id": user_id, "target_type": target_type, "target_id": target_id})
+        delta = -1 if result.deleted_count else 0
+
+    collection = db[LIKE_TARGETS[target_type]]
+    projection = {"_id": 0, "likes_count": 1, "author_id": 1}
+    query = {"id": target_id}
+    if delta < 0:
+        query["likes_count"] = {"$gt": 0}  # a drifted counter stays at zero
+    updated = await collection.find_one_and_update(
+        query, {"$inc": {"likes_count": delta}}, projection=projection, return_document=ReturnDocument.AFTER,
+    )
+    if updated is None and delta < 0:
+        updated = await collection.find_one({"id": target_id}, projection)
+    likes_count = max(0, (updated or {}).get("likes_count", 0))
+    if delta:
+        await stats.record_like(target_type, (updated or {}).get("author_id"), delta)
+        await manager.send_to_watchers(f"{target_type}:{target_id}", {
+            "type": "like_update", "content_type": target_type, "id": target_id,
+            "delta": delta, "likes_count": likes_count,
+        })
+    return {"liked": delta > 0, "delta": delta, "likes_count": likes_count}
+
+
+async def liked_ids(user_id: str, target_type: str, target_ids: Iterable[str]) -> List[str]:
+    """Which of `target_ids` the user has liked, in one indexed query."""
+    ids = list(dict.fromkeys(target_ids))[:MAX_STATUS_IDS]
+    if not ids:
+        return []
+    docs = await db.likes.find(
+        {"user_id": user_id, "target_type": target_type, "target_id": {"$in": ids}},
+        {"_id": 0, "target_id": 1},
+    ).to_list(len(ids))
+    return [d["target_id"] for d in docs]
+
+
+async def delete_target_likes(target_type: str, target_id: str):
+    await db.likes.delete_many({"target_type": target_type, "target_id": target_id})
+
+
+async def delete_targets_likes(target_type: str, target_ids: Iterable[str]):
+    await db.likes.delete_many({"target_type": target_type, "target_id": {"$in": list(target_ids)}})
+
+
+async def delete_user_likes(user_ids: Iterable[str]) -> int:
+    """Remove the likes given by (deleted) users, taking them off the targets' counts."""
+    user_ids = list(user_ids)
+    pipeline = [
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$group": {"_id": {"type": "$target_type", "id": "$target_id"}, "n": {"$sum": 1}}},
+    ]
+    counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+    async for row in db.likes.aggregate(pipeline):
+        if row["_id"]["type"] in LIKE_TARGETS:
+            counts[row["_id"]["type"]][row["_id"]["id"]] = row["n"]
+    for target_type, per_target in counts.items():
+        await db[LIKE_TARGETS[target_type]].bulk_write([
+            # Clamped at zero rather than skipped, so a drifted counter still goes down
+            UpdateOne({"id": target_id}, [{"$set": {"likes_count": {
+                "$max": [0, {"$subtract": [{"$ifNull": ["$likes_count", 0]}, n]}],
+            }}}])
+            for target_id, n in per_target.items()
+        ], ordered=False)
+    if counts.get("article"):
+        author_deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: {"article_likes": 0})
+        async for article in db.articles.find({"id": {"$in": list(counts["article"])}}, {"_id": 0, "id": 1, "author_id": 1}):
+            if article.get("author_id"):
+                author_deltas[author_key(article["author_id"])]["article_likes"] -= counts["article"][article["id"]]
+        await stats.bump_many(dict(author_deltas))
+    result = await db.likes.delete_many({"user_id": {"$in": user_ids}})
+    return result.deleted_count
+
+
+async def liked_ids_by_kind(user_id: str, ids_by_kind: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """Like status for several target types at once, in a single query."""
+    clauses = [
+        {"target_type": kind, "target_id": {"$in": list(ids)}}
+        for kind, ids in ids_by_kind.items() if ids and kind in LIKE_TARGETS
+    ]
+    result = {kind: [] for kind in ids_by_kind}
+    if not clauses:
+        return result
+    async for d in db.likes.find({"user_id": user_id, "$or": clauses}, {"_id": 0, "target_type": 1, "target_id": 1}):
+        result[d["target_type"]].append(d["target_id"])
+    return result
@@ -0,0 +1,211 @@
+"""
+Daily analytics rollups in the `metrics_daily` collection.
+
+One document per (metric, date, dimensions) holds the day's `count` and
+`sum`, plus the same values per hour under `hours` / `hour_sums`. Write paths
+call `metrics.record()`, which only touches memory; events are coalesced and
+flushed every FLUSH_INTERVAL seconds as `$inc` upserts. History is rebuilt
+from the source collections with `backfill()` (see migrate_metrics.py), so a
+chart over N days reads N documents per dimension value whatever the traffic.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from pymongo import UpdateOne
+from database import db
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 10  # seconds
+COLLECTION = "metrics_daily"
+
+# name -> description, dimensions, and how to rebuild it from history
+# (source collection, timestamp field, extra match, dimension expressions, summed field).
+# Metrics without a source only exist from the moment they are recorded.
+METRICS = {
+    "users.registered": {
+        "label": "Inscriptions",
+        "dims": [],
+        "source": ("users", "created_at", {}, {}, None),
+    },
+    "articles.created": {
+        "label": "Articles crees",
+        "dims": ["category"],
+        "source": ("articles", "created_at", {}, {"category": "$category"}, None),
+    },
+    "articles.published": {
+        "label": "Articles publies",
+        "dims": ["category"],
+        "source": ("articles", "published_at", {"status": "published"}, {"category": "$category"}, None),
+    },
+    "properties.created": {
+        "label": "Annonces publiees",
+        "dims": ["city", "type"],
+        "source": ("properties", "created_at", {}, {"city": "$city_key", "type": "$type"}, None),
+    },
+    "payments.created": {
+        "label": "Paiements",
+        "dims": ["method", "currency"],
+        "source": ("payments", "created_at", {}, {"method": "$method", "currency": "$currency"}, "amount"),
+    },
+    "payments.status_changed": {
+        "label": "Changements de statut des paiements",
+        "dims": ["status"],
+        "source": None,
+    },
+    "views": {
+        "label": "Vues",
+        "dims": ["type"],
+        "source": None,
+    },
+    "pdf.rendered": {
+        # sum = total render time in ms
+        "label": "PDF generes",
+        "dims": ["kind"],
+        "source": None,
+    },
+    "search.cache": {
+        "label": "Recherches (cache)",
+        "dims": ["scope", "result"],
+        "source": None,
+    },
+}
+
+
+def dims_key(dims: Dict[str, str]) -> str:
+    return "&".join(f"{k}={dims[k]}" for k in sorted(dims))
+
+
+def _clean_dims(dims: Optional[dict]) -> Dict[str, str]:
+    return {k: "" if v is None else str(v) for k, v in (dims or {}).items()}
+
+
+class MetricsRecorder:
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending: Dict[tuple, dict] = {}
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def record(self, metric: str, dims: Optional[dict] = None, value: float = 0, count: int = 1,
+               at: Optional[datetime] = None):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        at = at or datetime.now(timezone.utc)
+        dims = _clean_dims(dims)
+        key = (metric, at.strftime("%Y-%m-%d"), dims_key(dims))
+        bucket = self.pending.get(key)
+        if bucket is None:
+            bucket = self.pending[key] = {"dims": dims, "count": 0, "sum": 0,
+                                          "hours": defaultdict(int), "hour_sums": defaultdict(float)}
+        hour = at.strftime("%H")
+        bucket["count"] += count
+        bucket["hours"][hour] += count
+        if value:
+            bucket["sum"] += value
+            bucket["hour_sums"][hour] += value
+
+    def _merge(self, key: tuple, bucket: dict):
+        target = self.pending.setdefault(key, {"dims": bucket["dims"], "count": 0, "sum": 0,
+                                               "hours": defaultdict(int), "hour_sums": defaultdict(float)})
+        target["count"] += bucket["count"]
+        target["sum"] += bucket["sum"]
+        for hour, n in bucket["hours"].items():
+            target["hours"][hour] += n
+        for hour, v in bucket["hour_sums"].items():
+            target["hour_sums"][hour] += v
+
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending = self.pending, {}
+            if not batch:
+                return
+            ops = []
+            for (metric, date, key), bucket in batch.items():
+                inc = {"count": bucket["count"], **{f"hours.{h}": n for h, n in bucket["hours"].items()}}
+                if bucket["sum"]:
+                    inc["sum"] = bucket["sum"]
+                    inc.update({f"hour_sums.{h}": v for h, v in bucket["hour_sums"].items()})
+                ops.append(UpdateOne(
+                    {"metric": metric, "date": date, "dims_key": key},
+                    {"$inc": inc, "$setOnInsert": {"dims": bucket["dims"]}},
+                    upsert=True,
+                ))
+            try:
+                await db[COLLECTION].bulk_write(ops, ordered=False)
+            except Exception as e:
+                logger.error(f"Metrics flush failed: {e}")
+                for key, bucket in batch.items():
+                    self._merge(key, bucket)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Metrics flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+metrics = MetricsRecorder()
+
+
+async def backfill(metric: str, since: str = "") -> int:
+    """Rebuild a metric's daily documents from its source collection.
+
+    Days covered by the source are overwritten, so running it twice gives the
+    same result. Today is left out: it is still being recorded live, and
+    overwriting it would lose the events flushed after the rebuild read the
+    source. Returns the number of daily documents written.
+    """
+    source = METRICS[metric]["source"]
+    if source is None:
+        return 0
+    collection, time_field, match, dim_exprs, sum_field = source
+    time_match = {"$type": "string", "$ne": "", "$lt": datetime.now(timezone.utc).date().isoformat()}
+    if since:
+        time_match["$gte"] = since
+    pipeline = [
+        {"$match": {**match, time_field: time_match}},
+        {"$group": {
+            "_id": {
+                "date": {"$substrBytes": [f"${time_field}", 0, 10]},
+                "hour": {"$substrBytes": [f"${time_field}", 11, 2]},
+                **dim_exprs,
+            },
+            "count": {"$sum": 1},
+            "sum": {"$sum": {"$ifNull": [f"${sum_field}", 0]}} if sum_field else {"$sum": 0},
+        }},
+    ]
+    days: Dict[tuple, dict] = {}
+    async for row in db[collection].aggregate(pipeline, allowDiskUse=True):
+        group = row["_id"]
+        dims = _clean_dims({d: group.get(d) for d in dim_exprs})
+        key = (group["date"], dims_key(dims))
+        day = days.setdefault(key, {"dims": dims, "count": 0, "sum": 0, "hours": {}, "hour_sums": {}})
+        hour = group["hour"] or "00"
+        day["count"] += row["count"]
+        day["hours"][hour] = day["hours"].get(hour, 0) + row["count"]
+        if row["sum"]:
+            day["sum"] += row["sum"]
+            day["hour_sums"][hour] = day["hour_sums"].get(hour, 0) + row["sum"]
+
+    ops = [
+        UpdateOne({"metric": metric, "date": date, "dims_key": key}, {"$set": day}, upsert=True)
+        for (date, key), day in days.items()
+    ]
+    for i in range(0, len(ops), 500):
+        await db[COLLECTION].bulk_write(ops[i:i + 500], ordered=False)
+    return len(ops)
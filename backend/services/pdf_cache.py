@@ -0,0 +1,80 @@
+"""
+Generated fiche PDFs, cached on disk by content hash.
+
+The key is a hash of the fiche, the company settings and the generator
+version, so the same content is only rendered once and the hash doubles as
+the ETag. The fiche document keeps the key of its last PDF (`pdf_cache`);
+`update_fiche` clears it for that fiche and `update_company_settings` for
+every fiche. A download always recomputes the key from the current settings
+rather than serving the stored one: a render that started before a settings
+change can store its old key after the clear.
+
+The directory is pruned to MAX_FILES, oldest first.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+from config import PDF_CACHE_DIR
+from services.pdf_generator import GENERATOR_VERSION
+
+MAX_FILES = 500
+PRUNE_EVERY = 50  # writes
+
+# Bookkeeping fields that do not change the rendered document
+IGNORED_FIELDS = {"_id", "pdf_cache", "created_at", "updated_at", "created_by", "created_by_name"}
+
+
+def content_hash(fiche: dict, settings: dict) -> str:
+    payload = {
+        "v": GENERATOR_VERSION,
+        "fiche": {k: v for k, v in fiche.items() if k not in IGNORED_FIELDS},
+        "settings": {k: v for k, v in settings.items() if k != "_id"},
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:40]
+
+
+def cache_path(key: str) -> Path:
+    return PDF_CACHE_DIR / f"{key}.pdf"
+
+
+def read(key: str) -> Optional[bytes]:
+    path = cache_path(key)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    os.utime(path)  # recently used files survive pruning
+    return data
+
+
+class _Writer:
+    def __init__(self):
+        self.writes = 0
+
+    def _write(self, key: str, pdf: bytes):
+        path = cache_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(pdf)
+        os.replace(tmp, path)  # atomic: concurrent renders of the same key are harmless
+
+    def _prune(self):
+        files = sorted(PDF_CACHE_DIR.glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+        for path in files[:max(0, len(files) - MAX_FILES)]:
+            path.unlink(missing_ok=True)
+
+    async def write(self, key: str, pdf: bytes):
+        await asyncio.to_thread(self._write, key, pdf)
+        self.writes += 1
+        if self.writes % PRUNE_EVERY == 0:
+            await asyncio.to_thread(self._prune)
+
+
+_writer = _Writer()
+
+
+async def store(key: str, pdf: bytes):
+    await _writer.write(key, pdf)
@@ -1,5 +1,6 @@
 import io
 import os
+from functools import lru_cache
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib.colors import HexColor, white, black
@@ -7,11 +8,16 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
-    Image, HRFlowable, KeepTogether
+    Image, HRFlowable, KeepTogether, PageBreak, Flowable
 )
+from reportlab.platypus.tableofcontents import TableOfContents
 from datetime import datetime, timezone
 
 
+# Bump when the layout changes so cached PDFs (services/pdf_cache.py) are re-rendered
+GENERATOR_VERSION = "1"
+
+
 def nl2br(text: str) -> str:
     """Convert newlines to <br/> for ReportLab Paragraphs."""
     if not text:
@@ -82,12 +88,27 @@ def get_styles():
     return styles
 
 
+_styles = None
+
+
+def shared_styles():
+    """Stylesheet built once per process; rendering only reads it."""
+    global _styles
+    if _styles is None:
+        _styles = get_styles()
+    return _styles
+
+
 def load_logo(settings: dict):
     """Load logo from local static files. No HTTP requests needed."""
+    return _find_logo(settings.get("logo_url", "/Matrix.png"))
+
+
+@lru_cache(maxsize=16)
+def _find_logo(logo_url: str):
     static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
     frontend_public = os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "public")
 
-    logo_url = settings.get("logo_url", "/Matrix.png")
     filename = logo_url.split("/")[-1] if "/" in logo_url else logo_url
 
     for search_dir in [static_dir, frontend_public]:
@@ -117,19 +138,33 @@ def build_section_title(title: str, styles):
     return t
 
 
-def generate_fiche_pdf(fiche: dict, settings: dict) -> bytes:
-    buffer = io.BytesIO()
-    styles = get_styles()
-    currency = fiche.get("currency", "GNF")
+def warm_up():
+    """Worker initializer (services/pdf_pool.py): styles and default logo lookup."""
+    shared_styles()
+    load_logo({})
+
 
-    doc = SimpleDocTemplate(
+def _document(buffer, title: str, settings: dict, cls=SimpleDocTemplate):
+    return cls(
         buffer, pagesize=A4,
         topMargin=18 * mm, bottomMargin=22 * mm,
         leftMargin=18 * mm, rightMargin=18 * mm,
-        title=fiche.get("title", "Fiche de Procedure"),
+        title=title,
         author=settings.get("company_name", "Matrix News"),
     )
 
+
+def generate_fiche_pdf(fiche: dict, settings: dict) -> bytes:
+    buffer = io.BytesIO()
+    doc = _document(buffer, fiche.get("title", "Fiche de Procedure"), settings)
+    doc.build(build_fiche_story(fiche, settings))
+    return buffer.getvalue()
+
+
+def build_fiche_story(fiche: dict, settings: dict) -> list:
+    """Flowables of one fiche, shared by single fiche PDFs and catalogues."""
+    styles = shared_styles()
+    currency = fiche.get("currency", "GNF")
     story = []
     page_w = A4[0] - 36 * mm
 
@@ -510,8 +545,62 @@ def generate_fiche_pdf(fiche: dict, settings: dict) -> bytes:
             contact_parts.append(settings["contact_phone"])
         story.append(Paragraph(" | ".join(contact_parts), styles["Footer"]))
 
-    # ═══════════════════════════════════════════════════════════════════════
-    # BUILD
-    # ═══════════════════════════════════════════════════════════════════════
-    doc.build(story)
+    return story
+
+
+# ─── Catalogue: several fiches in one document ────────────────────────────────
+
+class _FicheStart(Flowable):
+    """Zero-size marker placed before each fiche: bookmark + table of contents entry."""
+
+    def __init__(self, key: str, title: str):
+        super().__init__()
+        self.key = key
+        self.title = title
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0)
+
+
+class _CatalogueDoc(SimpleDocTemplate):
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, _FicheStart):
+            self.notify("TOCEntry", (0, flowable.title, self.page, flowable.key))
+
+
+def generate_catalogue_pdf(fiches: list, settings: dict, title: str = "Catalogue des procedures") -> bytes:
+    """One PDF with a table of contents (and PDF outline) followed by every fiche."""
+    buffer = io.BytesIO()
+    styles = shared_styles()
+    doc = _document(buffer, title, settings, cls=_CatalogueDoc)
+
+    toc = TableOfContents()
+    toc.levelStyles = [ParagraphStyle(
+        "TocEntry", fontName="Helvetica", fontSize=10, textColor=MEDIUM, leading=16,
+    )]
+    story = []
+    logo_path = load_logo(settings)
+    if logo_path:
+        try:
+            logo_img = Image(logo_path, width=42 * mm, height=16 * mm, kind="proportional")
+            logo_img.hAlign = "CENTER"
+            story.append(logo_img)
+        except Exception:
+            pass
+    story.append(Paragraph(settings.get("company_name", "Matrix News"), styles["CompanyName"]))
+    story.append(HRFlowable(width="100%", thickness=2, color=ORANGE, spaceAfter=6))
+    story.append(build_section_title(f"{title} ({len(fiches)} fiches)", styles))
+    story.append(Spacer(1, 4 * mm))
+    story.append(toc)
+
+    for i, fiche in enumerate(fiches):
+        story.append(PageBreak())
+        story.append(_FicheStart(f"fiche-{i}", fiche.get("title", "Fiche de Procedure")))
+        story.extend(build_fiche_story(fiche, settings))
+
+    doc.multiBuild(story)
     return buffer.getvalue()
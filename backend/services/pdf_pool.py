@@ -0,0 +1,99 @@
+"""
+PDF rendering off the event loop.
+
+ReportLab layout is pure CPU, so fiches are rendered in a pool of
+PDF_WORKERS worker processes, warmed up once (stylesheet, logo lookup) by
+`pdf_generator.warm_up`. At most PDF_WORKERS renders run at a time; further
+requests wait in line, and beyond PDF_MAX_QUEUE waiting requests new ones are
+refused with a 503 rather than piling up.
+
+Render times are recorded in the `pdf.rendered` metric (value in ms) and the
+live state of the pool (queue depth, in flight, recent latency) is available
+from `snapshot()`.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+from fastapi import HTTPException
+from config import PDF_WORKERS, PDF_MAX_QUEUE
+from services import pdf_generator
+from services.metrics import metrics
+from services.process_pool import ProcessPool
+
+LATENCY_WINDOW = 200  # recent renders kept for the snapshot percentiles
+
+
+class PdfRenderPool:
+    def __init__(self, workers: int = PDF_WORKERS, max_queue: int = PDF_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ProcessPool("PDF", initializer=pdf_generator.warm_up)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        self._pool.start(self.workers)
+
+    async def stop(self):
+        await self._pool.stop()
+
+    async def render(self, fiche: dict, settings: dict, kind: str = "fiche") -> bytes:
+        """Render a fiche in a worker process, waiting for a free worker if needed."""
+        return await self._run(pdf_generator.generate_fiche_pdf, (fiche, settings), kind)
+
+    async def render_catalogue(self, fiches: list, settings: dict, title: str) -> bytes:
+        """Several fiches in one PDF with a table of contents (a single worker)."""
+        return await self._run(pdf_generator.generate_catalogue_pdf, (fiches, settings, title), "catalogue")
+
+    async def _run(self, func, args: tuple, kind: str) -> bytes:
+        self.start()
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Generation PDF saturee, reessayez dans un instant")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        started = time.perf_counter()
+        try:
+            # A dead worker (e.g. killed for memory) gets the pool rebuilt and the render retried once
+            pdf = await self._pool.run(func, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._slots.release()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.rendered += 1
+        self._latencies.append(elapsed_ms)
+        metrics.record("pdf.rendered", {"kind": kind}, value=round(elapsed_ms))
+        return pdf
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1)
+
+        return {
+            "workers": self.workers, "max_queue": self.max_queue,
+            "queue_depth": self.waiting, "in_flight": self.running,
+            "rendered": self.rendered, "failed": self.failed, "rejected": self.rejected,
+            "render_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+        }
+
+
+pdf_pool = PdfRenderPool()
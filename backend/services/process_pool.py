@@ -0,0 +1,64 @@
+"""
+Worker process pools that survive a dead worker.
+
+When a worker process dies (e.g. killed for memory) its ProcessPoolExecutor
+is broken for good and every call in flight fails with BrokenProcessPool.
+`ProcessPool.run` then rebuilds the executor and retries the call once.
+Concurrent calls that failed on the same executor all try to rebuild it;
+only the first one does, the others retry on the new pool instead of
+shutting it down. Used by services/pdf_pool.py and
+services/content_pipeline.py.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessPool:
+    def __init__(self, name: str, initializer: Optional[Callable] = None):
+        self.name = name
+        self.initializer = initializer
+        self.workers = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self, workers: int):
+        if self._executor is not None:
+            return
+        self.workers = workers
+        # spawn: forking a process that runs an event loop and driver threads is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+        )
+        if self.initializer:
+            # Workers are started on demand; start them all now so the first calls are warm
+            for _ in range(workers):
+                self._executor.submit(self.initializer)
+
+    async def stop(self):
+        executor, self._executor = self._executor, None
+        if executor:
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        if self._executor is not broken:
+            return  # already rebuilt by a call that failed on the same pool
+        logger.warning("%s worker pool broken, restarting it", self.name)
+        self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start(self.workers)
+
+    async def run(self, func, *args):
+        """`func(*args)` in a worker process (the pool must be started)."""
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self._restart(executor)
+            return await loop.run_in_executor(self._executor, func, *args)
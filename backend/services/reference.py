@@ -0,0 +1,83 @@
+"""
+Versioned bundle of the reference data clients load at start-up.
+
+Locations, procedure categories/countries/languages/complexity levels,
+property statuses and the public price references are served as one JSON
+document. It is serialized and gzip-compressed once per version and kept in
+memory with a content-hash ETag, so a client revalidating it costs a 304.
+
+The version lives in the `cache_versions` collection: admin changes to the
+dynamic parts (price references) call `bump()`, and every process notices
+the new version within VERSION_CHECK_INTERVAL seconds.
+"""
+import gzip
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from database import db
+from data.guinea_locations import GUINEA_LOCATIONS, get_cities
+from models.procedure import PROCEDURE_CATEGORIES, PROCEDURE_COUNTRIES, COMPLEXITY_LEVELS, LANGUAGES
+from models.property import PROPERTY_STATUSES
+
+VERSION_KEY = "reference"
+VERSION_CHECK_INTERVAL = 30  # seconds
+MAX_PRICE_REFERENCES = 5000
+
+
+class Bundle:
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+
+class ReferenceBundle:
+    def __init__(self):
+        self._bundle: Optional[Bundle] = None
+        self._checked_at = 0.0
+
+    async def _current_version(self) -> int:
+        doc = await db.cache_versions.find_one({"key": VERSION_KEY}, {"_id": 0, "version": 1})
+        return doc["version"] if doc else 0
+
+    async def _build(self, version: int) -> Bundle:
+        price_references = await db.price_references.find(
+            {}, {"_id": 0, "city": 1, "commune": 1, "quartier": 1, "price_per_sqm": 1, "updated_at": 1},
+        ).sort([("city", 1), ("commune", 1), ("quartier", 1)]).to_list(MAX_PRICE_REFERENCES)
+        data = {
+            "version": version,
+            "locations": GUINEA_LOCATIONS,
+            "cities": get_cities(),
+            "procedure_categories": PROCEDURE_CATEGORIES,
+            "procedure_countries": PROCEDURE_COUNTRIES,
+            "languages": LANGUAGES,
+            "complexity_levels": COMPLEXITY_LEVELS,
+            "property_statuses": PROPERTY_STATUSES,
+            "price_references": price_references,
+        }
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return Bundle(version, body)
+
+    async def get(self) -> Bundle:
+        now = time.monotonic()
+        if self._bundle is None or now - self._checked_at >= VERSION_CHECK_INTERVAL:
+            version = await self._current_version()
+            if self._bundle is None or self._bundle.version != version:
+                self._bundle = await self._build(version)
+            self._checked_at = now
+        return self._bundle
+
+    async def bump(self):
+        """Invalidate the bundle in every process after a reference data change."""
+        await db.cache_versions.update_one(
+            {"key": VERSION_KEY},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True,
+        )
+        self._bundle = None
+
+
+reference_bundle = ReferenceBundle()
@@ -0,0 +1,188 @@
+"""
+Publication of scheduled articles.
+
+Articles saved with `status="scheduled"` and a `scheduled_at` are kept in a
+min-heap of due times, loaded from the (status, scheduled_at) index at startup
+and every RELOAD_INTERVAL seconds, and updated by the article write routes
+through `track` / `discard`. The publisher sleeps until the earliest due time
+(or until a write wakes it) and then flips the article to `published`.
+
+Several backend processes run a publisher; only the holder of the
+`article_publisher` lease (renewed every RELOAD_INTERVAL, expiring after
+LEASE_SECONDS) publishes, the others take over when it stops renewing. The
+flip itself is a conditional update on the status and due time, so an
+article is published once even if two processes ever believe they hold the
+lease, and not at all if it was rescheduled or edited back to draft in the
+meantime. Schedules written by another process are picked up at the next
+reload, i.e. at most RELOAD_INTERVAL seconds late.
+"""
+import asyncio
+import heapq
+import logging
+import socket
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from database import db
+from routes.messages import manager
+from services import leases
+from services.stats import stats
+from services.metrics import metrics
+from services.search import search_cache
+from services.suggest import suggest_index
+from services.feeds import feeds
+from services.article_render import article_render
+
+logger = logging.getLogger(__name__)
+
+RELOAD_INTERVAL = 10  # seconds
+LEASE_SECONDS = 30
+LEASE_KEY = "article_publisher"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class ScheduledPublisher:
+    def __init__(self, interval: float = RELOAD_INTERVAL):
+        self.interval = interval
+        self.worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self.published = 0
+        # article id -> scheduled_at as stored; heap entries not matching it are stale
+        self._due: Dict[str, str] = {}
+        self._heap: List[Tuple[datetime, str, str]] = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    # ── Schedule ─────────────────────────────────────────────────────────────
+
+    def _push(self, article_id: str, scheduled_at: str):
+        due = _parse(scheduled_at)
+        if due is None:
+            logger.warning(f"Article {article_id} has an invalid scheduled_at: {scheduled_at!r}")
+            return
+        self._due[article_id] = scheduled_at
+        heapq.heappush(self._heap, (due, article_id, scheduled_at))
+
+    def track(self, article: dict):
+        """Call after an article write: (re)schedules it or drops its schedule."""
+        if article.get("status") == "scheduled" and article.get("scheduled_at"):
+            if self._due.get(article["id"]) != article["scheduled_at"]:
+                self._push(article["id"], article["scheduled_at"])
+                self._wakeup.set()
+        else:
+            self._due.pop(article["id"], None)
+
+    def discard(self, article_id: str):
+        self._due.pop(article_id, None)
+
+    async def reload(self):
+        cursor = db.articles.find(
+            {"status": "scheduled", "scheduled_at": {"$type": "string"}},
+            {"_id": 0, "id": 1, "scheduled_at": 1},
+        ).sort("scheduled_at", 1)
+        docs = await cursor.to_list(None)
+        self._due, self._heap = {}, []
+        for doc in docs:
+            self._push(doc["id"], doc["scheduled_at"])
+
+    def next_due(self) -> Optional[datetime]:
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][2]:
+            heapq.heappop(self._heap)  # rescheduled or unscheduled since it was pushed
+        return self._heap[0][0] if self._heap else None
+
+    # ── Lease ────────────────────────────────────────────────────────────────
+
+    async def _acquire_lease(self) -> bool:
+        return await leases.acquire(LEASE_KEY, self.worker_id, LEASE_SECONDS)
+
+    async def _release_lease(self):
+        await leases.release(LEASE_KEY, self.worker_id)
+
+    # ── Publication ──────────────────────────────────────────────────────────
+
+    async def _publish(self, article_id: str, scheduled_at: str) -> bool:
+        article = await db.articles.find_one({"id": article_id}, {"_id": 0})
+        if not article or article.get("status") != "scheduled" or article.get("scheduled_at") != scheduled_at:
+            return False
+        now = _now().isoformat()
+        updates = {"status": "published", "updated_at": now, "published_at": article.get("published_at") or now}
+        result = await db.articles.update_one(
+            {"id": article_id, "status": "scheduled", "scheduled_at": scheduled_at}, {"$set": updates},
+        )
+        if result.modified_count != 1:
+            return False  # edited or published by someone else in between
+        published = {**article, **updates}
+        await stats.track("article", article, published)
+        metrics.record("articles.published", {"category": published.get("category")})
+        suggest_index.put("article", published)
+        feeds.put("article", published)
+        search_cache.invalidate("article")
+        article_render.invalidate(article_id)
+        await manager.broadcast_all({"type": "content_update", "content_type": "article", "action": "updated"})
+        self.published += 1
+        logger.info(f"Published scheduled article {article_id} (due {scheduled_at})")
+        return True
+
+    async def publish_due(self):
+        now = _now()
+        while (due := self.next_due()) is not None and due <= now:
+            _, article_id, scheduled_at = heapq.heappop(self._heap)
+            self._due.pop(article_id, None)
+            try:
+                await self._publish(article_id, scheduled_at)
+            except Exception as e:
+                logger.error(f"Scheduled publication of {article_id} failed: {e}")
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def _run(self):
+        reloaded_at = None
+        while True:
+            try:
+                now = _now()
+                if reloaded_at is None or (now - reloaded_at).total_seconds() >= self.interval:
+                    self.leader = await self._acquire_lease()
+                    await self.reload()
+                    reloaded_at = now
+                if self.leader:
+                    await self.publish_due()
+            except Exception as e:
+                logger.error(f"Scheduled publisher error: {e}")
+            self._wakeup.clear()
+            timeout = self.interval
+            due = self.next_due()
+            if self.leader and due is not None:
+                timeout = min(timeout, max(0.0, (due - _now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.leader:
+            self.leader = False
+            try:
+                await self._release_lease()  # let another process take over now
+            except Exception as e:
+                logger.warning(f"Publisher lease release failed: {e}")
+
+
+scheduled_publisher = ScheduledPublisher()
@@ -0,0 +1,218 @@
+"""
+Full-text search over articles, properties and procedures.
+
+Each collection has a MongoDB text index (see `database.ensure_indexes`),
+maintained by Mongo on every write. The content indexes use the French analyzer, which
+stems words and ignores case and accents ("Kipé" finds "kipe", "visas" finds
+"visa"). Field weights rank title matches above body matches, and results
+are sorted by text score, then by date.
+
+`search()` returns the matching documents with their `score` and a short
+plain-text `snippet` around the first match; `global_search()` queries the
+three content collections concurrently.
+
+Results of popular queries are kept in `search_cache` for CACHE_TTL seconds,
+keyed by the folded query and its filters. Each entry is tagged with the
+kinds of content it lists; the write routes call `search_cache.invalidate`
+for the kind they changed, which drops every entry with that tag. Other
+workers' writes are bounded by the TTL.
+"""
+import asyncio
+import html
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from database import db
+from services.metrics import metrics
+from utils import fold_text
+
+SNIPPET_RADIUS = 80  # characters on each side of the first match
+STEM_PREFIX = 5  # query terms are matched in snippets by their first letters
+CACHE_TTL = 60  # seconds
+CACHE_MAX_ENTRIES = 2000
+
+# kind -> collection, base filter for public search, projection of the
+# returned fields, fields a snippet is taken from (in order).
+SEARCH_SPECS = {
+    "article": {
+        "collection": "articles",
+        "filter": {"status": "published"},
+        "projection": {"id": 1, "title": 1, "subtitle": 1, "category": 1, "image_url": 1, "author_name": 1,
+                       "slug": 1, "created_at": 1, "published_at": 1},
+        "snippet_fields": ["subtitle", "content", "meta_description"],
+        "date_field": "published_at",
+    },
+    "property": {
+        "collection": "properties",
+        "filter": {},
+        "projection": {"id": 1, "title": 1, "type": 1, "city": 1, "commune": 1, "neighborhood": 1, "price": 1,
+                       "currency": 1, "images": 1, "status": 1, "created_at": 1},
+        "snippet_fields": ["description"],
+        "date_field": "created_at",
+    },
+    "procedure": {
+        "collection": "procedures",
+        "filter": {"status": "published"},
+        "projection": {"id": 1, "title": 1, "country": 1, "category": 1, "image_url": 1, "created_at": 1},
+        "snippet_fields": ["description", "content"],
+        "date_field": "created_at",
+    },
+}
+
+
+def text_query(q: str) -> dict:
+    """`$text` clause for a user query; quotes are dropped so input is never a phrase/negation syntax."""
+    return {"$text": {"$search": re.sub(r"[\"\\-]+", " ", q).strip()}}
+
+
+def _strip_tags(value) -> str:
+    if isinstance(value, list):
+        value = " ".join(str(v) for v in value)
+    text = re.sub(r"<[^>]*>", " ", str(value or ""))
+    return re.sub(r"\s+", " ", html.unescape(text)).strip()
+
+
+def _fold_chars(text: str) -> str:
+    """Lower-case and strip accents one character at a time, so positions match `text`."""
+    return "".join((unicodedata.normalize("NFKD", c)[:1] or c).lower() for c in text)
+
+
+def make_snippet(doc: dict, fields: List[str], q: str) -> str:
+    terms = [t[:STEM_PREFIX] for t in _fold_chars(q).split() if len(t) >= 2]
+    fallback = ""
+    for field in fields:
+        text = _strip_tags(doc.get(field))
+        if not text:
+            continue
+        fallback = fallback or text
+        folded = _fold_chars(text)
+        positions = [m.start() for t in terms for m in [re.search(r"\b" + re.escape(t), folded)] if m]
+        if positions:
+            start = max(0, min(positions) - SNIPPET_RADIUS)
+            end = min(len(text), min(positions) + SNIPPET_RADIUS)
+            return ("…" if start else "") + text[start:end].strip() + ("…" if end < len(text) else "")
+    return fallback[:2 * SNIPPET_RADIUS] + ("…" if len(fallback) > 2 * SNIPPET_RADIUS else "")
+
+
+async def search(kind: str, q: str, limit: int = 10, skip: int = 0, extra: Optional[dict] = None,
+                 projection: Optional[dict] = None, snippets: bool = True) -> List[dict]:
+    """Ranked matches of `q`; `extra` filters are added to the kind's base filter."""
+    spec = SEARCH_SPECS[kind]
+    query = {**text_query(q), **spec["filter"], **(extra or {})}
+    fields = projection if projection is not None else spec["projection"]
+    proj = {"_id": 0, "score": {"$meta": "textScore"}}
+    if fields:
+        proj.update(fields)
+        proj.update({f: 1 for f in spec["snippet_fields"]} if snippets else {})
+    cursor = db[spec["collection"]].find(query, proj).sort(
+        [("score", {"$meta": "textScore"}), (spec["date_field"], -1)]
+    ).skip(skip).limit(limit)
+    results = await cursor.to_list(limit)
+    if snippets and spec["snippet_fields"]:
+        for doc in results:
+            doc["snippet"] = make_snippet(doc, spec["snippet_fields"], q)
+            if fields:
+                for f in spec["snippet_fields"]:
+                    if f not in fields:
+                        doc.pop(f, None)
+    return results
+
+
+async def count(kind: str, q: str, extra: Optional[dict] = None) -> int:
+    spec = SEARCH_SPECS[kind]
+    return await db[spec["collection"]].count_documents({**text_query(q), **spec["filter"], **(extra or {})})
+
+
+async def _global_search(q: str, limit: int) -> Dict[str, List[dict]]:
+    articles, properties, procedures = await asyncio.gather(
+        search("article", q, limit), search("property", q, limit), search("procedure", q, limit),
+    )
+    for p in properties:
+        images = p.pop("images", None)
+        p["image"] = images[0] if images else None
+    return {"articles": articles, "properties": properties, "procedures": procedures}
+
+
+async def global_search(q: str, limit: int = 5) -> Dict[str, List[dict]]:
+    return await search_cache.get_or_compute(
+        "global", list(SEARCH_SPECS), q, {"limit": limit}, lambda: _global_search(q, limit),
+    )
+
+
+# ─── Result cache ──────────────────────────────────────────────────────────────
+
+class SearchCache:
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires, {tag: generation}, value); oldest first
+        self._entries: "OrderedDict[tuple, Tuple[float, Dict[str, int], object]]" = OrderedDict()
+        self._generations: Dict[str, int] = defaultdict(int)
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.invalidations: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def key(scope: str, q: str, filters: Optional[dict] = None) -> tuple:
+        """Case, accents, punctuation and spacing do not matter; empty filters are ignored."""
+        params = tuple(sorted((k, str(v)) for k, v in (filters or {}).items() if v not in (None, "")))
+        return scope, fold_text(q), params
+
+    def get(self, key: tuple):
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        expires, generations, value = cached
+        if expires < time.monotonic() or any(self._generations[t] != g for t, g in generations.items()):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def generations(self, tags: List[str]) -> Dict[str, int]:
+        return {t: self._generations[t] for t in tags}
+
+    def set(self, key: tuple, generations: Dict[str, int], value):
+        """Store a value computed from data read at `generations` (taken before reading it):
+        a write landing during the computation leaves the entry already stale."""
+        self._entries[key] = (time.monotonic() + self.ttl, dict(generations), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tag: str):
+        """Content of this kind was written: entries listing it are stale (dropped lazily)."""
+        self._generations[tag] += 1
+        self.invalidations[tag] += 1
+
+    async def get_or_compute(self, scope: str, tags: List[str], q: str, filters: Optional[dict],
+                             compute: Callable[[], Awaitable]):
+        key = self.key(scope, q, filters)
+        value = self.get(key)
+        hit = value is not None
+        (self.hits if hit else self.misses)[scope] += 1
+        metrics.record("search.cache", {"scope": scope, "result": "hit" if hit else "miss"})
+        if not hit:
+            generations = self.generations(tags)
+            value = await compute()
+            self.set(key, generations, value)
+        return value
+
+    def snapshot(self) -> dict:
+        scopes = sorted(set(self.hits) | set(self.misses))
+        by_scope = {}
+        for scope in scopes:
+            total = self.hits[scope] + self.misses[scope]
+            by_scope[scope] = {"hits": self.hits[scope], "misses": self.misses[scope],
+                               "hit_rate": round(self.hits[scope] / total, 3) if total else None}
+        hits, total = sum(self.hits.values()), sum(self.hits.values()) + sum(self.misses.values())
+        return {
+            "entries": len(self._entries), "max_entries": self.max_entries, "ttl": self.ttl,
+            "hit_rate": round(hits / total, 3) if total else None,
+            "scopes": by_scope, "invalidations": dict(self.invalidations),
+        }
+
+
+search_cache = SearchCache()
@@ -0,0 +1,318 @@
+"""
+Materialized dashboard statistics.
+
+Counters live in the `stats` collection, one document per scope:
+`global` (admin and procedures dashboards), `author:<id>` (my-articles stats)
+and `agent:<id>` (agent profile). Writes report the document before and after
+the change with `track()`, and the difference is applied with `$inc`; view
+and like counters are bumped by their own flushes. A scope document is
+computed from the source collections the first time it is read, on a forced
+refresh, and by the periodic reconciliation that corrects any drift. Every
+process runs the reconciliation loop, but only the holder of the
+`stats_reconcile` lease (services/leases.py) does the work.
+"""
+import asyncio
+import logging
+import socket
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from pymongo import UpdateOne
+from database import db
+from services import leases
+from services.unique_viewers import count_union
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL = 15 * 60  # seconds
+LEASE_KEY = "stats_reconcile"
+LEASE_GRACE = 60  # seconds a missed renewal is tolerated before another process takes over
+GLOBAL_KEY = "global"
+
+USER_STATUS_FIELDS = {
+    "pending_verification": "users_pending",
+    "active": "users_active",
+    "actif": "users_active",
+    "suspended": "users_suspended",
+    "suspendu": "users_suspended",
+    "bloque": "users_suspended",
+}
+ARTICLE_STATUSES = ("published", "draft", "scheduled")
+PROCEDURE_STATUSES = ("published", "draft")
+
+
+def author_key(user_id: str) -> str:
+    return f"author:{user_id}"
+
+
+def agent_key(user_id: str) -> str:
+    return f"agent:{user_id}"
+
+
+def _group_key(value) -> str:
+    # Mongo field names cannot contain dots; missing values group under "null"
+    return str(value).replace(".", "_") if value not in (None, "") else "null"
+
+
+def _user_counters(user: dict) -> Dict[str, Dict[str, int]]:
+    counters = {"users": 1}
+    if user.get("email_verified") is True:
+        counters["users_verified"] = 1
+    status_field = USER_STATUS_FIELDS.get(user.get("status"))
+    if status_field:
+        counters[status_field] = 1
+    return {GLOBAL_KEY: counters}
+
+
+def _article_counters(article: dict) -> Dict[str, Dict[str, int]]:
+    counters = {
+        "articles": 1,
+        "article_views": article.get("views", 0),
+        "article_likes": article.get("likes_count", 0),
+    }
+    if article.get("status") in ARTICLE_STATUSES:
+        counters[f"articles_{article['status']}"] = 1
+    return {GLOBAL_KEY: {"articles": 1}, author_key(article.get("author_id", "")): counters}
+
+
+def _property_counters(prop: dict) -> Dict[str, Dict[str, int]]:
+    counters = {"properties": 1, "property_views": prop.get("views", 0)}
+    if prop.get("status") == "disponible":
+        counters["properties_available"] = 1
+    return {GLOBAL_KEY: {"properties": 1}, agent_key(prop.get("author_id", "")): counters}
+
+
+def _procedure_counters(proc: dict) -> Dict[str, Dict[str, int]]:
+    counters = {
+        "procedures": 1,
+        "procedure_views": proc.get("views", 0),
+        f"procedures_by_category.{_group_key(proc.get('category'))}": 1,
+        f"procedures_by_country.{_group_key(proc.get('country', proc.get('subcategory')))}": 1,
+    }
+    if proc.get("status") in PROCEDURE_STATUSES:
+        counters[f"procedures_{proc['status']}"] = 1
+    if proc.get("active") is True:
+        counters["procedures_active"] = 1
+    return {GLOBAL_KEY: counters}
+
+
+COUNTERS = {
+    "user": _user_counters,
+    "article": _article_counters,
+    "property": _property_counters,
+    "procedure": _procedure_counters,
+    "payment": lambda doc: {GLOBAL_KEY: {"payments": 1}},
+    "procedure_file": lambda doc: {GLOBAL_KEY: {"procedure_files": 0 if doc.get("is_deleted") else 1}},
+    "chat_action": lambda doc: {GLOBAL_KEY: {"chat_actions": 1}},
+}
+
+# ─── Full computations (first read, forced refresh, reconciliation) ───────────
+
+ARTICLE_GROUP = {
+    "articles": {"$sum": 1},
+    **{f"articles_{s}": {"$sum": {"$cond": [{"$eq": ["$status", s]}, 1, 0]}} for s in ARTICLE_STATUSES},
+    "article_views": {"$sum": {"$ifNull": ["$views", 0]}},
+    "article_likes": {"$sum": {"$ifNull": ["$likes_count", 0]}},
+    "item_ids": {"$push": "$id"},
+}
+PROPERTY_GROUP = {
+    "properties": {"$sum": 1},
+    "properties_available": {"$sum": {"$cond": [{"$eq": ["$status", "disponible"]}, 1, 0]}},
+    "property_views": {"$sum": {"$ifNull": ["$views", 0]}},
+    "item_ids": {"$push": "$id"},
+}
+
+
+async def _compute_global() -> dict:
+    async def count(collection, query=None):
+        return await db[collection].count_documents(query or {})
+
+    async def group_by(field_expr):
+        pipeline = [{"$group": {"_id": field_expr, "count": {"$sum": 1}}}]
+        return {_group_key(r["_id"]): r["count"] async for r in db.procedures.aggregate(pipeline)}
+
+    async def procedure_views():
+        result = await db.procedures.aggregate([{"$group": {"_id": None, "total": {"$sum": "$views"}}}]).to_list(1)
+        return result[0]["total"] if result else 0
+
+    fields = {
+        "users": count("users"),
+        "users_verified": count("users", {"email_verified": True}),
+        "users_pending": count("users", {"status": "pending_verification"}),
+        "users_active": count("users", {"status": {"$in": ["active", "actif"]}}),
+        "users_suspended": count("users", {"status": {"$in": ["suspended", "suspendu", "bloque"]}}),
+        "articles": count("articles"),
+        "properties": count("properties"),
+        "payments": count("payments"),
+        "procedures": count("procedures"),
+        "procedures_published": count("procedures", {"status": "published"}),
+        "procedures_draft": count("procedures", {"status": "draft"}),
+        "procedures_active": count("procedures", {"active": True}),
+        "procedure_files": count("procedure_files", {"is_deleted": False}),
+        "chat_actions": count("chat_actions"),
+        "procedure_views": procedure_views(),
+        "procedures_by_category": group_by("$category"),
+        "procedures_by_country": group_by({"$ifNull": ["$country", "$subcategory"]}),
+    }
+    values = await asyncio.gather(*fields.values())
+    return dict(zip(fields, values))
+
+
+async def _compute_grouped(collection: str, group: dict, content_type: str, match: Optional[dict] = None) -> Dict[str, dict]:
+    """Per-owner counters for one owner (`match`) or for every owner."""
+    pipeline = ([{"$match": match}] if match else []) + [{"$group": {"_id": "$author_id", **group}}]
+    result = {}
+    async for row in db[collection].aggregate(pipeline):
+        owner = row.pop("_id")
+        if not owner:
+            continue
+        row["unique_viewers"] = await count_union(content_type, row.pop("item_ids"))
+        result[owner] = row
+    return result
+
+
+def _empty(group: dict) -> dict:
+    return {**{field: 0 for field in group if field != "item_ids"}, "unique_viewers": 0}
+
+
+async def _compute(key: str) -> dict:
+    if key == GLOBAL_KEY:
+        return await _compute_global()
+    scope, _, owner = key.partition(":")
+    if scope == "author":
+        rows = await _compute_grouped("articles", ARTICLE_GROUP, "article", {"author_id": owner})
+        return rows.get(owner) or _empty(ARTICLE_GROUP)
+    if scope == "agent":
+        rows = await _compute_grouped("properties", PROPERTY_GROUP, "property", {"author_id": owner})
+        return rows.get(owner) or _empty(PROPERTY_GROUP)
+    raise ValueError(f"Unknown stats scope: {key}")
+
+
+class StatsService:
+    def __init__(self, interval: float = RECONCILE_INTERVAL):
+        self.interval = interval
+        self.worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._task = None
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    async def get(self, key: str, refresh: bool = False) -> dict:
+        if not refresh:
+            doc = await db.stats.find_one({"key": key}, {"_id": 0})
+            if doc:
+                return doc
+        return await self.refresh(key)
+
+    async def refresh(self, key: str) -> dict:
+        now = datetime.now(timezone.utc).isoformat()
+        counters = await _compute(key)
+        doc = {**counters, "key": key, "scope": key.partition(":")[0], "reconciled_at": now, "updated_at": now}
+        await db.stats.replace_one({"key": key}, doc, upsert=True)
+        return doc
+
+    async def drop(self, *keys: str):
+        await db.stats.delete_many({"key": {"$in": list(keys)}})
+
+    # ── Incremental updates ──────────────────────────────────────────────────
+
+    async def track(self, kind: str, before: Optional[dict] = None, after: Optional[dict] = None):
+        """Apply the counter difference between two versions of a document."""
+        await self.track_many(kind, [(before, after)])
+
+    async def track_many(self, kind: str, changes: Iterable[Tuple[Optional[dict], Optional[dict]]]):
+        """`track()` for a batch of (before, after) pairs, in a single write."""
+        deltas: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        for before, after in changes:
+            for doc, sign in ((before, -1), (after, 1)):
+                if doc is None:
+                    continue
+                for key, counters in COUNTERS[kind](doc).items():
+                    for field, n in counters.items():
+                        deltas[key][field] += sign * n
+        await self.bump_many(deltas)
+
+    async def bump(self, key: str, deltas: Dict[str, int]):
+        await self.bump_many({key: deltas})
+
+    async def bump_many(self, deltas: Dict[str, Dict[str, int]]):
+        # Only existing scope documents are incremented: a missing one is
+        # computed in full on its first read, so partial counters never appear.
+        now = datetime.now(timezone.utc).isoformat()
+        ops = []
+        for key, counters in deltas.items():
+            inc = {field: n for field, n in counters.items() if n}
+            if inc:
+                ops.append(UpdateOne({"key": key}, {"$inc": inc, "$set": {"updated_at": now}}))
+        if not ops:
+            return
+        try:
+            await db.stats.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Stats update failed: {e}")
+
+    async def record_views(self, content_type: str, counts: Dict[str, int]):
+        """Called by the view counter after each flush."""
+        if content_type == "procedure":
+            await self.bump(GLOBAL_KEY, {"procedure_views": sum(counts.values())})
+            return
+        collection, key_for, field = {
+            "article": ("articles", author_key, "article_views"),
+            "property": ("properties", agent_key, "property_views"),
+        }[content_type]
+        per_owner: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        async for doc in db[collection].find({"id": {"$in": list(counts)}}, {"_id": 0, "id": 1, "author_id": 1}):
+            if doc.get("author_id"):
+                per_owner[key_for(doc["author_id"])][field] += counts[doc["id"]]
+        await self.bump_many(per_owner)
+
+    async def record_like(self, target_type: str, owner_id: Optional[str], delta: int):
+        if owner_id and target_type == "article":
+            await self.bump(author_key(owner_id), {"article_likes": delta})
+
+    # ── Reconciliation ───────────────────────────────────────────────────────
+
+    async def reconcile(self):
+        now = datetime.now(timezone.utc).isoformat()
+        await self.refresh(GLOBAL_KEY)
+        for scope, collection, group, content_type, key_for in (
+            ("author", "articles", ARTICLE_GROUP, "article", author_key),
+            ("agent", "properties", PROPERTY_GROUP, "property", agent_key),
+        ):
+            rows = await _compute_grouped(collection, group, content_type)
+            ops = [
+                UpdateOne({"key": key_for(owner)}, {"$set": {
+                    **counters, "scope": scope, "reconciled_at": now, "updated_at": now,
+                }}, upsert=True)
+                for owner, counters in rows.items()
+            ]
+            if ops:
+                await db.stats.bulk_write(ops, ordered=False)
+            await db.stats.delete_many({"scope": scope, "key": {"$nin": [key_for(o) for o in rows]}})
+
+    async def reconcile_if_leader(self) -> bool:
+        """Reconcile unless another process holds the lease (kept across runs, renewed each one)."""
+        if not await leases.acquire(LEASE_KEY, self.worker_id, self.interval + LEASE_GRACE):
+            return False
+        await self.reconcile()
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile_if_leader()
+            except Exception as e:
+                logger.error(f"Stats reconciliation error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+stats = StatsService()
@@ -0,0 +1,198 @@
+"""
+Typeahead suggestions from an in-memory prefix index.
+
+The index is a sorted list of (key, kind, id) tuples, where the keys of an
+entry are the folded words of its label from each word on ("visa pour la
+france", "pour la france", "france") plus its tags or keywords. A lookup is
+a bisect to the first key starting with the prefix followed by a short scan,
+so `/api/suggest` never touches Mongo.
+
+Entries: published articles (title, tags), published procedures (title,
+keywords), properties (title) and the cities, communes and quartiers of
+GUINEA_LOCATIONS. The routes that write these documents call `put` / `remove`
+so this worker's index follows its own writes; the whole index is rebuilt
+every REBUILD_INTERVAL seconds to pick up the writes of other workers and of
+background jobs.
+"""
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from database import db
+from data.guinea_locations import GUINEA_LOCATIONS
+from utils import fold_text
+
+logger = logging.getLogger(__name__)
+
+REBUILD_INTERVAL = 300  # seconds
+MAX_WORDS = 12  # keys per label: suffixes starting at its first MAX_WORDS words
+MAX_SCAN = 200  # keys examined per lookup
+MIN_PREFIX = 1
+
+# kind -> collection, filter of the suggested documents, fields read
+SOURCES = {
+    "article": ("articles", {"status": "published"}, {"_id": 0, "id": 1, "title": 1, "tags": 1, "slug": 1}),
+    "procedure": ("procedures", {"status": "published"}, {"_id": 0, "id": 1, "title": 1, "keywords": 1}),
+    "property": ("properties", {}, {"_id": 0, "id": 1, "title": 1, "city": 1}),
+}
+
+# Rank among equally good matches: places first (they are short and common)
+KIND_ORDER = {"city": 0, "commune": 1, "quartier": 2, "procedure": 3, "article": 4, "property": 5}
+
+
+class Entry(NamedTuple):
+    kind: str
+    id: str
+    label: str
+    folded: str  # folded label: a key equal to it matches from the start
+    context: str  # e.g. the city of a commune
+    keys: Tuple[str, ...]
+    extra: Optional[dict] = None  # returned as is (slug, location params)
+
+
+def _label_keys(label: str) -> List[str]:
+    words = fold_text(label).split()
+    return [" ".join(words[i:]) for i in range(min(len(words), MAX_WORDS))]
+
+
+def _entry(kind: str, doc: dict) -> Optional[Entry]:
+    label = (doc.get("title") or "").strip()
+    if not label:
+        return None
+    keys = set(_label_keys(label))
+    for term in doc.get("tags") or doc.get("keywords") or []:
+        keys.update(_label_keys(str(term)))
+    keys.discard("")
+    extra = {"slug": doc["slug"]} if doc.get("slug") else None
+    return Entry(kind, doc["id"], label, fold_text(label), doc.get("city") or "", tuple(sorted(keys)), extra)
+
+
+def _location_entries() -> List[Entry]:
+    entries = []
+    for city, communes in GUINEA_LOCATIONS.items():
+        entries.append(Entry("city", city, city, fold_text(city), "", tuple(_label_keys(city)), {"city": city}))
+        for commune, quartiers in communes.items():
+            entries.append(Entry("commune", f"{city}/{commune}", commune, fold_text(commune), city,
+                                 tuple(_label_keys(commune)), {"city": city, "neighborhood": commune}))
+            for quartier in quartiers:
+                entries.append(Entry("quartier", f"{city}/{commune}/{quartier}", quartier, fold_text(quartier),
+                                     f"{commune}, {city}", tuple(_label_keys(quartier)),
+                                     {"city": city, "neighborhood": quartier}))
+    return entries
+
+
+class SuggestIndex:
+    def __init__(self, interval: float = REBUILD_INTERVAL):
+        self.interval = interval
+        self.entries: Dict[Tuple[str, str], Entry] = {}
+        self.keys: List[Tuple[str, str, str]] = []
+        self.built_at: Optional[float] = None
+        self._replay: Optional[list] = None  # writes seen while a rebuild is loading
+        self._task = None
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+
+    def _add(self, entry: Entry):
+        self.entries[(entry.kind, entry.id)] = entry
+        for key in entry.keys:
+            insort(self.keys, (key, entry.kind, entry.id))
+
+    def _discard(self, kind: str, item_id: str):
+        entry = self.entries.pop((kind, item_id), None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            item = (key, kind, item_id)
+            i = bisect_left(self.keys, item)
+            if i < len(self.keys) and self.keys[i] == item:
+                del self.keys[i]
+
+    def put(self, kind: str, doc: dict):
+        """Index a document after a write; documents that should not be suggested are removed."""
+        if self._replay is not None:
+            self._replay.append(("put", kind, doc))
+        query = SOURCES[kind][1]
+        self._discard(kind, doc["id"])
+        if all(doc.get(field) == value for field, value in query.items()):
+            entry = _entry(kind, doc)
+            if entry:
+                self._add(entry)
+
+    def remove(self, kind: str, item_id: str):
+        if self._replay is not None:
+            self._replay.append(("remove", kind, item_id))
+        self._discard(kind, item_id)
+
+    async def rebuild(self):
+        self._replay = []
+        try:
+            entries = _location_entries()
+            for kind, (collection, query, projection) in SOURCES.items():
+                async for doc in db[collection].find(query, projection):
+                    entry = _entry(kind, doc)
+                    if entry:
+                        entries.append(entry)
+            keys = sorted((key, e.kind, e.id) for e in entries for key in e.keys)
+            self.entries = {(e.kind, e.id): e for e in entries}
+            self.keys = keys
+            replay, self._replay = self._replay, None
+            for op, kind, arg in replay:
+                if op == "put":
+                    self.put(kind, arg)
+                else:
+                    self.remove(kind, arg)
+            self.built_at = asyncio.get_running_loop().time()
+        finally:
+            self._replay = None
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def suggest(self, q: str, limit: int = 8) -> List[dict]:
+        prefix = fold_text(q)
+        if len(prefix) < MIN_PREFIX:
+            return []
+        keys, entries = self.keys, self.entries
+        start = bisect_left(keys, (prefix,))
+        matches: Dict[Tuple[str, str], tuple] = {}  # entry -> best sort key
+        for i in range(start, min(start + MAX_SCAN, len(keys))):
+            key, kind, item_id = keys[i]
+            if not key.startswith(prefix):
+                break
+            entry = entries.get((kind, item_id))
+            if entry is None:
+                continue
+            # Labels starting with the prefix first, then places, then shorter labels
+            rank = (key != entry.folded, KIND_ORDER[kind], len(entry.label), entry.label)
+            best = matches.get((kind, item_id))
+            if best is None or rank < best:
+                matches[(kind, item_id)] = rank
+        results = []
+        for kind, item_id in sorted(matches, key=matches.get)[:limit]:
+            entry = entries[(kind, item_id)]
+            result = {"kind": kind, "id": item_id, "label": entry.label, "context": entry.context}
+            if entry.extra:
+                result.update(entry.extra)
+            results.append(result)
+        return results
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Suggest index rebuild error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,221 @@
+"""
+Unique-viewer estimation with HyperLogLog sketches.
+
+Each item keeps a fixed-size sketch (2**PRECISION one-byte registers, 4 KB)
+of hashed visitor fingerprints, whatever its traffic. Sketches are updated in
+memory on every view and merged into the `view_sketches` collection
+periodically; the resulting estimate is denormalized as `unique_views` on the
+item so lists and stats can read it without touching the sketch. Sketches
+are only stored for items that exist in their collection.
+
+Every process flushes its own sketches, so a stored sketch is replaced only
+if its `version` is still the one read (compare-and-swap); when another
+process wrote it in between, the merge is done again on its new registers.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import jwt
+from fastapi import Request
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import db
+from config import JWT_SECRET, JWT_ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+SKETCH_FLUSH_INTERVAL = 60  # seconds
+SKETCH_COLLECTION = "view_sketches"
+FLUSH_ATTEMPTS = 5  # compare-and-swap rounds before a flush gives up (and retries later)
+DUPLICATE_KEY = 11000
+
+COLLECTIONS = {
+    "article": "articles",
+    "property": "properties",
+    "procedure": "procedures",
+}
+
+
+class HyperLogLog:
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = bytearray(registers) if registers else bytearray(REGISTERS)
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+        index = h >> (64 - PRECISION)
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def covers(self, other: "HyperLogLog") -> bool:
+        """True when merging `other` into this sketch would change nothing."""
+        return all(a >= b for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / REGISTERS)
+        estimate = alpha * REGISTERS * REGISTERS / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * REGISTERS and zeros:
+            # Small-range correction (linear counting)
+            estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+
+def visitor_fingerprint(request: Request) -> str:
+    """Identify a visitor by user id when logged in, else by IP + user agent.
+
+    Only the last X-Forwarded-For hop is used: it is the one appended by our
+    proxy, earlier ones are whatever the client sent.
+    """
+    token = request.cookies.get("access_token")
+    auth = request.headers.get("authorization", "")
+    if not token and auth.lower().startswith("bearer "):
+        token = auth[7:]
+    if token:
+        try:
+            user_id = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]).get("sub")
+            if user_id:
+                return f"u:{user_id}"
+        except jwt.InvalidTokenError:
+            pass
+    client_ip = (
+        request.headers.get("x-forwarded-for", "").split(",")[-1].strip()
+        or request.headers.get("x-real-ip", "")
+        or (request.client.host if request.client else "unknown")
+    )
+    return f"a:{client_ip}|{request.headers.get('user-agent', '')}"
+
+
+async def load_sketches(content_type: str, item_ids: Iterable[str]) -> Dict[str, HyperLogLog]:
+    keys = [f"{content_type}:{i}" for i in item_ids]
+    sketches = {}
+    async for doc in db[SKETCH_COLLECTION].find({"key": {"$in": keys}}, {"_id": 0, "item_id": 1, "registers": 1}):
+        sketches[doc["item_id"]] = HyperLogLog(doc["registers"])
+    return sketches
+
+
+async def _load_versioned(content_type: str, item_ids: Iterable[str]) -> Dict[str, Tuple[HyperLogLog, Optional[int]]]:
+    keys = [f"{content_type}:{i}" for i in item_ids]
+    stored = {}
+    async for doc in db[SKETCH_COLLECTION].find(
+        {"key": {"$in": keys}}, {"_id": 0, "item_id": 1, "registers": 1, "version": 1},
+    ):
+        stored[doc["item_id"]] = (HyperLogLog(doc["registers"]), doc.get("version"))
+    return stored
+
+
+async def count_union(content_type: str, item_ids: Iterable[str]) -> int:
+    """Estimated distinct viewers across several items (e.g. all of an author's articles)."""
+    sketches = await load_sketches(content_type, item_ids)
+    # Thousands of register arrays for a prolific author: merged in a thread
+    return await asyncio.to_thread(_union_count, list(sketches.values()))
+
+
+def _union_count(sketches: List[HyperLogLog]) -> int:
+    union = HyperLogLog()
+    for sketch in sketches:
+        union.merge(sketch)
+    return union.count()
+
+
+class UniqueViewers:
+    def __init__(self, interval: float = SKETCH_FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending: Dict[str, Dict[str, HyperLogLog]] = {}
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def add(self, content_type: str, item_id: str, visitor: str):
+        items = self.pending.setdefault(content_type, {})
+        sketch = items.get(item_id)
+        if sketch is None:
+            sketch = items[item_id] = HyperLogLog()
+        sketch.add(visitor)
+
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending = self.pending, {}
+            now = datetime.now(timezone.utc).isoformat()
+            for content_type, items in batch.items():
+                if not items:
+                    continue
+                try:
+                    existing = {d["id"] async for d in db[COLLECTIONS[content_type]].find(
+                        {"id": {"$in": list(items)}}, {"_id": 0, "id": 1})}
+                    items = {i: s for i, s in items.items() if i in existing}
+                    if not items:
+                        continue
+                    estimates = await self._merge_stored(content_type, items, now)
+                    await db[COLLECTIONS[content_type]].bulk_write([
+                        UpdateOne({"id": item_id}, {"$set": {"unique_views": estimate}})
+                        for item_id, estimate in estimates.items()
+                    ], ordered=False)
+                except Exception as e:
+                    logger.error(f"Sketch flush failed for {content_type}: {e}")
+                    for item_id, sketch in items.items():
+                        self.pending.setdefault(content_type, {}).setdefault(item_id, HyperLogLog()).merge(sketch)
+
+    async def _merge_stored(self, content_type: str, items: Dict[str, HyperLogLog], now: str) -> Dict[str, int]:
+        """Merge the sketches into the stored ones; returns the estimate of each item."""
+        estimates, todo = {}, dict(items)
+        for attempt in range(FLUSH_ATTEMPTS + 1):
+            stored = await _load_versioned(content_type, todo)
+            ops = []
+            for item_id, sketch in list(todo.items()):
+                current, version = stored.get(item_id, (None, None))
+                if current is not None and current.covers(sketch):
+                    estimates[item_id] = current.count()
+                    del todo[item_id]
+                    continue
+                merged = HyperLogLog(sketch.registers)
+                if current is not None:
+                    merged.merge(current)
+                # A missing `version` matches sketches stored before it existed (and new ones);
+                # if the version moved on, the upsert hits the unique key and fails
+                ops.append(UpdateOne(
+                    {"key": f"{content_type}:{item_id}", "version": version},
+                    {"$set": {"content_type": content_type, "item_id": item_id, "version": (version or 0) + 1,
+                              "registers": bytes(merged.registers), "unique_views": merged.count(),
+                              "updated_at": now}},
+                    upsert=True,
+                ))
+            if not ops:
+                return estimates
+            if attempt == FLUSH_ATTEMPTS:
+                break
+            try:
+                await db[SKETCH_COLLECTION].bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                    raise
+        raise RuntimeError(f"{len(todo)} {content_type} sketches still written concurrently")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Unique viewers flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+unique_viewers = UniqueViewers()
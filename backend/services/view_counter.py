@@ -0,0 +1,107 @@
+"""
+Buffered view counting.
+
+Views are accumulated in memory and flushed to Mongo with one `bulk_write` per
+collection every FLUSH_INTERVAL seconds. After each flush, a single coalesced
+`view_update` per item is sent to the sockets watching that item (see
+ConnectionManager.watch) instead of broadcasting every view to everyone.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import db
+from routes.messages import manager
+from services.unique_viewers import unique_viewers
+from services.stats import stats
+from services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 5  # seconds
+
+# content_type -> collection holding the `views` counter
+COLLECTIONS = {
+    "article": "articles",
+    "property": "properties",
+    "procedure": "procedures",
+}
+
+
+class ViewCounter:
+    def __init__(self, interval: float = FLUSH_INTERVAL):
+        self.interval = interval
+        self.pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def record(self, content_type: str, item_id: str, count: int = 1, visitor: Optional[str] = None):
+        self.pending[content_type][item_id] += count
+        if visitor:
+            unique_viewers.add(content_type, item_id, visitor)
+
+    def pending_for(self, content_type: str, item_id: str) -> int:
+        """Views recorded but not yet flushed, to keep responses up to date."""
+        return self.pending.get(content_type, {}).get(item_id, 0)
+
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending = self.pending, defaultdict(lambda: defaultdict(int))
+            for content_type, counts in batch.items():
+                if not counts:
+                    continue
+                collection = db[COLLECTIONS[content_type]]
+                item_ids = list(counts)
+                try:
+                    await collection.bulk_write(
+                        [UpdateOne({"id": item_id}, {"$inc": {"views": counts[item_id]}}) for item_id in item_ids],
+                        ordered=False,
+                    )
+                except BulkWriteError as e:
+                    # Unordered: the other increments were applied, only the failed ones are retried
+                    failed = {item_ids[err["index"]] for err in e.details.get("writeErrors", [])}
+                    logger.error(f"View flush failed for {len(failed)} {content_type} items: {e}")
+                    for item_id in failed:
+                        self.record(content_type, item_id, counts.pop(item_id))
+                    if not counts:
+                        continue
+                except Exception as e:
+                    # What was applied is unknown: retrying could count views twice
+                    logger.error(f"View flush failed for {content_type}, {sum(counts.values())} views lost: {e}")
+                    continue
+                await stats.record_views(content_type, counts)
+                metrics.record("views", {"type": content_type}, count=sum(counts.values()))
+                await self._notify_watchers(content_type, collection, list(counts))
+
+    async def _notify_watchers(self, content_type: str, collection, item_ids):
+        watched = [i for i in item_ids if f"{content_type}:{i}" in manager.watchers]
+        if not watched:
+            return
+        async for doc in collection.find({"id": {"$in": watched}}, {"_id": 0, "id": 1, "views": 1}):
+            await manager.send_to_watchers(f"{content_type}:{doc['id']}", {
+                "type": "view_update", "content_type": content_type,
+                "id": doc["id"], "views": doc.get("views", 0),
+            })
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"View counter flush error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+view_counter = ViewCounter()
@@ -1,5 +1,14 @@
 import os
+import sys
+from pathlib import Path
 import pytest
+from mongomock.collection import Collection
+from mongomock_motor import AsyncMongoMockClient
+
+# Unit tests import the backend modules directly; config needs a database URL
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
 
 API_URL = os.environ.get("TEST_API_URL", "http://localhost:8001/api")
 TEST_ADMIN_EMAIL = os.environ.get("TEST_ADMIN_EMAIL")
@@ -16,3 +25,25 @@ def admin_credentials():
     if not TEST_ADMIN_EMAIL or not TEST_ADMIN_PASSWORD:
         pytest.skip("TEST_ADMIN_EMAIL and TEST_ADMIN_PASSWORD env vars required")
     return {"email": TEST_ADMIN_EMAIL, "password": TEST_ADMIN_PASSWORD}
+
+
+@pytest.fixture
+def mock_db(monkeypatch):
+    """In-memory database: `mock_db(module, ...)` points the modules' `db` at it."""
+    database = AsyncMongoMockClient()["test_database"]
+    find_and_modify = Collection._find_and_modify
+
+    def pinned_find_and_modify(self, query, projection=None, update=None, upsert=False, sort=None, *args, **kwargs):
+        # mongomock reads the updated document back with the caller's query when `_id`
+        # is projected out, which misses it once the update changed a queried field
+        found = self.find_one(query, projection={"_id": 1}, sort=sort)
+        query = {"_id": found["_id"]} if found else query
+        return find_and_modify(self, query, projection, update, upsert, sort, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "_find_and_modify", pinned_find_and_modify)
+
+    def use(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, "db", database)
+        return database
+    return use
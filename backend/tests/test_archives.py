@@ -0,0 +1,82 @@
+"""
+Unit tests for services/archives.py: ZIP archives streamed while their
+members are fetched.
+"""
+import asyncio
+import io
+import threading
+import time
+import zipfile
+from services import archives
+from services.archives import ArchiveMember, MISSING_FILES_NAME, stream_zip, unique_names
+
+
+def build(members) -> tuple:
+    async def run():
+        return [chunk async for chunk in stream_zip(members)]
+    chunks = asyncio.run(run())
+    return chunks, zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+
+def content(data: bytes, delay: float = 0):
+    def fetch(f):
+        time.sleep(delay)
+        f.write(data)
+    return fetch
+
+
+def test_unique_names():
+    assert unique_names(["a.pdf", "A.pdf", "a.pdf", "b/c", "", "notes"]) == [
+        "a.pdf", "A (2).pdf", "a (3).pdf", "b_c", "fichier", "notes",
+    ]
+
+
+def test_members_written_and_compressed_by_type():
+    text = b"bonjour " * 1000
+    _, archive = build([
+        ArchiveMember("notes.txt", content(text), "text/plain"),
+        ArchiveMember("photo.jpg", content(b"\xff\xd8" + bytes(500)), "image/jpeg"),
+    ])
+    assert archive.testzip() is None
+    assert archive.read("notes.txt") == text
+    assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert archive.getinfo("photo.jpg").compress_type == zipfile.ZIP_STORED
+
+
+def test_failed_member_listed():
+    def broken(f):
+        raise IOError("not found")
+
+    _, archive = build([
+        ArchiveMember("ok.txt", content(b"ok")),
+        ArchiveMember("missing.pdf", broken),
+    ])
+    assert sorted(archive.namelist()) == sorted(["ok.txt", MISSING_FILES_NAME])
+    assert "missing.pdf" in archive.read(MISSING_FILES_NAME).decode()
+
+
+def test_written_in_completion_order():
+    _, archive = build([
+        ArchiveMember("slow.txt", content(b"slow", delay=0.2)),
+        ArchiveMember("fast.txt", content(b"fast")),
+    ])
+    assert archive.namelist() == ["fast.txt", "slow.txt"]
+
+
+def test_fetch_concurrency_bounded(monkeypatch):
+    monkeypatch.setattr(archives, "FETCH_CONCURRENCY", 2)
+    lock, running, peak = threading.Lock(), [0], [0]
+
+    def tracked(f):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        f.write(b"x")
+        with lock:
+            running[0] -= 1
+
+    chunks, archive = build([ArchiveMember(f"{i}.txt", tracked) for i in range(8)])
+    assert len(archive.namelist()) == 8
+    assert peak[0] <= 2
+    assert len(chunks) > 1
@@ -0,0 +1,41 @@
+"""
+Unit tests for services/article_render.py: cached pages and remembered misses.
+"""
+import asyncio
+from services import article_render
+from services.article_render import ArticleRenderCache
+
+ARTICLE = {"id": "a1", "title": "Titre", "status": "published", "content": "<p>Corps</p>",
+           "updated_at": "2024-01-01T00:00:00+00:00"}
+
+
+def test_page_rendered_once(mock_db):
+    db = mock_db(article_render)
+    cache = ArticleRenderCache(site_url="https://example.org")
+
+    async def scenario():
+        await db.articles.insert_one(dict(ARTICLE))
+        return await cache.get("a1"), await cache.get("a1")
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert b"<p>Corps</p>" in first.body
+    assert cache.renders == 1 and cache.hits == 1
+
+
+def test_misses_do_not_evict_pages(mock_db):
+    db = mock_db(article_render)
+    cache = ArticleRenderCache(max_pages=2, max_misses=3, site_url="https://example.org")
+
+    async def scenario():
+        await db.articles.insert_one(dict(ARTICLE))
+        page = await cache.get("a1")
+        unknown = [await cache.get(f"missing{i}") for i in range(10)]
+        await db.articles.delete_one({"id": "a1"})  # still served from memory until revalidated
+        return page, unknown, await cache.get("a1"), await cache.get("missing9")
+
+    page, unknown, again, missing = asyncio.run(scenario())
+    assert unknown == [None] * 10 and missing is None
+    assert again is page
+    assert list(cache._misses) == ["missing7", "missing8", "missing9"]
+    assert cache.renders == 1
@@ -0,0 +1,148 @@
+"""
+Unit tests for services/autosave.py: coalesced draft writes and version
+conflicts.
+"""
+import asyncio
+import pytest
+from models.article import ArticleAutosave
+from services import autosave
+from services.autosave import AutosaveBuffer, AutosaveConflict, AutosavePending
+
+ARTICLE = {
+    "id": "a1", "author_id": "u1", "title": "Titre", "content": "", "status": "draft", "draft_version": 0,
+    "blocks": [
+        {"id": "b1", "type": "text", "data": {"content": "<p>Un</p>"}},
+        {"id": "b2", "type": "text", "data": {"content": "<p>Deux</p>"}},
+    ],
+}
+
+
+def patch(base_version: int, **changes) -> ArticleAutosave:
+    return ArticleAutosave(base_version=base_version, **changes)
+
+
+def text_block(block_id: str, text: str) -> dict:
+    return {"op": "set", "id": block_id, "block": {"id": block_id, "type": "text", "data": {"content": text}}}
+
+
+@pytest.fixture
+def db(mock_db):
+    database = mock_db(autosave)
+    asyncio.run(database.articles.insert_one(dict(ARTICLE, blocks=[dict(b) for b in ARTICLE["blocks"]])))
+    return database
+
+
+async def apply(buffer: AutosaveBuffer, change: ArticleAutosave):
+    return await buffer.apply(await buffer.get("a1"), change)
+
+
+class TestCoalescing:
+    def test_patches_written_once(self, db):
+        buffer = AutosaveBuffer(delay=60)
+
+        async def scenario():
+            for version, title in enumerate(["Un", "Deux", "Trois"]):
+                await apply(buffer, patch(version, title=title))
+            stored_before = await db.articles.find_one({"id": "a1"})
+            await buffer.flush("a1")
+            await buffer.flush("a1")  # nothing left to write
+            return stored_before, await db.articles.find_one({"id": "a1"})
+
+        before, after = asyncio.run(scenario())
+        assert before["title"] == "Titre"
+        assert after["title"] == "Trois" and after["draft_version"] == 3
+        assert after["content_hash"] is None
+        assert buffer.patches == 3 and buffer.writes == 1
+
+    def test_block_edit_and_reorder(self, db):
+        buffer = AutosaveBuffer(delay=60)
+
+        async def scenario():
+            await apply(buffer, patch(0, blocks=[text_block("b2", "<p>Deux bis</p><script>x</script>")]))
+            await buffer.flush("a1")
+            edited = await db.articles.find_one({"id": "a1"})
+            await apply(buffer, patch(1, blocks=[text_block("b3", "<p>Trois</p>"), {"op": "delete", "id": "b1"}],
+                                      order=["b3", "b2"]))
+            await buffer.flush("a1")
+            return edited, await db.articles.find_one({"id": "a1"})
+
+        edited, reordered = asyncio.run(scenario())
+        assert edited["blocks"][1]["data"]["content"].startswith("<p>Deux bis</p>")
+        assert "<script>" not in edited["blocks"][1]["data"]["content"]
+        assert edited["blocks"][0] == ARTICLE["blocks"][0]
+        assert [b["id"] for b in reordered["blocks"]] == ["b3", "b2"]
+        assert reordered["draft_version"] == 2
+
+
+class TestConflicts:
+    def test_stale_base_version(self, db):
+        buffer = AutosaveBuffer(delay=60)
+
+        async def scenario():
+            await apply(buffer, patch(0, title="Un"))
+            await apply(buffer, patch(0, title="Autre onglet"))
+
+        with pytest.raises(AutosaveConflict) as error:
+            asyncio.run(scenario())
+        assert error.value.version == 1
+
+    def test_saved_elsewhere_drops_draft(self, db):
+        buffer = AutosaveBuffer(delay=60)
+
+        async def scenario():
+            await apply(buffer, patch(0, title="Brouillon"))
+            # Full save from another process
+            await db.articles.update_one({"id": "a1"}, {"$set": {"title": "Enregistre", "draft_version": 5}})
+            await buffer.flush("a1")
+            stored = await db.articles.find_one({"id": "a1"})
+            try:
+                await apply(buffer, patch(1, title="Suite"))
+            except AutosaveConflict as e:
+                return stored, e.version
+
+        stored, version = asyncio.run(scenario())
+        assert stored["title"] == "Enregistre"
+        assert version == 5
+        assert buffer.conflicts == 2
+
+    def test_dropped_patches_reported(self, db, monkeypatch):
+        buffer = AutosaveBuffer(delay=60)
+        sent = []
+
+        async def send_to_user(user_id, data):
+            sent.append((user_id, data))
+
+        monkeypatch.setattr(autosave.manager, "send_to_user", send_to_user)
+
+        async def scenario():
+            for version in range(3):
+                await apply(buffer, patch(version, title=f"Brouillon {version}"))
+            # Full save from another process, ending at the same version number
+            await db.articles.update_one({"id": "a1"}, {"$set": {"title": "Enregistre", "draft_version": 3}})
+            await buffer.flush("a1")
+            try:
+                await apply(buffer, patch(3, title="Suite"))
+            except AutosaveConflict as e:
+                conflict = e
+            await apply(buffer, patch(3, title="Rebase"))  # after reloading, the editor can go on
+            return conflict
+
+        conflict = asyncio.run(scenario())
+        assert (conflict.version, conflict.lost) == (3, 3)
+        assert sent == [("u1", {"type": "autosave_conflict", "article_id": "a1", "lost_version": 3})]
+        assert buffer.drafts["a1"].version == 4
+
+    def test_patches_held_by_another_process_retry_later(self, db):
+        # This process never saw versions 1-3: another one still holds them
+        buffer = AutosaveBuffer(delay=10)
+
+        async def scenario():
+            started = asyncio.get_running_loop().time()
+            try:
+                await apply(buffer, patch(3, title="Suite"))
+            except AutosavePending as e:
+                return e.retry_after, asyncio.get_running_loop().time() - started
+
+        retry_after, elapsed = asyncio.run(scenario())
+        assert retry_after == 11
+        assert elapsed < 1
@@ -0,0 +1,45 @@
+"""
+Unit tests for services/bookmarks.py: toggling saved items.
+"""
+import asyncio
+from types import SimpleNamespace
+from pymongo.errors import DuplicateKeyError
+from services import bookmarks
+from services.bookmarks import toggle_bookmark
+
+
+def test_toggle_saves_then_removes(mock_db):
+    db = mock_db(bookmarks)
+
+    async def scenario():
+        await db.bookmarks.create_index([("user_id", 1), ("kind", 1), ("target_id", 1)], unique=True)
+        saved = await toggle_bookmark("u1", "article", "a1", {"title": "Titre"})
+        stored = await db.bookmarks.find_one({}, {"_id": 0})
+        removed = await toggle_bookmark("u1", "article", "a1", {"title": "Titre"})
+        return saved, stored, removed, await db.bookmarks.count_documents({})
+
+    saved, stored, removed, remaining = asyncio.run(scenario())
+    assert saved is True and stored["title"] == "Titre" and stored["target_id"] == "a1"
+    assert removed is False and remaining == 0
+
+
+def test_concurrent_save_kept(mock_db, monkeypatch):
+    db = mock_db(bookmarks)
+
+    class RacingCollection:
+        """The other request inserts the same bookmark between our lookup and our insert."""
+
+        def __getattr__(self, name):
+            return getattr(db.bookmarks, name)
+
+        async def update_one(self, *args, **kwargs):
+            await db.bookmarks.update_one(*args, **kwargs)
+            raise DuplicateKeyError("E11000 duplicate key error")
+
+    monkeypatch.setattr(bookmarks, "db", SimpleNamespace(bookmarks=RacingCollection()))
+
+    async def scenario():
+        saved = await toggle_bookmark("u1", "article", "a1", {"title": "Titre"})
+        return saved, await db.bookmarks.count_documents({})
+
+    assert asyncio.run(scenario()) == (True, 1)
@@ -0,0 +1,80 @@
+"""
+Unit tests for services/content_pipeline.py: derived fields and the
+content-hash skip.
+"""
+import asyncio
+from services import content_pipeline as pipeline_module
+from services.content_pipeline import ContentPipeline, content_hash, process
+
+BLOCKS = [
+    {"id": "b1", "type": "text", "data": {"content": "<p>Premier paragraphe <script>x()</script></p>"}},
+    {"id": "b2", "type": "image", "data": {"url": "/api/media/images/a.jpg", "caption": "Photo"}},
+    {"type": "text", "data": {"content": "sans id"}},
+]
+
+
+def save(pipeline: ContentPipeline, previous=None, title="Un titre", slug="", content="", blocks=BLOCKS):
+    return asyncio.run(pipeline.run(title, slug, content, blocks, previous))
+
+
+def test_process_derives_fields():
+    result = process("Visa pour la France", "", "", BLOCKS)
+    assert result["slug"] == "visa-pour-la-france"
+    assert [b["id"] for b in result["blocks"]] == ["b1", "b2"]
+    assert "<script>" not in result["blocks"][0]["data"]["content"]
+    assert result["excerpt"].startswith("Premier paragraphe")
+    assert result["first_image"] == "/api/media/images/a.jpg"
+    assert result["word_count"] > 0
+
+
+def test_excerpt_cut_on_a_word():
+    result = process("Titre", "", "<p>" + "mot " * 200 + "</p>", [])
+    assert len(result["excerpt"]) <= pipeline_module.EXCERPT_LENGTH + 1
+    assert result["excerpt"].endswith("mot…")
+
+
+def test_resaving_unchanged_article_skipped():
+    pipeline = ContentPipeline()
+    stored = save(pipeline)
+    # The editor loads the processed values and sends them back
+    again = save(pipeline, previous=stored, content=stored["content"], blocks=stored["blocks"], slug=stored["slug"])
+    assert again == {}
+    assert pipeline.processed == 1 and pipeline.skipped == 1
+
+
+def test_changed_content_processed():
+    pipeline = ContentPipeline()
+    stored = save(pipeline)
+    edited = [dict(stored["blocks"][0], data={"content": "<p>Autre texte</p>"}), stored["blocks"][1]]
+    result = save(pipeline, previous=stored, blocks=edited, slug=stored["slug"])
+    assert result["excerpt"] == "Autre texte"
+    assert result["content_hash"] != stored["content_hash"]
+    assert pipeline.processed == 2
+
+
+def test_same_input_memoized():
+    pipeline = ContentPipeline()
+    first = save(pipeline)
+    second = save(pipeline)
+    assert first == second and first is not second
+    assert pipeline.processed == 1
+
+
+def test_pipeline_version_in_hash(monkeypatch):
+    key = content_hash("Titre", "", "<p>a</p>", [])
+    monkeypatch.setattr(pipeline_module, "PIPELINE_VERSION", "next")
+    assert content_hash("Titre", "", "<p>a</p>", []) != key
+
+
+def test_large_content_processed_in_worker(monkeypatch):
+    monkeypatch.setattr(pipeline_module, "INLINE_MAX_CHARS", 0)
+    pipeline = ContentPipeline(workers=1)
+
+    async def scenario():
+        try:
+            return await pipeline.run("Titre", "", "<p>Texte <b>gras</b></p>", [])
+        finally:
+            await pipeline.stop()
+
+    result = asyncio.run(scenario())
+    assert result == process("Titre", "", "<p>Texte <b>gras</b></p>", []) | {"content_hash": result["content_hash"]}
@@ -0,0 +1,124 @@
+"""
+Unit tests for services/feeds.py and routes/feeds.py: feeds and sitemap
+files rendered from memory.
+"""
+import asyncio
+import gzip
+import xml.etree.ElementTree as ET
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from routes import feeds as feed_routes
+from services import feeds as feeds_module
+from services.feeds import Feeds
+
+SITE = "https://example.com"
+SITEMAP = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def article(aid: str, day: int, status: str = "published", category: str = "Sport", **extra) -> dict:
+    return {"id": aid, "title": f"Article {aid}", "status": status, "category": category,
+            "published_at": f"2024-05-{day:02d}T08:00:00+00:00", "updated_at": f"2024-05-{day:02d}T09:00:00+00:00",
+            **extra}
+
+
+def sitemap_urls(service: Feeds, name: str) -> set:
+    root = ET.fromstring(service.get(name).body)
+    return {loc.text for loc in root.iter(f"{SITEMAP}loc")}
+
+
+def request(headers: dict = None) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]})
+
+
+@pytest.fixture
+def service(mock_db, monkeypatch):
+    db = mock_db(feeds_module)
+    monkeypatch.setattr(feeds_module, "URLS_PER_FILE", 3)
+    asyncio.run(db.articles.insert_many(
+        [article(f"a{i}", i + 1) for i in range(7)] + [article("draft", 20, status="draft")]
+    ))
+    built = Feeds(site_url=SITE)
+
+    async def build():
+        await built.rebuild()
+        await built.render()
+
+    asyncio.run(build())
+    return built
+
+
+class TestSitemaps:
+    def test_documents_spread_over_files(self, service):
+        names = sorted(n for n in service.documents if n.startswith("sitemap-article-"))
+        assert names == ["sitemap-article-0.xml", "sitemap-article-1.xml", "sitemap-article-2.xml"]
+        urls = [url for name in names for url in sitemap_urls(service, name)]
+        assert sorted(urls) == sorted(f"{SITE}/article/a{i}" for i in range(7))
+        index = sitemap_urls(service, "sitemap.xml")
+        assert f"{SITE}/api/sitemaps/sitemap-article-1.xml" in index
+        assert f"{SITE}/api/sitemaps/sitemap-property-0.xml" in index
+
+    def test_write_renders_only_its_file(self, service):
+        before = {name: doc for name, doc in service.documents.items()}
+        renders = service.renders
+        service.put("article", article("a1", 2, title="Nouveau titre", updated_at="2024-06-01T00:00:00+00:00"))
+        asyncio.run(service.render())
+        changed = {n for n, doc in service.documents.items() if doc is not before.get(n)}
+        bucket = f"sitemap-article-{feeds_module._bucket('a1', 3)}.xml"
+        assert service.renders == renders + len(changed)
+        # The index is stored again only if a file's Last-Modified (to the second) moved
+        changed.discard("sitemap.xml")
+        assert changed == {bucket, "rss/all.xml", "atom/all.xml", "rss/sport.xml", "atom/sport.xml"}
+        assert "2024-06-01" in service.get(bucket).body.decode()
+
+    def test_unpublished_article_removed(self, service):
+        service.put("article", article("a3", 4, status="draft"))
+        asyncio.run(service.render())
+        urls = set().union(*(sitemap_urls(service, n) for n in service.documents if n.startswith("sitemap-article-")))
+        assert f"{SITE}/article/a3" not in urls
+        assert b"a3" not in service.get("rss/all.xml").body
+
+
+class TestFeeds:
+    def test_latest_first_and_escaped(self, service):
+        service.put("article", article("new", 30, title="Sport & <loisirs>"))
+        asyncio.run(service.render())
+        channel = ET.fromstring(service.get("rss/all.xml").body).find("channel")
+        titles = [item.findtext("title") for item in channel.iter("item")]
+        assert titles[0] == "Sport & <loisirs>"
+        assert titles[1:] == [f"Article a{i}" for i in range(6, -1, -1)]
+
+    def test_category_feed(self, service):
+        service.put("article", article("eco", 30, category="Économie"))
+        asyncio.run(service.render())
+        assert b"/article/eco" in service.get("rss/economie.xml").body
+        assert b"/article/eco" not in service.get("rss/sport.xml").body
+
+
+class TestRoutes:
+    def test_gzip_and_not_modified(self, service, monkeypatch):
+        monkeypatch.setattr(feed_routes, "feeds", service)
+        response = asyncio.run(feed_routes.get_rss_feed("all", request({"Accept-Encoding": "gzip"})))
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(response.body) == service.get("rss/all.xml").body
+        since = response.headers["last-modified"]
+        cached = asyncio.run(feed_routes.get_rss_feed("all", request({"If-Modified-Since": since})))
+        assert cached.status_code == 304
+
+    def test_unknown_feed(self, service, monkeypatch):
+        monkeypatch.setattr(feed_routes, "feeds", service)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(feed_routes.get_rss_feed("inconnu", request()))
+        assert error.value.status_code == 404
+
+    def test_site_url_required(self, mock_db, monkeypatch):
+        mock_db(feeds_module)
+        unconfigured = Feeds(site_url="")
+        unconfigured.put("article", article("a1", 1))
+        asyncio.run(unconfigured.render())
+        assert unconfigured.documents == {}
+        monkeypatch.setattr(feed_routes, "feeds", unconfigured)
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(feed_routes.get_sitemap_index(request({"Host": "evil.example"})))
+        assert error.value.status_code == 503
@@ -0,0 +1,153 @@
+"""
+Unit tests for fiche PDFs: the content-hash cache of services/pdf_cache.py and
+its use by routes/fiches.py, for single fiches and batch exports.
+"""
+import asyncio
+import io
+import os
+import zipfile
+import pytest
+from starlette.requests import Request
+from routes import fiches
+from services import pdf_cache
+from services.pdf_cache import content_hash
+
+FICHE = {"id": "f1", "title": "Visa etudiant", "country": "France", "steps": ["a", "b"],
+         "updated_at": "2024-01-01T00:00:00+00:00"}
+SETTINGS = {"company_name": "Matrix News", "primary_color": "#FF6600"}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "PDF_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(pdf_cache, "_writer", pdf_cache._Writer())
+    return tmp_path
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    rendered = []
+
+    async def render(fiche, settings, kind="fiche"):
+        rendered.append(fiche["id"])
+        return f"%PDF {fiche['id']}".encode()
+
+    monkeypatch.setattr(fiches.pdf_pool, "render", render)
+    return rendered
+
+
+class TestContentHash:
+    def test_bookkeeping_fields_ignored(self):
+        touched = {**FICHE, "_id": "x", "pdf_cache": "old", "updated_at": "2025-01-01", "created_by": "u2"}
+        assert content_hash(touched, SETTINGS) == content_hash(FICHE, SETTINGS)
+
+    def test_key_order_ignored(self):
+        reordered = dict(reversed(list(FICHE.items())))
+        assert content_hash(reordered, SETTINGS) == content_hash(FICHE, SETTINGS)
+
+    def test_content_settings_and_version_change_key(self, monkeypatch):
+        key = content_hash(FICHE, SETTINGS)
+        assert content_hash({**FICHE, "title": "Visa travail"}, SETTINGS) != key
+        assert content_hash(FICHE, {**SETTINGS, "company_name": "Autre"}) != key
+        monkeypatch.setattr(pdf_cache, "GENERATOR_VERSION", "next")
+        assert content_hash(FICHE, SETTINGS) != key
+
+
+class TestStore:
+    def test_round_trip(self, cache_dir):
+        assert pdf_cache.read("k1") is None
+        asyncio.run(pdf_cache.store("k1", b"%PDF"))
+        assert pdf_cache.read("k1") == b"%PDF"
+        assert [p.name for p in cache_dir.iterdir()] == ["k1.pdf"]
+
+    def test_prune_keeps_recent(self, cache_dir, monkeypatch):
+        monkeypatch.setattr(pdf_cache, "MAX_FILES", 3)
+        monkeypatch.setattr(pdf_cache, "PRUNE_EVERY", 5)
+
+        async def scenario():
+            for i in range(5):
+                await pdf_cache.store(f"k{i}", b"%PDF")
+                os.utime(cache_dir / f"k{i}.pdf", (1000 + i, 1000 + i))
+
+        asyncio.run(scenario())
+        assert sorted(p.name for p in cache_dir.iterdir()) == ["k2.pdf", "k3.pdf", "k4.pdf"]
+
+
+class TestRenderFichePdf:
+    def test_rendered_once_then_cached(self, mock_db, cache_dir, renders):
+        db = mock_db(fiches)
+
+        async def scenario():
+            await db[fiches.COLLECTION].insert_one(dict(FICHE))
+            first = await fiches.render_fiche_pdf(dict(FICHE), SETTINGS)
+            stored = await db[fiches.COLLECTION].find_one({"id": "f1"})
+            second = await fiches.render_fiche_pdf(stored, SETTINGS)
+            return first, second, stored
+
+        first, second, stored = asyncio.run(scenario())
+        assert first == second
+        assert renders == ["f1"]
+        assert stored["pdf_cache"] == first[0]
+
+    def test_concurrent_edit_not_marked_cached(self, mock_db, cache_dir, renders):
+        db = mock_db(fiches)
+
+        async def scenario():
+            await db[fiches.COLLECTION].insert_one({**FICHE, "updated_at": "2024-06-01T00:00:00+00:00"})
+            await fiches.render_fiche_pdf(dict(FICHE), SETTINGS)  # read before the edit
+            return await db[fiches.COLLECTION].find_one({"id": "f1"})
+
+        assert "pdf_cache" not in asyncio.run(scenario())
+
+
+class TestDownload:
+    def test_stale_key_after_settings_change_not_served(self, mock_db, cache_dir, renders):
+        db = mock_db(fiches)
+        old_key = content_hash(FICHE, SETTINGS)
+        new_settings = {**SETTINGS, "company_name": "Autre"}
+        request = Request({"type": "http", "method": "GET", "headers": [(b"if-none-match", f'"{old_key}"'.encode())]})
+
+        async def scenario():
+            # A render that raced the settings write stored the old key after the clear
+            await pdf_cache.store(old_key, b"%PDF old")
+            await db[fiches.COLLECTION].insert_one({**FICHE, "pdf_cache": old_key})
+            await db[fiches.SETTINGS_COLLECTION].insert_one({"id": fiches.SETTINGS_ID, **new_settings})
+            response = await fiches.download_fiche_pdf("f1", request, user={})
+            stored = await db[fiches.COLLECTION].find_one({"id": "f1"})
+            return response, stored
+
+        response, stored = asyncio.run(scenario())
+        new_key = content_hash(FICHE, {"id": fiches.SETTINGS_ID, **new_settings})
+        assert response.status_code == 200
+        assert response.body == b"%PDF f1"
+        assert response.headers["etag"] == f'"{new_key}"'
+        assert stored["pdf_cache"] == new_key
+
+
+class TestBatch:
+    def test_zip_members_written_as_rendered(self, monkeypatch):
+        monkeypatch.setattr(fiches.pdf_pool, "workers", 2)
+        running, peak = [0], [0]
+
+        async def render(fiche, settings_doc=None, kind="fiche"):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.001 * (int(fiche["id"][1:]) % 3))
+            running[0] -= 1
+            return "key", f"%PDF {fiche['id']}".encode()
+
+        monkeypatch.setattr(fiches, "render_fiche_pdf", render)
+        batch = [{**FICHE, "id": f"f{i}", "title": "Meme titre"} for i in range(12)]
+        progress = []
+
+        async def on_progress(done):
+            progress.append(done)
+
+        out = io.BytesIO()
+        asyncio.run(fiches._render_batch(batch, SETTINGS, "zip", out, on_progress))
+        archive = zipfile.ZipFile(out)
+        assert len(archive.namelist()) == 12
+        assert len(set(archive.namelist())) == 12
+        assert sorted(archive.read(n) for n in archive.namelist()) == sorted(f"%PDF f{i}".encode() for i in range(12))
+        assert peak[0] <= 4
+        assert progress == list(range(1, 13))
@@ -0,0 +1,194 @@
+"""
+Unit tests for services/jobs.py (claim, retry, cancellation, lease expiry,
+result retention) and the delete_user cascade of services/admin_jobs.py.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from services import jobs, admin_jobs, likes, bookmarks, stats as stats_module, unique_viewers
+from services.jobs import JobQueue, JobContext, HANDLERS
+
+
+@pytest.fixture
+def queue(mock_db, monkeypatch):
+    db = mock_db(jobs)
+    calls = []
+
+    async def succeed(ctx: JobContext):
+        calls.append(ctx.id)
+        await ctx.progress(1, 1, "ok")
+        return {"value": ctx.params.get("value")}
+
+    async def fail(ctx: JobContext):
+        calls.append(ctx.id)
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(HANDLERS, "test_succeed", {"run": succeed, "max_attempts": 3, "validate": None})
+    monkeypatch.setitem(HANDLERS, "test_fail", {"run": fail, "max_attempts": 2, "validate": None})
+    q = JobQueue(workers=1)
+    q.db, q.calls = db, calls
+    return q
+
+
+async def run_next(queue: JobQueue) -> dict:
+    job = await queue._claim()
+    assert job is not None
+    await queue._execute(job)
+    return await queue.db.jobs.find_one({"id": job["id"]}, {"_id": 0})
+
+
+def past(seconds: int = 1) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+class TestJobQueue:
+    def test_success_stores_result(self, queue):
+        async def scenario():
+            await queue.enqueue("test_succeed", {"value": 42})
+            return await run_next(queue), await queue._claim()
+
+        job, next_job = asyncio.run(scenario())
+        assert job["status"] == "succeeded"
+        assert job["result"] == {"value": 42}
+        assert job["attempts"] == 1 and job["lease_until"] is None
+        assert next_job is None
+
+    def test_failure_retried_with_backoff_then_failed(self, queue):
+        async def scenario():
+            enqueued = await queue.enqueue("test_fail")
+            first = await run_next(queue)
+            assert await queue._claim() is None  # not before run_after
+            await queue.db.jobs.update_one({"id": enqueued["id"]}, {"$set": {"run_after": past()}})
+            return first, await run_next(queue)
+
+        first, second = asyncio.run(scenario())
+        assert first["status"] == "queued" and first["error"] == "boom"
+        assert first["run_after"] > datetime.now(timezone.utc).isoformat()
+        assert second["status"] == "failed" and second["attempts"] == 2
+        assert len(queue.calls) == 2
+
+    def test_cancel_queued_job(self, queue):
+        async def scenario():
+            job = await queue.enqueue("test_succeed")
+            cancelled = await queue.cancel(job["id"])
+            return cancelled, await queue._claim()
+
+        cancelled, claimed = asyncio.run(scenario())
+        assert cancelled["status"] == "cancelled"
+        assert claimed is None
+        assert queue.calls == []
+
+    def test_cancel_running_job_stops_at_checkpoint(self, queue):
+        async def scenario():
+            job = await queue.enqueue("test_succeed")
+            claimed = await queue._claim()
+            requested = await queue.cancel(job["id"])
+            claimed["cancel_requested"] = requested["cancel_requested"]
+            await queue._execute(claimed)
+            return await queue.db.jobs.find_one({"id": job["id"]}, {"_id": 0})
+
+        job = asyncio.run(scenario())
+        assert job["status"] == "cancelled"
+        assert queue.calls == []
+
+    def test_expired_lease_is_claimed_again(self, queue):
+        async def scenario():
+            job = await queue.enqueue("test_succeed")
+            await queue._claim()
+            assert await queue._claim() is None  # lease still held
+            await queue.db.jobs.update_one({"id": job["id"]}, {"$set": {"lease_until": past()}})
+            other = JobQueue(workers=1)
+            return await other._claim(), other.worker_id
+
+        reclaimed, worker_id = asyncio.run(scenario())
+        assert reclaimed["worker"] == worker_id
+        assert reclaimed["attempts"] == 2
+
+    def test_abandoned_too_often_fails(self, queue):
+        async def scenario():
+            job = await queue.enqueue("test_succeed")
+            await queue.db.jobs.update_one({"id": job["id"]}, {"$set": {"attempts": 3}})
+            return await run_next(queue)
+
+        job = asyncio.run(scenario())
+        assert job["status"] == "failed"
+        assert queue.calls == []
+
+
+def test_sweep_results_keeps_recent_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "EXPORT_DIR", tmp_path)
+    old, recent = tmp_path / "old.csv", tmp_path / "recent.csv"
+    old.write_text("a")
+    recent.write_text("b")
+    two_days_ago = time.time() - 48 * 3600
+    os.utime(old, (two_days_ago, two_days_ago))
+    assert jobs.sweep_results(max_age_hours=24) == 1
+    assert not old.exists() and recent.exists()
+
+
+def test_delete_user_cascade(mock_db, monkeypatch):
+    db = mock_db(jobs, admin_jobs, likes, bookmarks, stats_module, unique_viewers)
+    invalidated = []
+
+    def recorder(name):
+        return lambda *args: invalidated.append((name, *args))
+
+    monkeypatch.setattr(admin_jobs.suggest_index, "remove", recorder("suggest"))
+    monkeypatch.setattr(admin_jobs.feeds, "remove", recorder("feeds"))
+    monkeypatch.setattr(admin_jobs.scheduled_publisher, "discard", recorder("scheduler"))
+    monkeypatch.setattr(admin_jobs.article_render, "invalidate", recorder("render"))
+    monkeypatch.setattr(admin_jobs.search_cache, "invalidate", recorder("search"))
+
+    async def scenario():
+        await db.articles.insert_many([
+            {"id": "gone", "author_id": "u1", "likes_count": 1},
+            {"id": "kept", "author_id": "u2", "likes_count": 2},
+        ])
+        await db.likes.insert_many([
+            {"user_id": "u1", "target_type": "article", "target_id": "kept"},
+            {"user_id": "u2", "target_type": "article", "target_id": "kept"},
+            {"user_id": "u2", "target_type": "article", "target_id": "gone"},
+        ])
+        await db.bookmarks.insert_many([
+            {"user_id": "u1", "kind": "article", "target_id": "kept"},
+            {"user_id": "u2", "kind": "article", "target_id": "gone"},
+            {"user_id": "u2", "kind": "article", "target_id": "kept"},
+        ])
+        ctx = JobContext({"id": "j1", "params": {"user_id": "u1"}})
+        await db.jobs.insert_one({"id": "j1"})
+        result = await admin_jobs.delete_user_data(ctx)
+        remaining_likes = await db.likes.find({}, {"_id": 0}).to_list(None)
+        remaining_bookmarks = await db.bookmarks.find({}, {"_id": 0}).to_list(None)
+        kept = await db.articles.find_one({"id": "kept"})
+        return result, remaining_likes, remaining_bookmarks, kept, await db.articles.count_documents({})
+
+    result, remaining_likes, remaining_bookmarks, kept, articles = asyncio.run(scenario())
+    assert result["deleted"]["articles"] == 1
+    assert articles == 1
+    assert kept["likes_count"] == 1
+    assert remaining_likes == [{"user_id": "u2", "target_type": "article", "target_id": "kept"}]
+    assert remaining_bookmarks == [{"user_id": "u2", "kind": "article", "target_id": "kept"}]
+    assert sorted(invalidated) == [
+        ("feeds", "article", "gone"), ("render", "gone"), ("scheduler", "gone"),
+        ("search", "article"), ("suggest", "article", "gone"),
+    ]
+
+
+def test_deleted_likes_clamp_drifted_counter(mock_db):
+    db = mock_db(likes, stats_module, unique_viewers)
+
+    async def scenario():
+        # The counter says 1 but two of the deleted users liked the article
+        await db.articles.insert_one({"id": "a1", "author_id": "u9", "likes_count": 1})
+        await db.likes.insert_many([
+            {"user_id": "u1", "target_type": "article", "target_id": "a1"},
+            {"user_id": "u2", "target_type": "article", "target_id": "a1"},
+        ])
+        deleted = await likes.delete_user_likes(["u1", "u2"])
+        return deleted, await db.articles.find_one({"id": "a1"})
+
+    deleted, article = asyncio.run(scenario())
+    assert deleted == 2
+    assert article["likes_count"] == 0
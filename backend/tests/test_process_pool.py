@@ -0,0 +1,45 @@
+"""
+Unit tests for services/process_pool.py: rebuilding a broken worker pool.
+"""
+import asyncio
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from services import process_pool
+
+
+class FakeExecutor:
+    created = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None):
+        self.broken = not FakeExecutor.created  # the first pool has a dead worker
+        self.shut_down = False
+        FakeExecutor.created.append(self)
+
+    def submit(self, func, *args):
+        future = Future()
+        if self.broken:
+            future.set_exception(BrokenProcessPool("worker died"))
+        elif self.shut_down:
+            future.set_exception(RuntimeError("cannot schedule new futures after shutdown"))
+        else:
+            future.set_result(func(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_concurrent_failures_rebuild_once(monkeypatch):
+    monkeypatch.setattr(process_pool, "ProcessPoolExecutor", FakeExecutor)
+    FakeExecutor.created = []
+    pool = process_pool.ProcessPool("Test")
+    pool.start(2)
+
+    async def scenario():
+        return await asyncio.gather(*(pool.run(pow, 2, i) for i in range(4)))
+
+    assert asyncio.run(scenario()) == [1, 2, 4, 8]
+    broken, rebuilt = FakeExecutor.created
+    assert broken.shut_down
+    assert not rebuilt.shut_down
+    assert pool._executor is rebuilt
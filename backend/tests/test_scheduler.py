@@ -0,0 +1,107 @@
+"""
+Unit tests for services/scheduler.py: conditional publication of scheduled
+articles and the publisher lease.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from services import leases, scheduler, stats as stats_module, unique_viewers
+from services.scheduler import ScheduledPublisher
+
+
+def at(minutes: float) -> str:
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutes)).isoformat()
+
+
+def scheduled(aid: str, minutes: float) -> dict:
+    return {"id": aid, "title": aid, "status": "scheduled", "scheduled_at": at(minutes),
+            "author_id": "u1", "category": "Sport"}
+
+
+@pytest.fixture
+def db(mock_db, monkeypatch):
+    async def broadcast(message):
+        pass
+
+    monkeypatch.setattr(scheduler.manager, "broadcast_all", broadcast)
+    monkeypatch.setattr(scheduler.suggest_index, "put", lambda kind, doc: None)
+    return mock_db(scheduler, leases, stats_module, unique_viewers)
+
+
+class TestPublication:
+    def test_only_due_articles_published(self, db):
+        publisher = ScheduledPublisher()
+
+        async def scenario():
+            await db.articles.insert_many([scheduled("due", -1), scheduled("later", 60)])
+            await publisher.reload()
+            await publisher.publish_due()
+            return {a["id"]: a async for a in db.articles.find({}, {"_id": 0})}
+
+        articles = asyncio.run(scenario())
+        assert articles["due"]["status"] == "published"
+        assert articles["due"]["published_at"]
+        assert articles["later"]["status"] == "scheduled"
+        assert publisher.published == 1
+        assert publisher.next_due() is not None
+
+    def test_rescheduled_or_unscheduled_meanwhile_not_published(self, db):
+        publisher = ScheduledPublisher()
+
+        async def scenario():
+            await db.articles.insert_many([scheduled("moved", -1), scheduled("draft", -1)])
+            await publisher.reload()
+            # Edited by another process after this one loaded its schedule
+            await db.articles.update_one({"id": "moved"}, {"$set": {"scheduled_at": at(30)}})
+            await db.articles.update_one({"id": "draft"}, {"$set": {"status": "draft"}})
+            await publisher.publish_due()
+            return {a["id"]: a["status"] async for a in db.articles.find({}, {"_id": 0})}
+
+        assert asyncio.run(scenario()) == {"moved": "scheduled", "draft": "draft"}
+        assert publisher.published == 0
+
+    def test_published_once_by_two_publishers(self, db):
+        first, second = ScheduledPublisher(), ScheduledPublisher()
+
+        async def scenario():
+            await db.articles.insert_one(scheduled("a1", -1))
+            await first.reload()
+            await second.reload()
+            await asyncio.gather(first.publish_due(), second.publish_due())
+
+        asyncio.run(scenario())
+        assert first.published + second.published == 1
+
+
+class TestSchedule:
+    def test_track_reschedule_and_discard(self):
+        publisher = ScheduledPublisher()
+        article = scheduled("a1", 10)
+        publisher.track(article)
+        later = {**article, "scheduled_at": at(20)}
+        publisher.track(later)
+        assert publisher.next_due().isoformat() == later["scheduled_at"]
+        publisher.track({**later, "status": "published"})
+        assert publisher.next_due() is None
+        publisher.track(article)
+        publisher.discard("a1")
+        assert publisher.next_due() is None
+
+    def test_invalid_date_ignored(self):
+        publisher = ScheduledPublisher()
+        publisher.track({**scheduled("a1", 0), "scheduled_at": "demain"})
+        assert publisher.next_due() is None
+
+
+class TestLease:
+    def test_one_holder_until_expiry(self, db):
+        first, second = ScheduledPublisher(), ScheduledPublisher()
+
+        async def scenario():
+            await db.leases.create_index("key", unique=True)
+            results = [await first._acquire_lease(), await second._acquire_lease(), await first._acquire_lease()]
+            await first._release_lease()
+            results.append(await second._acquire_lease())
+            return results
+
+        assert asyncio.run(scenario()) == [True, False, True, True]
@@ -0,0 +1,79 @@
+"""
+Unit tests for services/search.py: the tagged search result cache.
+"""
+import asyncio
+from types import SimpleNamespace
+from services import search
+from services.search import SearchCache
+
+
+class Computations:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, value="result", during=None):
+        async def compute():
+            self.calls += 1
+            if during:
+                during()
+            return value
+        return compute
+
+
+def lookup(cache, compute, q="visa", tags=("article",), filters=None, scope="articles"):
+    return asyncio.run(cache.get_or_compute(scope, list(tags), q, filters, compute))
+
+
+def test_key_normalized():
+    key = SearchCache.key("articles", "  Visa   Étudiant! ", {"category": "", "page": 1, "city": None})
+    assert key == SearchCache.key("articles", "visa etudiant", {"page": "1"})
+    assert key != SearchCache.key("articles", "visa etudiant", {"page": 2})
+
+
+def test_hit_after_miss():
+    cache, compute = SearchCache(), Computations()
+    assert lookup(cache, compute()) == "result"
+    assert lookup(cache, compute()) == "result"
+    assert compute.calls == 1
+    assert cache.snapshot()["scopes"]["articles"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_invalidation_drops_tagged_entries_only():
+    cache, compute = SearchCache(), Computations()
+    lookup(cache, compute(), q="visa", tags=("article",))
+    lookup(cache, compute(), q="villa", tags=("property",), scope="properties")
+    lookup(cache, compute(), q="kipe", tags=("article", "property"), scope="global")
+    cache.invalidate("article")
+    assert cache.get(SearchCache.key("articles", "visa")) is None
+    assert cache.get(SearchCache.key("global", "kipe")) is None
+    assert cache.get(SearchCache.key("properties", "villa")) == "result"
+
+
+def test_write_during_compute_not_served():
+    cache, compute = SearchCache(), Computations()
+    lookup(cache, compute("stale", during=lambda: cache.invalidate("article")))
+    assert lookup(cache, compute("fresh")) == "fresh"
+    assert compute.calls == 2
+
+
+def test_expired_entries_recomputed(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(search, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    cache, compute = SearchCache(ttl=60), Computations()
+    lookup(cache, compute())
+    clock[0] += 59
+    lookup(cache, compute())
+    clock[0] += 2
+    lookup(cache, compute())
+    assert compute.calls == 2
+
+
+def test_least_recently_used_evicted():
+    cache, compute = SearchCache(max_entries=2), Computations()
+    lookup(cache, compute(), q="a")
+    lookup(cache, compute(), q="b")
+    lookup(cache, compute(), q="a")
+    lookup(cache, compute(), q="c")
+    assert cache.get(SearchCache.key("articles", "b")) is None
+    assert cache.get(SearchCache.key("articles", "a")) == "result"
+    assert cache.snapshot()["entries"] == 2
@@ -0,0 +1,91 @@
+"""
+Unit tests for services/stats.py: incremental counters from (before, after)
+pairs must end where a full recomputation does.
+"""
+import asyncio
+from services import leases, stats as stats_module, unique_viewers
+from services.stats import StatsService, GLOBAL_KEY, author_key
+
+COUNTER_FIELDS = ("articles", "articles_published", "articles_draft", "articles_scheduled",
+                  "article_views", "article_likes")
+
+
+def article(aid: str, status: str, author: str = "u1", views: int = 0, likes: int = 0) -> dict:
+    return {"id": aid, "author_id": author, "status": status, "views": views, "likes_count": likes}
+
+
+def counters(doc: dict) -> dict:
+    return {field: doc.get(field, 0) for field in COUNTER_FIELDS}
+
+
+class TestTrackMany:
+    def test_batch_matches_recomputation(self, mock_db):
+        db = mock_db(stats_module, unique_viewers)
+        service = StatsService()
+
+        async def scenario():
+            originals = [article("a1", "draft", views=5), article("a2", "draft", likes=2),
+                         article("a3", "published", views=7), article("a4", "scheduled")]
+            await db.articles.insert_many([dict(a) for a in originals])
+            await service.refresh(author_key("u1"))
+            await service.refresh(GLOBAL_KEY)
+
+            # Publish a1 and a2, delete a3, create a5
+            changes = []
+            for before in originals[:2]:
+                after = {**before, "status": "published"}
+                await db.articles.replace_one({"id": before["id"]}, after)
+                changes.append((before, after))
+            await db.articles.delete_one({"id": "a3"})
+            changes.append((originals[2], None))
+            created = article("a5", "draft", views=1)
+            await db.articles.insert_one(dict(created))
+            changes.append((None, created))
+            await service.track_many("article", changes)
+
+            tracked = await service.get(author_key("u1"))
+            tracked_global = await service.get(GLOBAL_KEY)
+            return tracked, tracked_global, await service.refresh(author_key("u1"))
+
+        tracked, tracked_global, computed = asyncio.run(scenario())
+        assert counters(tracked) == counters(computed)
+        assert tracked["articles_published"] == 2 and tracked["articles_draft"] == 1
+        assert tracked_global["articles"] == 4
+
+    def test_unchanged_documents_write_nothing(self, mock_db):
+        db = mock_db(stats_module, unique_viewers)
+        service = StatsService()
+
+        async def scenario():
+            await db.stats.insert_one({"key": author_key("u1"), "articles": 1, "updated_at": "t0"})
+            doc = article("a1", "draft")
+            await service.track_many("article", [(doc, dict(doc))])
+            return await db.stats.find_one({"key": author_key("u1")})
+
+        assert asyncio.run(scenario())["updated_at"] == "t0"
+
+    def test_missing_scope_not_created(self, mock_db):
+        db = mock_db(stats_module, unique_viewers)
+
+        async def scenario():
+            await StatsService().track_many("article", [(None, article("a1", "published", author="u9"))])
+            return await db.stats.count_documents({})
+
+        assert asyncio.run(scenario()) == 0
+
+
+class TestReconcile:
+    def test_one_process_reconciles(self, mock_db):
+        db = mock_db(leases, stats_module, unique_viewers)
+        first, second = StatsService(), StatsService()
+
+        async def scenario():
+            await db.leases.create_index("key", unique=True)
+            await db.articles.insert_one(article("a1", "published", views=3))
+            ran = [await first.reconcile_if_leader(), await second.reconcile_if_leader(),
+                   await first.reconcile_if_leader()]
+            return ran, await db.stats.find_one({"key": author_key("u1")})
+
+        ran, reconciled = asyncio.run(scenario())
+        assert ran == [True, False, True]
+        assert reconciled["article_views"] == 3
@@ -0,0 +1,100 @@
+"""
+Unit tests for services/suggest.py: prefix lookups and the writes replayed
+over a rebuild.
+"""
+import asyncio
+import pytest
+from services import suggest
+from services.suggest import SuggestIndex
+
+
+def article(aid: str, title: str, status: str = "published", **extra) -> dict:
+    return {"id": aid, "title": title, "status": status, **extra}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(suggest, "_location_entries", lambda: [])
+    return SuggestIndex()
+
+
+def ids(results) -> list:
+    return [r["id"] for r in results]
+
+
+class TestLookup:
+    def test_prefix_of_any_word_or_tag(self, index):
+        index.put("article", article("a1", "Visa pour la France", tags=["Etudiants"], slug="visa-france"))
+        assert ids(index.suggest("vis")) == ["a1"]
+        assert ids(index.suggest("FRAN")) == ["a1"]
+        assert ids(index.suggest("étud")) == ["a1"]
+        assert index.suggest("visa")[0]["slug"] == "visa-france"
+        assert index.suggest("canada") == []
+
+    def test_label_start_ranked_first(self, index):
+        index.put("article", article("a1", "Demande de visa"))
+        index.put("article", article("a2", "Visa etudiant"))
+        assert ids(index.suggest("visa")) == ["a2", "a1"]
+
+    def test_unpublished_and_removed_not_suggested(self, index):
+        index.put("article", article("a1", "Visa"))
+        index.put("article", article("a1", "Visa", status="draft"))
+        index.put("article", article("a2", "Visa canada"))
+        index.remove("article", "a2")
+        assert index.suggest("visa") == []
+        assert index.keys == []
+
+    def test_limit(self, index):
+        for i in range(10):
+            index.put("property", {"id": f"p{i}", "title": f"Villa {i}"})
+        assert len(index.suggest("villa", limit=3)) == 3
+
+
+class TestRebuild:
+    def test_loads_published_documents(self, index, mock_db):
+        db = mock_db(suggest)
+
+        async def scenario():
+            await db.articles.insert_many([article("a1", "Visa"), article("a2", "Visa brouillon", status="draft")])
+            await db.procedures.insert_one({"id": "pr1", "title": "Passeport", "status": "published",
+                                            "keywords": ["visa"]})
+            await index.rebuild()
+
+        asyncio.run(scenario())
+        assert sorted(ids(index.suggest("visa"))) == ["a1", "pr1"]
+
+    def test_writes_during_rebuild_replayed(self, index, mock_db, monkeypatch):
+        db = mock_db(suggest)
+        gate = asyncio.Event()
+
+        class SlowCollection:
+            def __init__(self, collection):
+                self.collection = collection
+
+            def find(self, query, projection):
+                async def documents():
+                    # The snapshot is read before the writes, handed out after them
+                    docs = await self.collection.find(query, projection).to_list(None)
+                    await gate.wait()
+                    for doc in docs:
+                        yield doc
+                return documents()
+
+        class SlowDb:
+            def __getitem__(self, name):
+                return SlowCollection(db[name])
+
+        async def scenario():
+            await db.articles.insert_many([article("a1", "Visa France"), article("a2", "Visa Canada")])
+            monkeypatch.setattr(suggest, "db", SlowDb())
+            rebuild = asyncio.create_task(index.rebuild())
+            await asyncio.sleep(0.01)
+            index.remove("article", "a1")
+            index.put("article", article("a2", "Visa Canada", status="draft"))
+            index.put("article", article("a3", "Visa Japon"))
+            gate.set()
+            await rebuild
+
+        asyncio.run(scenario())
+        assert ids(index.suggest("visa")) == ["a3"]
+        assert index._replay is None
@@ -0,0 +1,136 @@
+"""
+Unit tests for services/unique_viewers.py: HyperLogLog sketches, visitor
+fingerprints and the compare-and-swap flush.
+"""
+import asyncio
+from starlette.requests import Request
+from services import unique_viewers
+from services.unique_viewers import HyperLogLog, UniqueViewers, visitor_fingerprint
+
+
+def sketch_of(prefix: str, n: int) -> HyperLogLog:
+    sketch = HyperLogLog()
+    for i in range(n):
+        sketch.add(f"{prefix}{i}")
+    return sketch
+
+
+def request_with(headers: dict, client=("10.0.0.1", 1234)) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/", "query_string": b"", "client": client,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+class TestHyperLogLog:
+    def test_estimate_within_error(self):
+        for n in (100, 5000, 50000):
+            estimate = sketch_of("v", n).count()
+            assert abs(estimate - n) / n < 0.05, (n, estimate)
+
+    def test_duplicates_not_counted(self):
+        sketch = HyperLogLog()
+        for _ in range(3):
+            for i in range(1000):
+                sketch.add(f"v{i}")
+        assert sketch.count() == sketch_of("v", 1000).count()
+
+    def test_merge_is_union(self):
+        a, b = sketch_of("v", 3000), sketch_of("v", 3000)
+        for i in range(3000, 6000):
+            b.add(f"v{i}")
+        a.merge(b)
+        assert a.registers == b.registers
+        assert abs(a.count() - 6000) / 6000 < 0.05
+
+    def test_covers(self):
+        small, large = sketch_of("v", 100), sketch_of("v", 1000)
+        assert large.covers(small)
+        assert not small.covers(large)
+        assert HyperLogLog(large.registers).covers(large)
+
+
+class TestFingerprint:
+    def test_last_forwarded_hop(self):
+        request = request_with({"X-Forwarded-For": "1.1.1.1, 2.2.2.2", "User-Agent": "ua"})
+        assert visitor_fingerprint(request) == "a:2.2.2.2|ua"
+
+    def test_client_cannot_pick_its_address(self):
+        first = request_with({"X-Forwarded-For": "1.1.1.1, 9.9.9.9"})
+        second = request_with({"X-Forwarded-For": "5.5.5.5, 9.9.9.9"})
+        assert visitor_fingerprint(first) == visitor_fingerprint(second)
+
+    def test_without_proxy(self):
+        assert visitor_fingerprint(request_with({"User-Agent": "ua"})) == "a:10.0.0.1|ua"
+
+
+class TestFlush:
+    def test_merges_with_stored_sketch(self, mock_db):
+        db = mock_db(unique_viewers)
+
+        async def scenario():
+            await db.articles.insert_one({"id": "a1"})
+            viewers = UniqueViewers()
+            for i in range(300):
+                viewers.add("article", "a1", f"first{i}")
+            await viewers.flush()
+            for i in range(300):
+                viewers.add("article", "a1", f"second{i}")
+            await viewers.flush()
+            return await db.view_sketches.find_one({"key": "article:a1"}), await db.articles.find_one({"id": "a1"})
+
+        sketch, article = asyncio.run(scenario())
+        assert sketch["version"] == 2
+        assert abs(sketch["unique_views"] - 600) < 30
+        assert article["unique_views"] == sketch["unique_views"]
+
+    def test_concurrent_write_is_merged_not_overwritten(self, mock_db, monkeypatch):
+        db = mock_db(unique_viewers)
+        other = sketch_of("other", 500)
+        load = unique_viewers._load_versioned
+        calls = []
+
+        async def racing_load(content_type, item_ids):
+            stored = await load(content_type, item_ids)
+            if not calls:
+                # Another process flushes between our read and our write
+                await db.view_sketches.update_one(
+                    {"key": "article:a1"}, {"$set": {"registers": bytes(other.registers), "version": 1}},
+                )
+            calls.append(1)
+            return stored
+
+        monkeypatch.setattr(unique_viewers, "_load_versioned", racing_load)
+
+        async def scenario():
+            await db.view_sketches.create_index([("key", 1)], unique=True)
+            await db.articles.insert_one({"id": "a1"})
+            await db.view_sketches.insert_one({"key": "article:a1", "item_id": "a1",
+                                               "registers": bytes(HyperLogLog().registers)})
+            viewers = UniqueViewers()
+            for i in range(300):
+                viewers.add("article", "a1", f"mine{i}")
+            await viewers.flush()
+            return await db.view_sketches.find_one({"key": "article:a1"}), viewers.pending
+
+        stored, pending = asyncio.run(scenario())
+        assert HyperLogLog(stored["registers"]).covers(other)
+        assert abs(stored["unique_views"] - 800) < 40
+        assert stored["version"] == 2
+        assert pending == {}
+
+    def test_unknown_items_not_stored(self, mock_db):
+        db = mock_db(unique_viewers)
+
+        async def scenario():
+            await db.articles.insert_one({"id": "a1"})
+            viewers = UniqueViewers()
+            viewers.add("article", "a1", "v1")
+            for i in range(50):
+                viewers.add("article", f"random{i}", "v1")
+            await viewers.flush()
+            return [d["item_id"] async for d in db.view_sketches.find({})], viewers.pending
+
+        stored, pending = asyncio.run(scenario())
+        assert stored == ["a1"]
+        assert pending == {}
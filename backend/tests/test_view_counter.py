@@ -0,0 +1,62 @@
+"""
+Unit tests for services/view_counter.py: buffered view counts.
+"""
+import asyncio
+import pytest
+from pymongo.errors import BulkWriteError
+from services import view_counter as view_counter_module, stats as stats_module, unique_viewers
+from services.view_counter import ViewCounter
+
+
+@pytest.fixture
+def db(mock_db):
+    database = mock_db(view_counter_module, stats_module, unique_viewers)
+    asyncio.run(database.articles.insert_many([{"id": "a1", "views": 0}, {"id": "a2", "views": 0}]))
+    return database
+
+
+def views(db) -> dict:
+    async def read():
+        return {d["id"]: d["views"] async for d in db.articles.find({})}
+    return asyncio.run(read())
+
+
+def test_counts_coalesced(db):
+    counter = ViewCounter()
+    for _ in range(3):
+        counter.record("article", "a1")
+    counter.record("article", "a2", count=2)
+    assert counter.pending_for("article", "a1") == 3
+    asyncio.run(counter.flush())
+    assert views(db) == {"a1": 3, "a2": 2}
+    assert counter.pending_for("article", "a1") == 0
+
+
+def test_partial_failure_retries_failed_items_only(db, monkeypatch):
+    counter = ViewCounter()
+
+    class PartlyFailing:
+        """Applies every increment but the one for a2, like an unordered bulk write."""
+
+        def __getattr__(self, name):
+            return getattr(db.articles, name)
+
+        async def bulk_write(self, ops, ordered=True):
+            errors = []
+            for index, op in enumerate(ops):
+                if op._filter["id"] == "a2":
+                    errors.append({"index": index, "code": 2, "errmsg": "failed"})
+                else:
+                    await db.articles.bulk_write([op])
+            raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+
+    monkeypatch.setattr(view_counter_module, "db", {"articles": PartlyFailing()})
+    counter.record("article", "a1", count=2)
+    counter.record("article", "a2", count=5)
+    asyncio.run(counter.flush())
+    assert views(db) == {"a1": 2, "a2": 0}
+    assert dict(counter.pending["article"]) == {"a2": 5}
+
+    monkeypatch.setattr(view_counter_module, "db", db)
+    asyncio.run(counter.flush())
+    assert views(db) == {"a1": 2, "a2": 5}
@@ -1,5 +1,7 @@
 import html
+import math
 import re
+import unicodedata
 import bleach
 from typing import Optional
 
@@ -44,3 +46,66 @@ def sanitize_url(url: Optional[str]) -> Optional[str]:
     if not re.match(r'^https?://', url) and not url.startswith('/api/media/'):
         return None
     return url
+
+
+def sanitize_block(block: dict) -> dict:
+    """Clean one editor block: the rich text of a text block keeps the allowed
+    HTML, `url` values must pass sanitize_url, every other string loses its tags."""
+    def clean(key, value):
+        if isinstance(value, str):
+            return (sanitize_url(value) or "") if key == "url" else sanitize(value)
+        if isinstance(value, list):
+            return [clean(key, v) for v in value]
+        if isinstance(value, dict):
+            return {k: clean(k, v) for k, v in value.items()}
+        return value
+
+    data = dict(block.get("data") or {})
+    content = data.pop("content", None)
+    data = clean("", data)
+    if content is not None:
+        data["content"] = sanitize_html(content) if block.get("type") == "text" else sanitize(content)
+    return {"id": str(block["id"]), "type": str(block.get("type", "")), "data": data}
+
+
+def compute_word_count(content, blocks):
+    text = ""
+    if blocks:
+        for b in blocks:
+            d = b if isinstance(b, dict) else b.dict()
+            t = d.get("type", "")
+            data = d.get("data", {})
+            if t == "text":
+                text += " " + re.sub(r'<[^>]*>', '', data.get("content", ""))
+            elif t == "quote":
+                text += " " + data.get("text", "")
+            elif t == "alert":
+                text += " " + data.get("content", "")
+            elif t == "image":
+                text += " " + data.get("caption", "")
+    elif content:
+        text = re.sub(r'<[^>]*>', '', content)
+    words = len(text.split())
+    return words, max(1, math.ceil(words / 200))
+
+
+def fold_text(text: Optional[str]) -> str:
+    """Accent-fold, lower-case and collapse punctuation/whitespace ("Kipé" -> "kipe")."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"[\W_]+", " ", stripped.lower()).strip()
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Whether an If-None-Match header names `etag` (weak and "-gzip" variants included)."""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag.strip('"').removesuffix("-gzip") == etag:
+            return True
+    return False
@@ -5,6 +5,7 @@ import { stripToPlainText } from "../lib/contentRenderer";
 import { getCategoryColor, slugify } from "../lib/categories";
 import { useAuth } from "../context/AuthContext";
 import api from "../lib/api";
+import { fetchItemStatus } from "../lib/itemStatus";
 import { toast } from "sonner";
 import LikeButton from "./LikeButton";
 
@@ -16,15 +17,14 @@ function formatDate(isoString) {
 export default function ArticleCard({ article, featured = false }) {
   const { isAuthenticated } = useAuth();
   const catColor = getCategoryColor(article.category);
-  const excerpt = stripToPlainText(article.content);
+  const excerpt = article.excerpt || stripToPlainText(article.content);
+  const imageUrl = article.image_url || article.first_image;
   const [isSaved, setIsSaved] = useState(false);
   const [savingLoading, setSavingLoading] = useState(false);
 
   useEffect(() => {
     if (!isAuthenticated) return;
-    api.get(`/saved-articles/${article.id}/status`)
-      .then((r) => setIsSaved(r.data.is_saved))
-      .catch(() => {});
+    fetchItemStatus("article", article.id).then((status) => setIsSaved(status.saved));
   }, [article.id, isAuthenticated]);
 
   const toggleSave = async (e) => {
@@ -67,10 +67,10 @@ export default function ArticleCard({ article, featured = false }) {
       )}
 
       {/* Image */}
-      {article.image_url && (
+      {imageUrl && (
         <div className={`overflow-hidden flex-shrink-0 ${featured ? "md:w-2/5 h-44 sm:h-56 md:h-auto" : "h-36 sm:h-48"}`}>
           <img
-            src={article.image_url}
+            src={imageUrl}
             alt={article.title}
             loading="lazy"
             className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500"
@@ -116,7 +116,6 @@ export default function ArticleCard({ article, featured = false }) {
             type="article"
             id={article.id}
             initialCount={article.likes_count || 0}
-            initialLikedBy={article.liked_by || []}
           />
           <Link
             to={`/article/${article.id}`}
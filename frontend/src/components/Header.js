@@ -174,6 +174,7 @@ export default function Header() {
   const [searchQuery, setSearchQuery] = useState("");
   const [searchResults, setSearchResults] = useState(null);
   const [searchLoading, setSearchLoading] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
   const [searchOpen, setSearchOpen] = useState(false);
   const [dropdownOpen, setDropdownOpen] = useState(false);
   const [mobileSearchOpen, setMobileSearchOpen] = useState(false);
@@ -181,6 +182,7 @@ export default function Header() {
   const dropdownRef = useRef(null);
   const searchRef = useRef(null);
   const searchTimerRef = useRef(null);
+  const suggestTimerRef = useRef(null);
   const bg = getAvatarBg(user?.username);
 
   // Fetch pending notification count for admin
@@ -248,10 +250,37 @@ export default function Header() {
       .finally(() => setSearchLoading(false));
   }, []);
 
+  // Typeahead from the in-memory prefix index; the full search waits for a pause
+  const doSuggest = useCallback((q) => {
+    if (!q.trim()) {
+      setSuggestions([]);
+      return;
+    }
+    setSearchOpen(true);
+    api.get("/suggest", { params: { q: q.trim(), limit: 6 } })
+      .then(r => setSuggestions(r.data.suggestions || []))
+      .catch(() => setSuggestions([]));
+  }, []);
+
   const handleSearchChange = (value) => {
     setSearchQuery(value);
+    clearTimeout(suggestTimerRef.current);
     clearTimeout(searchTimerRef.current);
-    searchTimerRef.current = setTimeout(() => doSearch(value), 300);
+    suggestTimerRef.current = setTimeout(() => doSuggest(value), 80);
+    searchTimerRef.current = setTimeout(() => doSearch(value), 450);
+  };
+
+  const goToSuggestion = (s) => {
+    if (["article", "property", "procedure"].includes(s.kind)) {
+      goToResult(s.kind, s.id);
+      return;
+    }
+    setSearchOpen(false);
+    setSearchQuery("");
+    setMobileSearchOpen(false);
+    const params = new URLSearchParams({ city: s.city || "" });
+    if (s.neighborhood) params.set("neighborhood", s.neighborhood);
+    navigate(`/immobilier?${params.toString()}`);
   };
 
   const goToResult = (type, id) => {
@@ -271,14 +300,31 @@ export default function Header() {
     if (!searchOpen || !searchQuery.trim()) return null;
     return (
       <div className="absolute top-full left-0 right-0 mt-1 bg-black/95 backdrop-blur-lg border border-zinc-700 rounded-xl overflow-hidden shadow-2xl z-50 max-h-[400px] overflow-y-auto">
+        {suggestions.length > 0 && (
+          <div className="border-b border-zinc-800 py-1" data-testid="search-suggestions">
+            {suggestions.map(s => (
+              <button
+                key={`${s.kind}:${s.id}`}
+                onClick={() => goToSuggestion(s)}
+                className="w-full flex items-center gap-2 px-4 py-2 text-left hover:bg-zinc-800 transition-colors"
+              >
+                <Search className="w-3.5 h-3.5 text-zinc-500 flex-shrink-0" />
+                <span className="text-sm text-white truncate font-['Manrope']">{s.label}</span>
+                {s.context && <span className="text-[10px] text-zinc-500 truncate">{s.context}</span>}
+              </button>
+            ))}
+          </div>
+        )}
         {searchLoading ? (
           <div className="flex items-center justify-center py-8">
             <div className="w-5 h-5 border-2 border-[#FF6600] border-t-transparent rounded-full animate-spin" />
           </div>
         ) : totalResults === 0 ? (
-          <div className="py-8 text-center text-zinc-500 text-sm font-['Manrope']">
-            Aucun resultat pour "{searchQuery}"
-          </div>
+          suggestions.length === 0 && (
+            <div className="py-8 text-center text-zinc-500 text-sm font-['Manrope']">
+              Aucun resultat pour "{searchQuery}"
+            </div>
+          )
         ) : (
           <div>
             {searchResults.articles?.length > 0 && (
@@ -3,28 +3,38 @@ import { Heart } from "lucide-react";
 import { useAuth } from "../context/AuthContext";
 import { useWebSocket } from "../context/WebSocketContext";
 import api from "../lib/api";
+import { fetchItemStatus } from "../lib/itemStatus";
 import { toast } from "sonner";
 
-export default function LikeButton({ type, id, initialCount = 0, initialLikedBy = [], className = "" }) {
+export default function LikeButton({ type, id, initialCount = 0, className = "" }) {
   const { user } = useAuth();
   const ws = useWebSocket();
   const [count, setCount] = useState(initialCount);
-  const [likedBy, setLikedBy] = useState(initialLikedBy);
+  const [liked, setLiked] = useState(false);
   const [loading, setLoading] = useState(false);
   const [burst, setBurst] = useState(false);
 
-  const isLiked = user ? likedBy.includes(user.id) : false;
+  const isLiked = user ? liked : false;
 
-  // Listen for real-time like updates
+  // Liked state comes from one batched /bookmarks/status call per page
+  useEffect(() => {
+    if (!user) return;
+    let active = true;
+    fetchItemStatus(type, id).then((status) => { if (active) setLiked(status.liked); });
+    return () => { active = false; };
+  }, [user, type, id]);
+
+  // Listen for real-time like updates (only sent to watchers of this item)
   useEffect(() => {
     if (!ws) return;
     const handler = (data) => {
       if (data.type === "like_update" && data.content_type === type && data.id === id) {
         setCount(data.likes_count);
-        setLikedBy(data.liked_by || []);
       }
     };
-    return ws.subscribe(handler);
+    const unsubscribe = ws.subscribe(handler);
+    const unwatch = ws.watch(type, id);
+    return () => { unsubscribe(); unwatch(); };
   }, [ws, type, id]);
 
   const handleLike = async (e) => {
@@ -38,9 +48,7 @@ export default function LikeButton({ type, id, initialCount = 0, initialLikedBy
     if (loading) return;
 
     const wasLiked = isLiked;
-    setLikedBy((prev) =>
-      wasLiked ? prev.filter((uid) => uid !== user.id) : [...prev, user.id]
-    );
+    setLiked(!wasLiked);
     setCount((c) => (wasLiked ? c - 1 : c + 1));
     if (!wasLiked) setBurst(true);
     setTimeout(() => setBurst(false), 600);
@@ -52,11 +60,9 @@ export default function LikeButton({ type, id, initialCount = 0, initialLikedBy
         : `/articles/${id}/like`;
       const res = await api.post(endpoint);
       setCount(res.data.likes_count);
-      setLikedBy(res.data.liked_by);
+      setLiked(res.data.liked);
     } catch {
-      setLikedBy((prev) =>
-        wasLiked ? [...prev, user.id] : prev.filter((uid) => uid !== user.id)
-      );
+      setLiked(wasLiked);
       setCount((c) => (wasLiked ? c + 1 : c - 1));
       toast.error("Erreur, reessayez");
     } finally {
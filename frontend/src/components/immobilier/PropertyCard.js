@@ -3,6 +3,7 @@ import { Link } from "react-router-dom";
 import { MapPin, Eye, Phone, Bed, Bath, Maximize, Home, Heart, ShieldCheck, Bookmark } from "lucide-react";
 import { useAuth } from "../../context/AuthContext";
 import api from "../../lib/api";
+import { fetchItemStatus } from "../../lib/itemStatus";
 import { toast } from "sonner";
 import LikeButton from "../LikeButton";
 
@@ -46,7 +47,7 @@ export default function PropertyCard({ property }) {
 
   useEffect(() => {
     if (!isAuthenticated) return;
-    api.get(`/saved-properties/${property.id}/status`).then(r => setIsSaved(r.data.is_saved)).catch(() => {});
+    fetchItemStatus("property", property.id).then(status => setIsSaved(status.saved));
   }, [property.id, isAuthenticated]);
 
   const toggleSave = async (e) => {
@@ -171,7 +172,6 @@ export default function PropertyCard({ property }) {
             type="property"
             id={property.id}
             initialCount={property.likes_count || 0}
-            initialLikedBy={property.liked_by || []}
             className="px-2 py-1.5"
           />
         </div>
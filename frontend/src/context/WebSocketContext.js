@@ -8,6 +8,7 @@ export function WebSocketProvider({ children }) {
   const { isAuthenticated, user, logout, refreshUser } = useAuth();
   const wsRef = useRef(null);
   const subscribersRef = useRef(new Set());
+  const watchedRef = useRef(new Map());
   const reconnectTimerRef = useRef(null);
   const isUnmountedRef = useRef(false);
 
@@ -26,6 +27,14 @@ export function WebSocketProvider({ children }) {
     const ws = new WebSocket(`${wsUrl}/api/ws/chat`);
     wsRef.current = ws;
 
+    ws.onopen = () => {
+      // Re-subscribe to watched items after (re)connect
+      watchedRef.current.forEach((_, key) => {
+        const [content_type, id] = key.split(":");
+        ws.send(JSON.stringify({ type: "watch", content_type, id }));
+      });
+    };
+
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
@@ -100,8 +109,25 @@ export function WebSocketProvider({ children }) {
     return () => subscribersRef.current.delete(handler);
   }, []);
 
+  // Per-item events (view_update, like_update) are only sent to sockets watching the item
+  const watch = useCallback((contentType, id) => {
+    const key = `${contentType}:${id}`;
+    const refs = watchedRef.current.get(key) || 0;
+    watchedRef.current.set(key, refs + 1);
+    if (!refs) send({ type: "watch", content_type: contentType, id });
+    return () => {
+      const left = (watchedRef.current.get(key) || 1) - 1;
+      if (left > 0) {
+        watchedRef.current.set(key, left);
+      } else {
+        watchedRef.current.delete(key);
+        send({ type: "unwatch", content_type: contentType, id });
+      }
+    };
+  }, [send]);
+
   return (
-    <WebSocketContext.Provider value={{ onlineUsers, unreadImmo, unreadProc, send, subscribe }}>
+    <WebSocketContext.Provider value={{ onlineUsers, unreadImmo, unreadProc, send, subscribe, watch }}>
       {children}
     </WebSocketContext.Provider>
   );
@@ -0,0 +1,44 @@
+// ============================================================================
+// itemStatus.js — Regroupe les verifications "sauvegarde ? aime ?" par page
+// ============================================================================
+// Chaque carte (article, annonce, procedure) et chaque LikeButton demande son
+// statut ; les demandes faites pendant le meme rendu sont regroupees en un seul
+// GET /bookmarks/status qui renvoie les ids sauvegardes et aimes par type.
+// ============================================================================
+
+import api from "./api";
+
+const MAX_IDS = 100;
+const EMPTY = { saved: false, liked: false };
+let queue = null; // { entries: Map<"type:id", { type, id, resolvers }>, timer }
+
+function flush() {
+  const entries = Array.from(queue.entries.values());
+  queue = null;
+  for (let i = 0; i < entries.length; i += MAX_IDS) {
+    const chunk = entries.slice(i, i + MAX_IDS);
+    const params = {};
+    chunk.forEach(({ type, id }) => { params[type] = params[type] ? `${params[type]},${id}` : id; });
+    api.get("/bookmarks/status", { params })
+      .then((r) => {
+        chunk.forEach(({ type, id, resolvers }) => {
+          const status = r.data[type] || {};
+          const value = { saved: (status.saved || []).includes(id), liked: (status.liked || []).includes(id) };
+          resolvers.forEach((resolve) => resolve(value));
+        });
+      })
+      .catch(() => chunk.forEach(({ resolvers }) => resolvers.forEach((resolve) => resolve(EMPTY))));
+  }
+}
+
+export function fetchItemStatus(type, id) {
+  return new Promise((resolve) => {
+    if (!queue) {
+      queue = { entries: new Map(), timer: setTimeout(flush, 10) };
+    }
+    const key = `${type}:${id}`;
+    const entry = queue.entries.get(key) || { type, id, resolvers: [] };
+    entry.resolvers.push(resolve);
+    queue.entries.set(key, entry);
+  });
+}
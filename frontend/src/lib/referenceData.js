@@ -0,0 +1,21 @@
+// ============================================================================
+// referenceData.js — Donnees de reference chargees une seule fois
+// ============================================================================
+// Villes, quartiers, categories/pays/langues des procedures, etc. arrivent en
+// un seul GET /reference (ETag + Cache-Control : un 304 au demarrage quand rien
+// n'a change). La promesse est partagee par tous les composants de la session.
+// ============================================================================
+
+import api from "./api";
+
+let pending = null;
+
+export function getReferenceData() {
+  if (!pending) {
+    pending = api.get("/reference").then((r) => r.data).catch((err) => {
+      pending = null;
+      throw err;
+    });
+  }
+  return pending;
+}
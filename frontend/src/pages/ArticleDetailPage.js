@@ -3,6 +3,7 @@ import { useParams, Link } from "react-router-dom";
 import DOMPurify from "dompurify";
 import Header from "../components/Header";
 import api from "../lib/api";
+import { fetchItemStatus } from "../lib/itemStatus";
 import { useAuth } from "../context/AuthContext";
 import { useWebSocket } from "../context/WebSocketContext";
 import { isHtmlContent, renderContent } from "../lib/contentRenderer";
@@ -162,7 +163,9 @@ export default function ArticleDetailPage() {
         setViewCount(data.views);
       }
     };
-    return ws.subscribe(handler);
+    const unsubscribe = ws.subscribe(handler);
+    const unwatch = ws.watch("article", id);
+    return () => { unsubscribe(); unwatch(); };
   }, [ws, id]);
 
   useEffect(() => {
@@ -171,7 +174,7 @@ export default function ArticleDetailPage() {
         setArticle(r.data);
         setViewCount(r.data.views || 0);
         if (isAuthenticated) {
-          api.get(`/saved-articles/${id}/status`).then((res) => setIsSaved(res.data.is_saved)).catch(() => {});
+          fetchItemStatus("article", id).then((status) => setIsSaved(status.saved));
         }
       })
       .catch(() => setError("Article introuvable."))
@@ -253,7 +256,6 @@ export default function ArticleDetailPage() {
                 type="article"
                 id={article.id}
                 initialCount={article.likes_count || 0}
-                initialLikedBy={article.liked_by || []}
                 className="text-sm"
               />
               {isAuthenticated && (
@@ -40,6 +40,30 @@ function readabilityScore(text) {
   return { score: 30, label: "Difficile" };
 }
 
+// Autosave sends only what changed since the last saved state
+const AUTOSAVE_FIELDS = ["title", "subtitle", "content", "category", "tags", "image_url", "meta_title", "meta_description"];
+
+function autosaveSnapshot(form) {
+  return JSON.parse(JSON.stringify({ ...Object.fromEntries(AUTOSAVE_FIELDS.map(f => [f, form[f]])), blocks: form.blocks }));
+}
+
+function buildAutosavePatch(saved, form) {
+  const patch = {};
+  AUTOSAVE_FIELDS.forEach(f => {
+    if (JSON.stringify(saved[f]) !== JSON.stringify(form[f])) patch[f] = form[f];
+  });
+  const savedBlocks = Object.fromEntries(saved.blocks.map(b => [b.id, JSON.stringify(b)]));
+  const blocks = form.blocks
+    .filter(b => savedBlocks[b.id] !== JSON.stringify(b))
+    .map(b => ({ op: "set", id: b.id, block: b }));
+  const ids = new Set(form.blocks.map(b => b.id));
+  saved.blocks.forEach(b => { if (!ids.has(b.id)) blocks.push({ op: "delete", id: b.id }); });
+  if (blocks.length) patch.blocks = blocks;
+  const order = form.blocks.map(b => b.id);
+  if (order.join("\n") !== saved.blocks.map(b => b.id).join("\n")) patch.order = order;
+  return Object.keys(patch).length ? patch : null;
+}
+
 export default function ArticleFormPage() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -48,6 +72,11 @@ export default function ArticleFormPage() {
   const autosaveTimer = useRef(null);
   const [lastSaved, setLastSaved] = useState(null);
   const [autoSaving, setAutoSaving] = useState(false);
+  const [conflict, setConflict] = useState(false);
+  const savedRef = useRef(null);
+  const versionRef = useRef(0);
+  const inFlightRef = useRef(false);
+  const retryAtRef = useRef(0);
 
   const [form, setForm] = useState({
     title: "", subtitle: "", content: "", blocks: [],
@@ -68,39 +97,55 @@ export default function ArticleFormPage() {
     api.get(`/articles/${id}`)
       .then(r => {
         const d = r.data;
-        setForm({
+        const loaded = {
           title: d.title || "", subtitle: d.subtitle || "",
           content: d.content || "", blocks: d.blocks || [],
           image_url: d.image_url || "", image_alt: d.image_alt || "",
           category: d.category || "", tags: d.tags || [],
           is_breaking: d.is_breaking || false, slug: d.slug || "",
           meta_title: d.meta_title || "", meta_description: d.meta_description || "",
-          status: d.status || "draft", scheduled_at: d.scheduled_at || "",
-        });
+          status: d.status || "draft", scheduled_at: (d.scheduled_at || "").slice(0, 16),
+        };
+        setForm(loaded);
+        savedRef.current = autosaveSnapshot(loaded);
+        versionRef.current = d.draft_version || 0;
+        setConflict(false);
       })
       .catch(() => { toast.error("Article introuvable."); navigate("/admin"); })
       .finally(() => setFetchLoading(false));
   }, [id, isEdit, navigate]);
 
-  // Auto-save every 30s for existing articles
+  // Auto-save every 10s for existing articles: only the changes, against the
+  // draft version they were made on (the server coalesces the writes)
   const doAutosave = useCallback(async () => {
-    if (!isEdit || loading) return;
+    if (!isEdit || loading || conflict || !savedRef.current) return;
+    // One patch at a time: a second one would carry the same, soon stale, base_version
+    if (inFlightRef.current || Date.now() < retryAtRef.current) return;
+    const patch = buildAutosavePatch(savedRef.current, form);
+    if (!patch) return;
+    const snapshot = autosaveSnapshot(form);
+    inFlightRef.current = true;
     setAutoSaving(true);
     try {
-      const res = await api.put(`/articles/${id}/autosave`, {
-        title: form.title, subtitle: form.subtitle, content: form.content,
-        blocks: form.blocks, category: form.category, tags: form.tags,
-        image_url: form.image_url, meta_title: form.meta_title,
-        meta_description: form.meta_description,
-      });
+      const res = await api.patch(`/articles/${id}/autosave`, { ...patch, base_version: versionRef.current });
+      versionRef.current = res.data.version;
+      savedRef.current = snapshot;
       setLastSaved(new Date().toLocaleTimeString("fr-FR", { hour: "2-digit", minute: "2-digit" }));
-    } catch {}
-    finally { setAutoSaving(false); }
-  }, [isEdit, id, form, loading]);
+    } catch (err) {
+      if (err.response?.status === 409) {
+        setConflict(true);
+        toast.error("Cet article a ete modifie ailleurs. Rechargez la page avant de continuer.");
+      } else if (err.response?.status === 503) {
+        // Previous changes not written yet by the server: send these again later
+        retryAtRef.current = Date.now() + 1000 * (Number(err.response.headers?.["retry-after"]) || 10);
+      }
+    }
+    finally { inFlightRef.current = false; setAutoSaving(false); }
+  }, [isEdit, id, form, loading, conflict]);
 
   useEffect(() => {
     if (!isEdit) return;
-    autosaveTimer.current = setInterval(doAutosave, 30000);
+    autosaveTimer.current = setInterval(doAutosave, 10000);
     return () => clearInterval(autosaveTimer.current);
   }, [doAutosave, isEdit]);
 
@@ -198,7 +243,7 @@ export default function ArticleFormPage() {
         <div className="hidden sm:block">
           <p className="text-xs font-bold leading-tight truncate max-w-[200px]">{form.title || "Nouvel article"}</p>
           <p className="text-[10px] text-zinc-500">
-            {autoSaving ? "Sauvegarde..." : lastSaved ? `Sauvegarde a ${lastSaved}` : isEdit ? "Autosave actif" : "Nouveau"}
+            {conflict ? "Conflit: autosave suspendu" : autoSaving ? "Sauvegarde..." : lastSaved ? `Sauvegarde a ${lastSaved}` : isEdit ? "Autosave actif" : "Nouveau"}
           </p>
         </div>
         <div className="flex-1" />
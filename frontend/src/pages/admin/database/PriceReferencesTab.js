@@ -1,5 +1,6 @@
 import { useState, useEffect } from "react";
 import api from "../../../lib/api";
+import { getReferenceData } from "../../../lib/referenceData";
 import { toast } from "sonner";
 import { Loader2, Trash2 } from "lucide-react";
 
@@ -14,7 +15,7 @@ export function PriceReferencesTab() {
 
   useEffect(() => {
     api.get("/admin/price-references").then(r => setRefs(r.data)).catch(() => {}).finally(() => setLoading(false));
-    api.get("/locations/cities").then(r => setCities(r.data)).catch(() => {});
+    getReferenceData().then(ref => setCities(ref.cities)).catch(() => {});
   }, []);
 
   useEffect(() => {
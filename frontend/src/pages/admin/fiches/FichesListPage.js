@@ -22,6 +22,7 @@ export default function FichesListPage() {
   const [statusFilter, setStatusFilter] = useState("");
   const [deletingId, setDeletingId] = useState(null);
   const [downloadingId, setDownloadingId] = useState(null);
+  const [exporting, setExporting] = useState(null); // null | { done, total }
   const navigate = useNavigate();
 
   const load = useCallback(async () => {
@@ -60,6 +61,45 @@ export default function FichesListPage() {
     finally { setDownloadingId(null); }
   };
 
+  const saveBlob = (data, type, filename) => {
+    const url = URL.createObjectURL(new Blob([data], { type }));
+    const a = document.createElement("a");
+    a.href = url;
+    a.download = filename;
+    a.click();
+    URL.revokeObjectURL(url);
+  };
+
+  // Catalogue of the listed fiches: small batches come back directly,
+  // larger ones run as a background export that is polled for progress.
+  const exportCatalogue = async (format) => {
+    const type = format === "zip" ? "application/zip" : "application/pdf";
+    setExporting({ done: 0, total: filtered.length });
+    try {
+      const res = await api.post("/fiches/export", { ids: filtered.map(f => f.id), format }, { responseType: "blob" });
+      if (res.status === 202) {
+        let job = JSON.parse(await res.data.text());
+        while (job.status === "queued" || job.status === "running") {
+          await new Promise(r => setTimeout(r, 1500));
+          job = (await api.get(`/fiches/export/${job.id}`)).data;
+          setExporting({ done: job.progress?.done || 0, total: job.progress?.total || filtered.length });
+        }
+        if (job.status !== "succeeded") throw new Error(job.error || job.status);
+        const file = await api.get(`/fiches/export/${job.id}/download`, { responseType: "blob" });
+        saveBlob(file.data, type, `fiches.${format}`);
+      } else {
+        saveBlob(res.data, type, `fiches.${format}`);
+      }
+      toast.success("Export termine");
+    } catch (err) {
+      // Blob responses carry the error detail as JSON text (e.g. catalogue too large)
+      let detail;
+      try { detail = JSON.parse(await err.response.data.text()).detail; } catch { detail = null; }
+      toast.error(typeof detail === "string" ? detail : "Erreur export des fiches");
+    }
+    finally { setExporting(null); }
+  };
+
   const filtered = fiches.filter(f =>
     !search || f.title?.toLowerCase().includes(search.toLowerCase()) ||
     f.country?.toLowerCase().includes(search.toLowerCase())
@@ -77,6 +117,17 @@ export default function FichesListPage() {
             <h1 className="font-['Oswald'] text-2xl font-bold uppercase tracking-tight text-black">Fiches de Procedure</h1>
             <p className="text-sm text-zinc-500">{filtered.length} fiche{filtered.length > 1 ? "s" : ""}</p>
           </div>
+          <button onClick={() => exportCatalogue("pdf")} disabled={!!exporting || filtered.length === 0}
+            className="bg-white border border-zinc-200 text-zinc-700 px-4 py-2.5 text-sm font-bold uppercase tracking-wider hover:border-[#FF6600] hover:text-[#FF6600] transition-colors flex items-center gap-2 disabled:opacity-50"
+            data-testid="export-fiches-pdf-btn">
+            {exporting ? <Loader2 className="w-4 h-4 animate-spin" /> : <Download className="w-4 h-4" />}
+            {exporting ? `${exporting.done}/${exporting.total}` : "Catalogue PDF"}
+          </button>
+          <button onClick={() => exportCatalogue("zip")} disabled={!!exporting || filtered.length === 0}
+            className="bg-white border border-zinc-200 text-zinc-700 px-4 py-2.5 text-sm font-bold uppercase tracking-wider hover:border-[#FF6600] hover:text-[#FF6600] transition-colors flex items-center gap-2 disabled:opacity-50"
+            data-testid="export-fiches-zip-btn">
+            <Download className="w-4 h-4" /> ZIP
+          </button>
           <button onClick={() => navigate("/admin/fiches/create")}
             className="bg-[#FF6600] text-white px-4 py-2.5 text-sm font-bold uppercase tracking-wider hover:bg-[#e55b00] transition-colors flex items-center gap-2"
             data-testid="create-fiche-btn">
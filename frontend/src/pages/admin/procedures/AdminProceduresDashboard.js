@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import api from "../../../lib/api";
+import { getReferenceData } from "../../../lib/referenceData";
 import {
   FileText, CheckCircle, Clock, Eye, Plus, Search, Loader2, X,
   ExternalLink, Download, TrendingUp, FolderOpen, MessageSquare,
@@ -30,8 +31,7 @@ export default function AdminProceduresDashboard() {
   const [sidebarOpen, setSidebarOpen] = useState(false);
 
   useEffect(() => {
-    api.get("/procedures/categories").then(r => setCategories(r.data)).catch(() => {});
-    api.get("/procedures/countries").then(r => setCountries(r.data)).catch(() => {});
+    getReferenceData().then(ref => { setCategories(ref.procedure_categories); setCountries(ref.procedure_countries); }).catch(() => {});
     api.get("/procedures/stats").then(r => setStats(r.data)).catch(() => {});
     fetchProcedures();
   }, []);
@@ -7,6 +7,7 @@ import {
   arrayMove, SortableContext, sortableKeyboardCoordinates, verticalListSortingStrategy
 } from "@dnd-kit/sortable";
 import api from "../../../lib/api";
+import { getReferenceData } from "../../../lib/referenceData";
 import { toast } from "sonner";
 import {
   ArrowLeft, Save, Send, Clock, Plus, X, Upload, Loader2, Video, Tag
@@ -47,12 +48,9 @@ export default function ProcedureBuilder() {
   );
 
   useEffect(() => {
-    Promise.all([
-      api.get("/procedures/categories"), api.get("/procedures/countries"),
-      api.get("/procedures/languages"), api.get("/chat-actions"),
-    ]).then(([cat, cou, lang, chat]) => {
-      setCategories(cat.data); setCountries(cou.data);
-      setLanguages(lang.data); setChatActions(chat.data);
+    Promise.all([getReferenceData(), api.get("/chat-actions")]).then(([ref, chat]) => {
+      setCategories(ref.procedure_categories); setCountries(ref.procedure_countries);
+      setLanguages(ref.languages); setChatActions(chat.data);
     }).catch(() => {});
   }, []);
 
@@ -3,6 +3,7 @@ import { Link } from "react-router-dom";
 import Header from "../../components/Header";
 import Footer from "../../components/layout/Footer";
 import api from "../../lib/api";
+import { getReferenceData } from "../../lib/referenceData";
 import { formatPrice, formatPriceConverted } from "../../components/immobilier/PropertyCard";
 import { ArrowLeft, Calculator, TrendingUp, MapPin, Home, Bed, Maximize, Loader2 } from "lucide-react";
 
@@ -21,7 +22,7 @@ export default function PriceEstimatePage() {
 
   // Load cities
   useEffect(() => {
-    api.get("/locations/cities").then(r => setCities(r.data)).catch(() => {});
+    getReferenceData().then(ref => setCities(ref.cities)).catch(() => {});
   }, []);
 
   // Load communes when city changes
@@ -8,6 +8,7 @@ import ChatPanel from "../../components/ChatPanel";
 import { useAuth } from "../../context/AuthContext";
 import { useWebSocket } from "../../context/WebSocketContext";
 import api from "../../lib/api";
+import { fetchItemStatus } from "../../lib/itemStatus";
 import {
   MapPin, Phone, Mail, MessageCircle, MessageSquare, Eye,
   ChevronLeft, ChevronRight, ArrowLeft, Edit, Loader2, Video,
@@ -66,7 +67,7 @@ export default function PropertyDetailPage() {
   useEffect(() => {
     api.get(`/properties/${id}`)
       .then(r => { setProperty(r.data); setViewCount(r.data.views || 0); api.post(`/properties/${id}/view`).catch(() => {});
-        if (isAuthenticated) { api.get(`/saved-properties/${id}/status`).then(res => setIsSaved(res.data.is_saved)).catch(() => {}); }
+        if (isAuthenticated) { fetchItemStatus("property", id).then(status => setIsSaved(status.saved)); }
       })
       .catch(() => { toast.error("Annonce introuvable"); navigate("/immobilier"); })
       .finally(() => setLoading(false));
@@ -79,7 +80,9 @@ export default function PropertyDetailPage() {
     const handler = (data) => {
       if (data.type === "view_update" && data.content_type === "property" && data.id === id) setViewCount(data.views);
     };
-    return ws.subscribe(handler);
+    const unsubscribe = ws.subscribe(handler);
+    const unwatch = ws.watch("property", id);
+    return () => { unsubscribe(); unwatch(); };
   }, [ws, id]);
 
   const equipByCategory = useMemo(() => {
@@ -163,7 +166,7 @@ export default function PropertyDetailPage() {
               )}
               <div className="flex items-center justify-end gap-2 mt-2">
                 <span className="flex items-center gap-1 text-zinc-400 text-xs"><Eye className="w-3 h-3" /> {viewCount}</span>
-                <LikeButton type="property" id={property.id} initialCount={property.likes_count || 0} initialLikedBy={property.liked_by || []} className="text-xs" />
+                <LikeButton type="property" id={property.id} initialCount={property.likes_count || 0} className="text-xs" />
                 {isAuthenticated && (
                   <button onClick={async () => {
                     try { await api.post(`/saved-properties/${property.id}`); setIsSaved(!isSaved); toast.success(isSaved ? "Retire" : "Sauvegarde"); } catch { toast.error("Erreur"); }
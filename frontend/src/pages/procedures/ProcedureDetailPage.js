@@ -4,6 +4,7 @@ import DOMPurify from "dompurify";
 import Header from "../../components/Header";
 import Footer from "../../components/layout/Footer";
 import api from "../../lib/api";
+import { fetchItemStatus } from "../../lib/itemStatus";
 import {
   Loader2, ArrowLeft, Edit, Trash2, CheckCircle,
   FileText, Download, ChevronRight, Bookmark, Video, ExternalLink
@@ -38,7 +39,7 @@ export default function ProcedureDetailPage() {
 
   useEffect(() => {
     if (!isAuthenticated || !id) return;
-    api.get(`/saved-procedures/${id}/status`).then(r => setIsSaved(r.data.is_saved)).catch(() => {});
+    fetchItemStatus("procedure", id).then(status => setIsSaved(status.saved));
   }, [id, isAuthenticated]);
 
   const toggleSave = async () => {
@@ -317,10 +318,18 @@ export default function ProcedureDetailPage() {
             {/* Files / Downloads — Fixed with programmatic download */}
             {files.length > 0 && (
               <div className="bg-white border border-zinc-200 rounded-lg overflow-hidden" data-testid="files-section">
-                <div className="px-5 py-4 border-b border-zinc-200 bg-zinc-50">
+                <div className="px-5 py-4 border-b border-zinc-200 bg-zinc-50 flex items-center justify-between gap-3">
                   <h2 className="font-['Oswald'] text-sm font-bold uppercase tracking-wider text-black flex items-center gap-2">
                     <Download className="w-4 h-4 text-[#FF6600]" /> Formulaires et Documents
                   </h2>
+                  {files.length > 1 && (
+                    // Plain link: the browser streams the ZIP to disk instead of buffering a blob
+                    <a href={`${process.env.REACT_APP_BACKEND_URL}/api/procedures/${id}/files/archive`}
+                      data-testid="download-all-files"
+                      className="text-xs font-bold text-[#FF6600] hover:underline whitespace-nowrap">
+                      Tout telecharger (ZIP)
+                    </a>
+                  )}
                 </div>
                 <div className="p-4 space-y-2">
                   {files.map(f => (
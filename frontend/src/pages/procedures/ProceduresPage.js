@@ -3,6 +3,7 @@ import { Link, useSearchParams } from "react-router-dom";
 import Header from "../../components/Header";
 import Footer from "../../components/layout/Footer";
 import api from "../../lib/api";
+import { fetchItemStatus } from "../../lib/itemStatus";
 import { Loader2, ChevronLeft, ChevronRight, FileText, Calendar, Eye, ArrowRight, Bookmark } from "lucide-react";
 import { useAuth } from "../../context/AuthContext";
 import { toast } from "sonner";
@@ -21,7 +22,7 @@ function ProcedureCard({ procedure }) {
 
   useEffect(() => {
     if (!isAuthenticated) return;
-    api.get(`/saved-procedures/${procedure.id}/status`).then(r => setIsSaved(r.data.is_saved)).catch(() => {});
+    fetchItemStatus("procedure", procedure.id).then(status => setIsSaved(status.saved));
   }, [procedure.id, isAuthenticated]);
 
   const toggleSave = async (e) => {